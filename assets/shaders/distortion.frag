@@ -0,0 +1,20 @@
+#version 140
+#extension GL_ARB_explicit_attrib_location : enable
+
+in vec2 texCoordRed;
+in vec2 texCoordGreen;
+in vec2 texCoordBlue;
+
+out vec4 screenColor;
+
+uniform sampler2D eyeTexture;
+
+void main() {
+    // One sample per channel, the distortion itself was evaluated per vertex
+    screenColor = vec4(
+        texture(eyeTexture, texCoordRed).r,
+        texture(eyeTexture, texCoordGreen).g,
+        texture(eyeTexture, texCoordBlue).b,
+        1.0
+    );
+}
\ No newline at end of file
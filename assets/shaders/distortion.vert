@@ -0,0 +1,20 @@
+#version 140
+#extension GL_ARB_explicit_attrib_location : enable
+
+layout (location = 0) in vec2 vertexPosition;
+layout (location = 1) in vec2 vertexTexCoordRed;
+layout (location = 2) in vec2 vertexTexCoordGreen;
+layout (location = 3) in vec2 vertexTexCoordBlue;
+
+out vec2 texCoordRed;
+out vec2 texCoordGreen;
+out vec2 texCoordBlue;
+
+uniform vec2 uvScale;  // Rendered region of the eye buffer
+
+void main() {
+    gl_Position = vec4(vertexPosition, 0.0, 1.0);
+    texCoordRed = vertexTexCoordRed * uvScale;
+    texCoordGreen = vertexTexCoordGreen * uvScale;
+    texCoordBlue = vertexTexCoordBlue * uvScale;
+}
\ No newline at end of file
@@ -3,12 +3,65 @@
 
 in vec4 fragmentColor;
 in vec2 fragmentTexCoord;
+in float viewDepth;
+in vec3 worldPosition;
+in vec3 worldNormal;
 
 out vec4 screenColor;
 
 uniform sampler2D imageTexture;
 uniform vec4 baseColor;
 
+// Real-world depth occlusion
+uniform sampler2D occlusionDepth;
+uniform bool occlusionEnabled;
+uniform vec4 occlusionRect;  // u0, v0, u1, v1 of the depth map within the eye, v from the top
+uniform vec4 viewport;  // x, y, width, height of the eye viewport in pixels
+
+// Clustered point lights
+uniform bool lightingEnabled;
+uniform vec3 ambientLight;
+uniform usamplerBuffer lightClusters;  // Offset into lightIndices and light count, per cluster
+uniform usamplerBuffer lightIndices;
+uniform samplerBuffer lightData;  // Position and radius, then color, per light
+uniform ivec3 clusterGrid;
+uniform vec2 clusterDepth;  // Near and far depth of the slices
+
+vec3 clusteredLight() {
+    vec2 eyeUV = (gl_FragCoord.xy - viewport.xy) / viewport.zw;
+    ivec2 tile = clamp(ivec2(eyeUV * vec2(clusterGrid.xy)), ivec2(0), clusterGrid.xy - 1);
+    float slice = log(viewDepth / clusterDepth.x) / log(clusterDepth.y / clusterDepth.x) * float(clusterGrid.z);
+    int depthSlice = clamp(int(slice), 0, clusterGrid.z - 1);
+    uvec2 cluster = texelFetch(lightClusters, (depthSlice * clusterGrid.y + tile.y) * clusterGrid.x + tile.x).rg;
+
+    vec3 normal = normalize(worldNormal);
+    vec3 light = ambientLight;
+    for (uint i = 0u; i < cluster.y; i++) {
+        int index = int(texelFetch(lightIndices, int(cluster.x + i)).r);
+        vec4 positionRadius = texelFetch(lightData, index * 2);
+        vec3 color = texelFetch(lightData, index * 2 + 1).rgb;
+        vec3 toLight = positionRadius.xyz - worldPosition;
+        float distance = length(toLight);
+        float falloff = clamp(1.0 - distance / positionRadius.w, 0.0, 1.0);
+        light += color * max(dot(normal, toLight / max(distance, 1e-4)), 0.0) * falloff * falloff;
+    }
+    return light;
+}
+
 void main() {
+    if (occlusionEnabled) {
+        vec2 eyeUV = (gl_FragCoord.xy - viewport.xy) / viewport.zw;
+        eyeUV.y = 1.0 - eyeUV.y;
+        vec2 depthUV = (eyeUV - occlusionRect.xy) / (occlusionRect.zw - occlusionRect.xy);
+        if (all(greaterThanEqual(depthUV, vec2(0.0))) && all(lessThanEqual(depthUV, vec2(1.0)))) {
+            float realDepth = texture(occlusionDepth, depthUV).r;
+            if (realDepth > 0.0 && realDepth < viewDepth) {
+                discard;
+            }
+        }
+    }
     screenColor = baseColor * texture(imageTexture, fragmentTexCoord );
+    if (lightingEnabled) {
+        screenColor.rgb *= clusteredLight();
+    }
 }
\ No newline at end of file
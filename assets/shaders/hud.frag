@@ -0,0 +1,12 @@
+#version 140
+
+in vec2 texCoord;
+in vec4 color;
+
+out vec4 screenColor;
+
+uniform sampler2D image;  // 1x1 white for untextured primitives
+
+void main() {
+    screenColor = texture(image, texCoord) * color;
+}
\ No newline at end of file
@@ -0,0 +1,18 @@
+#version 140
+#extension GL_ARB_explicit_attrib_location : enable
+
+layout (location = 0) in vec3 vertexPosition;
+layout (location = 1) in vec2 vertexTexCoord;
+layout (location = 2) in vec4 vertexColor;
+
+out vec2 texCoord;
+out vec4 color;
+
+uniform mat4 view;  // World or head space to eye space, depending on the layer
+uniform mat4 projection;
+
+void main() {
+    gl_Position = projection * view * vec4(vertexPosition, 1.0);
+    texCoord = vertexTexCoord;
+    color = vertexColor;
+}
\ No newline at end of file
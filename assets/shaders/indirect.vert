@@ -0,0 +1,36 @@
+#version 140
+#extension GL_ARB_explicit_attrib_location : enable
+
+layout (location = 0) in vec3 vertexPosition;
+layout (location = 1) in vec2 vertexTexCoord;
+layout (location = 2) in vec3 vertexNormal;
+layout (location = 3) in int drawIndex;  // Instanced, so the command's base instance selects the draw
+
+uniform samplerBuffer drawData;  // Per-draw model matrix, four texels per draw
+uniform bool baseInstance;  // Whether drawIndex is fed, otherwise draws are counted from drawIndexBase
+uniform int drawIndexBase;
+uniform mat4 view;
+uniform mat4 projection;
+
+out vec2 fragmentTexCoord;
+out float viewDepth;
+out vec3 worldPosition;
+out vec3 worldNormal;
+
+void main() {
+    int draw = baseInstance ? drawIndex : drawIndexBase + gl_InstanceID;
+    int base = draw * 4;
+    mat4 model = mat4(
+        texelFetch(drawData, base),
+        texelFetch(drawData, base + 1),
+        texelFetch(drawData, base + 2),
+        texelFetch(drawData, base + 3)
+    );
+    vec4 position = model * vec4(vertexPosition, 1.0);
+    vec4 viewPosition = view * position;
+    gl_Position = projection * viewPosition;
+    fragmentTexCoord = vertexTexCoord;
+    viewDepth = -viewPosition.z;
+    worldPosition = position.xyz;
+    worldNormal = transpose(inverse(mat3(model))) * vertexNormal;
+}
\ No newline at end of file
@@ -0,0 +1,8 @@
+#version 140
+
+out vec4 screenColor;
+
+void main() {
+    // Color writes are masked, only the samples passing the depth test count
+    screenColor = vec4(1.0);
+}
\ No newline at end of file
@@ -0,0 +1,13 @@
+#version 140
+#extension GL_ARB_explicit_attrib_location : enable
+
+layout (location = 0) in vec3 vertexPosition;
+
+uniform mat4 model;
+uniform mat4 view;
+uniform mat4 projection;
+
+void main() {
+    // The unit cube is stretched over the mesh bounds by the model matrix
+    gl_Position = projection * view * model * vec4(vertexPosition, 1.0);
+}
\ No newline at end of file
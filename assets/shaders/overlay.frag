@@ -0,0 +1,9 @@
+#version 140
+
+out vec4 screenColor;
+
+uniform vec4 color;
+
+void main() {
+    screenColor = color;
+}
\ No newline at end of file
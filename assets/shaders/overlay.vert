@@ -0,0 +1,9 @@
+#version 140
+#extension GL_ARB_explicit_attrib_location : enable
+
+layout (location = 0) in vec2 vertexPosition;
+
+void main() {
+    // Head-locked, given directly in eye buffer clip space
+    gl_Position = vec4(vertexPosition, 0.0, 1.0);
+}
\ No newline at end of file
@@ -0,0 +1,11 @@
+#version 140
+
+in vec2 texCoord;
+
+out vec4 screenColor;
+
+uniform sampler2D cameraTexture;
+
+void main() {
+    screenColor = vec4(texture(cameraTexture, texCoord).rgb, 1.0);
+}
\ No newline at end of file
@@ -0,0 +1,11 @@
+#version 140
+
+out vec2 texCoord;
+
+void main() {
+    // Full-screen triangle from the vertex index
+    vec2 position = vec2(float((gl_VertexID << 1) & 2), float(gl_VertexID & 2)) * 2.0 - 1.0;
+    // Camera images are stored top row first
+    texCoord = vec2(position.x * 0.5 + 0.5, 0.5 - position.y * 0.5);
+    gl_Position = vec4(position, 0.0, 1.0);
+}
\ No newline at end of file
@@ -0,0 +1,43 @@
+#version 140
+
+in vec2 ndc;
+
+out vec4 screenColor;
+
+uniform sampler2D eyeTexture;
+uniform sampler2D eyeDepth;
+
+uniform mat4 projection;
+uniform mat4 inverseProjection;
+uniform mat4 rotationReprojection;  // New clip space to old clip space, rotation only
+uniform mat4 newToOld;  // New view space to old view space
+uniform bool positional;
+uniform vec2 uvScale;  // Rendered region of the old eye buffer
+
+void main() {
+    // Rotation only: a homography, independent of depth
+    vec4 warped = rotationReprojection * vec4(ndc, 1.0, 1.0);
+    vec2 uv = warped.xy / warped.w * 0.5 + 0.5;
+
+    if (positional) {
+        // Ray through this pixel in the new view space
+        vec4 ray = inverseProjection * vec4(ndc, 1.0, 1.0);
+        ray.xyz /= ray.w;
+        // Take the old depth where the ray lands, place the point along the new ray and reproject it.
+        // Two iterations converge well for the small translations between frames.
+        for (int i = 0; i < 2; i++) {
+            float depth = texture(eyeDepth, uv * uvScale).r;
+            vec4 oldView = inverseProjection * vec4(uv * 2.0 - 1.0, depth * 2.0 - 1.0, 1.0);
+            float viewZ = oldView.z / oldView.w;
+            vec3 point = ray.xyz * (viewZ / ray.z);
+            vec4 oldClip = projection * newToOld * vec4(point, 1.0);
+            uv = oldClip.xy / oldClip.w * 0.5 + 0.5;
+        }
+    }
+
+    if (any(lessThan(uv, vec2(0.0))) || any(greaterThan(uv, vec2(1.0)))) {
+        screenColor = vec4(0.0, 0.0, 0.0, 1.0);
+    } else {
+        screenColor = texture(eyeTexture, uv * uvScale);
+    }
+}
\ No newline at end of file
@@ -0,0 +1,10 @@
+#version 140
+
+out vec2 ndc;
+
+void main() {
+    // Full-screen triangle from the vertex index
+    vec2 position = vec2(float((gl_VertexID << 1) & 2), float(gl_VertexID & 2)) * 2.0 - 1.0;
+    ndc = position;
+    gl_Position = vec4(position, 0.0, 1.0);
+}
\ No newline at end of file
@@ -0,0 +1,17 @@
+#version 140
+
+in vec2 texCoord;
+in vec4 color;
+
+out vec4 screenColor;
+
+uniform sampler2D glyphAtlas;
+
+void main() {
+    // The atlas holds glyph coverage in its red channel
+    float coverage = texture(glyphAtlas, texCoord).r;
+    if (coverage <= 0.0) {
+        discard;
+    }
+    screenColor = vec4(color.rgb, color.a * coverage);
+}
\ No newline at end of file
@@ -3,14 +3,23 @@
 
 layout (location = 0) in vec3 vertexPosition;
 layout (location = 1) in vec2 vertexTexCoord;
+layout (location = 2) in vec3 vertexNormal;
 
 uniform mat4 model;
 uniform mat4 view;
 uniform mat4 projection;
 
 out vec2 fragmentTexCoord;
+out float viewDepth;
+out vec3 worldPosition;
+out vec3 worldNormal;
 
 void main() {
-    gl_Position = projection * view * model * vec4(vertexPosition, 1.0);
+    vec4 position = model * vec4(vertexPosition, 1.0);
+    vec4 viewPosition = view * position;
+    gl_Position = projection * viewPosition;
     fragmentTexCoord = vertexTexCoord;
+    viewDepth = -viewPosition.z;
+    worldPosition = position.xyz;
+    worldNormal = transpose(inverse(mat3(model))) * vertexNormal;
 }
\ No newline at end of file
@@ -0,0 +1,2 @@
+from .scenarios import Scenario, SCENARIOS
+from .runner import GLCallCounter, run_scenario, run_benchmarks, compare, save_results, load_results
@@ -0,0 +1,42 @@
+import sys
+import argparse
+from evie.core.config import WINDOW_BACKEND
+from evie.benchmark import SCENARIOS, run_benchmarks, compare, save_results, load_results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m evie.benchmark",
+        description="EVIE rendering benchmarks. The backend comes from EVIE_BACKEND, e.g. "
+                    "`EVIE_BACKEND=egl python -m evie.benchmark` to run headless."
+    )
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--frames", type=int, default=300, help="Measured frames per scenario")
+    parser.add_argument("--warmup", type=int, default=30, help="Unmeasured frames per scenario")
+    parser.add_argument("--output", default="benchmark.json", help="Where to write the results")
+    parser.add_argument("--baseline", help="Results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown flagged as a regression")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    results = run_benchmarks(args.scenarios or None, args.frames, args.warmup, WINDOW_BACKEND)
+    save_results(results, args.output)
+
+    print(f"{'scenario':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'update':>9}{'render':>9}{'draws':>9}{'gl':>9}")
+    for name, r in results["scenarios"].items():
+        print(f"{name:<18}{r['frame_p50_ms']:>9.2f}{r['frame_p95_ms']:>9.2f}{r['frame_p99_ms']:>9.2f}"
+              f"{r['update_cpu_ms']:>9.2f}{r['render_cpu_ms']:>9.2f}{r['draw_calls']:>9.0f}{r['gl_calls']:>9.0f}")
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+import sys
+import time
+import json
+import platform
+import functools
+import numpy as np
+import OpenGL.GL as gl
+from evie.core.config import *
+from evie.rendering.app import App
+from evie.rendering.simulation import Simulation
+from evie.benchmark.scenarios import Scenario, SCENARIOS
+
+__all__ = ['GLCallCounter', 'run_scenario', 'run_benchmarks', 'compare', 'save_results', 'load_results']
+
+# Metrics compared against a baseline, and whether they are counts (any increase is a regression)
+COMPARED_METRICS = {
+    "frame_p50_ms": False,
+    "frame_p95_ms": False,
+    "frame_p99_ms": False,
+    "update_cpu_ms": False,
+    "render_cpu_ms": False,
+    "draw_calls": True,
+    "gl_calls": True
+}
+
+
+class GLCallCounter:
+    """
+    Counts OpenGL calls made by the evie modules.
+
+    Every `gl*` function imported into an `evie.*` module is temporarily replaced by a counting wrapper. The
+    wrappers add overhead, so counts are collected separately from timings.
+    """
+
+    def __init__(self):
+        self.counts: dict[str, int] = {}
+        self._patched: list[tuple[object, str, object]] = []
+
+    def _wrap(self, name: str, function):
+        counts = self.counts
+
+        @functools.wraps(function)
+        def counted(*args, **kwargs):
+            counts[name] = counts.get(name, 0) + 1
+            return function(*args, **kwargs)
+        return counted
+
+    def __enter__(self) -> 'GLCallCounter':
+        for module_name, module in list(sys.modules.items()):
+            if module is None or not module_name.startswith("evie."):
+                continue
+            for name, value in list(vars(module).items()):
+                if name.startswith("gl") and callable(value) and getattr(gl, name, None) is value:
+                    self._patched.append((module, name, value))
+                    setattr(module, name, self._wrap(name, value))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for module, name, value in self._patched:
+            setattr(module, name, value)
+        self._patched.clear()
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def draw_calls(self) -> int:
+        return sum(count for name, count in self.counts.items() if name.startswith(("glDraw", "glMultiDraw")))
+
+
+def _percentiles_ms(values: np.ndarray, prefix: str) -> dict[str, float]:
+    p50, p95, p99 = np.percentile(values * 1000.0, (50, 95, 99))
+    return {f"{prefix}_p50_ms": float(p50), f"{prefix}_p95_ms": float(p95), f"{prefix}_p99_ms": float(p99)}
+
+
+def run_scenario(app: App, scenario: Scenario, frames: int = 300, warmup: int = 30,
+                 counted_frames: int = 3, load_timeout: float = 60.0) -> dict[str, float]:
+    """Run one scenario and measure it.
+
+    The scene is stepped once per frame by a `Simulation` at the display rate, so every run does the same work,
+    and rendered from its snapshots half way between the last two steps, as the application renders them.
+    Frames are rendered unmeasured until the assets of path-registered types are resident, so streaming and
+    placeholders never reach the results.
+
+    Parameters
+    ----------
+    app : App
+        Application providing the window and engine, normally headless.
+    scenario : Scenario
+    frames : int
+        Number of measured frames.
+    warmup : int
+        Frames run before measuring, so shader compilation and uploads do not skew the results.
+    counted_frames : int
+        Frames run afterwards with GL call counting enabled.
+    load_timeout : float
+        Seconds to wait for the scenario's assets.
+
+    Returns
+    -------
+    dict[str, float]
+        Frame time percentiles, mean CPU time of the simulation step and of interpolation plus
+        `renderer.render`, and per-frame draw and GL call counts.
+
+    Raises
+    ------
+    RuntimeError
+        If the scenario's assets did not load within `load_timeout`.
+    """
+    engine, window = app.renderer, app.window
+    scene, registered = scenario.build(engine)
+    # Only passthrough scenarios draw the camera feed, not the ones run after them
+    engine.clear_passthrough()
+
+    # Synthetic camera frames, generated up front so only the upload is measured
+    rng = np.random.default_rng(0)
+    camera_frames = [rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8) for _ in range(4)] \
+        if scenario.passthrough else []
+
+    simulation = Simulation(scene, rate=REFRESH_RATE)
+    simulation.start()
+    frame_times = np.zeros(frames)
+    update_wall = np.zeros(frames)
+    render_wall = np.zeros(frames)
+    update_cpu = np.zeros(frames)
+    render_cpu = np.zeros(frames)
+
+    def step(frame_id: int) -> tuple[float, float, float, float, float]:
+        t0 = time.perf_counter()
+        window.poll_events()
+        c1, t1 = time.thread_time(), time.perf_counter()
+        simulation.run_step()
+        c2, t2 = time.thread_time(), time.perf_counter()
+        if camera_frames:
+            image = camera_frames[frame_id % len(camera_frames)]
+            engine.set_passthrough(image, image, frame_id)
+        # Interpolation renders one step behind, so this is half way between the last two steps
+        entities, models = simulation.interpolate(simulation.time + simulation.dt / 2)
+        engine.render(scene.cameras, entities, models)
+        c3, t3 = time.thread_time(), time.perf_counter()
+        window.swap_buffers()
+        t4 = time.perf_counter()
+        return t4 - t0, t2 - t1, t3 - t2, c2 - c1, c3 - c2
+
+    # Types load once drawn, keep drawing until none is missing or streaming in
+    frame_id = 0
+    deadline = time.perf_counter() + load_timeout
+    while any(ent_type not in engine.meshes or ent_type in engine.loading for ent_type in registered):
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"Assets of scenario '{scenario.name}' did not load within {load_timeout} s.")
+        step(frame_id)
+        frame_id += 1
+
+    for i in range(warmup):
+        step(frame_id + i)
+    frame_id += warmup
+    for i in range(frames):
+        frame_times[i], update_wall[i], render_wall[i], update_cpu[i], render_cpu[i] = step(frame_id + i)
+    frame_id += frames
+
+    with GLCallCounter() as counter:
+        for i in range(counted_frames):
+            step(frame_id + i)
+
+    for ent_type in registered:
+        engine.unregister_type(ent_type)
+
+    result = {"frames": frames}
+    result.update(_percentiles_ms(frame_times, "frame"))
+    result["frame_mean_ms"] = float(frame_times.mean() * 1000.0)
+    result["update_wall_ms"] = float(update_wall.mean() * 1000.0)
+    result["render_wall_ms"] = float(render_wall.mean() * 1000.0)
+    result["update_cpu_ms"] = float(update_cpu.mean() * 1000.0)
+    result["render_cpu_ms"] = float(render_cpu.mean() * 1000.0)
+    result["draw_calls"] = counter.draw_calls / counted_frames
+    result["gl_calls"] = counter.total / counted_frames
+    return result
+
+
+def run_benchmarks(names: list[str] = None, frames: int = 300, warmup: int = 30,
+                   backend: str = WINDOW_BACKEND) -> dict:
+    """Run benchmark scenarios under one application instance.
+
+    Parameters
+    ----------
+    names : list[str]
+        Scenarios to run, all of them by default.
+    frames : int
+        Measured frames per scenario.
+    warmup : int
+        Unmeasured frames per scenario.
+    backend : str
+        Window backend, normally "egl" or "osmesa".
+
+    Returns
+    -------
+    dict
+        Environment metadata and per-scenario results.
+    """
+    # Scenarios are stepped by run_scenario, the application's own scene is left alone
+    app = App(backend, simulation_thread=False)
+    # Measure raw rendering cost: no adaptive resolution, pacing or reprojection
+    app.resolution = None
+    app.renderer.set_resolution_scale(1.0)
+
+    results = {
+        "meta": {
+            "backend": backend,
+            "renderer": gl.glGetString(gl.GL_RENDERER).decode(),
+            "gl_version": gl.glGetString(gl.GL_VERSION).decode(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "resolution": [SCREEN_WIDTH, SCREEN_HEIGHT],
+            "frames": frames,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "scenarios": {}
+    }
+    try:
+        for name in names or SCENARIOS:
+            results["scenarios"][name] = run_scenario(app, SCENARIOS[name], frames, warmup)
+    finally:
+        app.quit()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.1) -> list[str]:
+    """Flag regressions against a stored baseline.
+
+    Parameters
+    ----------
+    results : dict
+        Output of `run_benchmarks`.
+    baseline : dict
+        Earlier output of `run_benchmarks`.
+    threshold : float
+        Relative increase in a timing metric that counts as a regression.
+
+    Returns
+    -------
+    list[str]
+        One human readable line per regression.
+    """
+    regressions = []
+    for name, result in results["scenarios"].items():
+        reference = baseline["scenarios"].get(name)
+        if reference is None:
+            continue
+        for metric, is_count in COMPARED_METRICS.items():
+            old, new = reference.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            limit = old if is_count else old * (1.0 + threshold)
+            if new > limit:
+                change = (new - old) / old * 100.0 if old else float("inf")
+                regressions.append(f"{name}: {metric} {old:.3f} -> {new:.3f} (+{change:.1f}%)")
+    return regressions
+
+
+def save_results(results: dict, path: str) -> None:
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path, "r") as file:
+        return json.load(file)
@@ -0,0 +1,127 @@
+from typing import Callable
+import numpy as np
+from scipy.spatial.transform import Rotation
+from evie.core.config import *
+from evie.objects.entity import Entity, Cube
+from evie.rendering.engine import GraphicsEngine
+from evie.rendering.mesh import Mesh, obj_vertex_data
+from evie.rendering.material import Material
+from evie.rendering.scene import Scene
+from evie.utils import asset_path
+
+__all__ = ['Scenario', 'SCENARIOS', 'SpinningCube', 'cube_grid']
+
+# Entity types registered by the benchmark scenes, clear of the application's own types
+BENCHMARK_TYPE_BASE = 1000
+
+TEXTURES = (
+    "textures/uvgrid.png",
+    "textures/Philips_PM5544_Test_Pattern.png",
+    "textures/RCA_Indian_Head_Test_Pattern.png"
+)
+
+
+class Scenario:
+    """
+    A parameterised benchmark scene.
+
+    `build` receives the engine, registers any extra entity types it needs and returns the scene together
+    with the list of types to unregister afterwards.
+    """
+    __slots__ = ("name", "build", "passthrough", "description")
+
+    def __init__(self, name: str, build: Callable[[GraphicsEngine], tuple[Scene, list[int]]],
+                 passthrough: bool = False, description: str = ""):
+        self.name = name
+        self.build = build
+        self.passthrough = passthrough
+        self.description = description
+
+
+class SpinningCube(Cube):
+    """
+    A cube spinning in place.
+
+    `Cube.update` moves cubes onto a circle around the origin, which would collapse a grid onto it.
+    """
+
+    def update(self, dt: float, player_pos: np.ndarray):
+        omega = 2*np.pi / 10
+        self.eulers += np.array([0, omega, omega]) * dt
+        self.eulers %= np.pi * 2
+        self.rotation = Rotation.from_euler("xyz", self.eulers).as_matrix()
+
+
+def cube_grid(count: int, spacing: float = 3.0, depth: float = -20.0) -> list[Entity]:
+    """Lay out cubes spinning in place on a square grid facing the cameras.
+
+    Parameters
+    ----------
+    count : int
+        Number of cubes.
+    spacing : float
+        Distance between neighbouring cubes.
+    depth : float
+        Z coordinate of the grid.
+
+    Returns
+    -------
+    list[Entity]
+    """
+    side = int(np.ceil(np.sqrt(count)))
+    offset = (side - 1) * spacing / 2
+    cubes = []
+    for i in range(count):
+        row, col = divmod(i, side)
+        cube = SpinningCube(position=[col * spacing - offset, row * spacing - offset, depth], eulers=[0, 0, 0])
+        cubes.append(cube)
+    return cubes
+
+
+def _cubes(count: int) -> Callable[[GraphicsEngine], tuple[Scene, list[int]]]:
+    def build(engine: GraphicsEngine) -> tuple[Scene, list[int]]:
+        return Scene({ENTITY_TYPE["CUBE"]: cube_grid(count)}), []
+    return build
+
+
+def _large_model(engine: GraphicsEngine) -> tuple[Scene, list[int]]:
+    ent_type = BENCHMARK_TYPE_BASE
+    engine.register_type(ent_type, "models/untitled.obj", TEXTURES[0])
+    model = Entity()
+    model.position = np.array([0, 0, 5])
+    return Scene({ent_type: [model]}), [ent_type]
+
+
+def _solid_texture(index: int, size: int = 4) -> np.ndarray:
+    """Texels of a small texture in a colour unique to `index`, for `index` below 64."""
+    color = (4 * index % 256, 255 - 4 * index % 256, 37 * index % 256, 255)
+    return np.tile(np.array(color, dtype=np.uint8), (size, size, 1))
+
+
+def _materials(count: int, cubes_per_material: int) -> Callable[[GraphicsEngine], tuple[Scene, list[int]]]:
+    def build(engine: GraphicsEngine) -> tuple[Scene, list[int]]:
+        types = [BENCHMARK_TYPE_BASE + i for i in range(count)]
+        cubes = cube_grid(count * cubes_per_material)
+        # Registered as objects, which the asset manager cannot share, so every type binds its own texture. The
+        # engine owns and destroys what it is given, so each type also gets its own copy of the cube mesh
+        vertex_data = obj_vertex_data(asset_path("models/cube.obj"))
+        entities = {}
+        for i, ent_type in enumerate(types):
+            engine.register_type(ent_type, Mesh(vertex_data), Material(image=_solid_texture(i)))
+            entities[ent_type] = cubes[i * cubes_per_material:(i + 1) * cubes_per_material]
+        return Scene(entities), types
+    return build
+
+
+SCENARIOS: dict[str, Scenario] = {
+    scenario.name: scenario for scenario in [
+        *(Scenario(f"cubes_{n}", _cubes(n), description=f"{n} animated cubes sharing one mesh and material")
+          for n in (1, 10, 100, 1000, 10000, 100000)),
+        Scenario("large_model", _large_model, description="untitled.obj, a single large static mesh"),
+        Scenario("materials_64", _materials(64, 16),
+                 description="64 distinct materials with 16 cubes each, one cube mesh copy per material"),
+        Scenario("passthrough_off", _cubes(100), description="100 cubes without camera passthrough"),
+        Scenario("passthrough_on", _cubes(100), passthrough=True,
+                 description="100 cubes over a synthetic camera feed uploaded every frame"),
+    ]
+}
@@ -0,0 +1,3 @@
+from .pairing import StereoPairer
+from .backends import CaptureBackend, VideoCaptureBackend, VideoFileBackend, DualPicameraBackend, \
+    SyntheticBackend, create_backend
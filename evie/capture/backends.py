@@ -0,0 +1,331 @@
+import time
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+import cv2
+from evie.core.config import *
+from evie.capture.pairing import StereoPairer
+
+__all__ = ['CaptureBackend', 'VideoCaptureBackend', 'VideoFileBackend', 'DualPicameraBackend', 'SyntheticBackend',
+           'create_backend']
+
+
+class CaptureBackend(ABC):
+    """
+    Interface of the stereo capture backends.
+
+    A backend delivers rectification-ready left and right views into buffers it allocates once. The views
+    returned by `read` stay valid until the next `read`, so consumers must copy what they keep longer.
+    """
+
+    frame_width = 0  # Width of both views side by side
+    frame_height = 0
+    fps = 0.0
+
+    @abstractmethod
+    def read(self) -> tuple[np.ndarray, np.ndarray, float] | None:
+        """Wait for the next stereo pair.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, float] | None
+            Left and right views and the pair's timestamp in seconds, or None if no pair could be captured.
+        """
+
+    def stats(self) -> dict[str, float]:
+        """Frames delivered and dropped, and for paired cameras the timestamp skew of pairs."""
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+class VideoCaptureBackend(CaptureBackend):
+    """
+    Side-by-side stereo camera read with `cv2.VideoCapture`, both views in one frame.
+
+    Frames are decoded into one reused buffer, and the views are its halves. Pairs are synchronized by the
+    camera, timestamps are the time frames were read.
+    """
+
+    def __init__(self, source: 'int | str') -> None:
+        """Open the camera.
+
+        Parameters
+        ----------
+        source : int | str
+            Device index, or anything else `cv2.VideoCapture` opens.
+
+        Returns
+        -------
+        None
+        """
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open stereo capture '{source}'.")
+        self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame = np.empty((self.frame_height, self.frame_width, 3), dtype=np.uint8)
+        mid = self.frame_width // 2
+        self.views = (self.frame[:, :mid], self.frame[:, mid:])
+        self.frames = 0
+        self.failed = 0
+
+    def _timestamp(self) -> float:
+        return time.perf_counter()
+
+    def read(self) -> tuple[np.ndarray, np.ndarray, float] | None:
+        ret, frame = self.cap.read(self.frame)
+        if not ret:
+            self.failed += 1
+            return None
+        if frame is not self.frame:
+            # The decoder could not write in place, e.g. the stream changed format
+            np.copyto(self.frame, frame)
+        self.frames += 1
+        return self.views[0], self.views[1], self._timestamp()
+
+    def stats(self) -> dict[str, float]:
+        return {"frames": self.frames, "failed": self.failed}
+
+    def close(self) -> None:
+        self.cap.release()
+
+
+class VideoFileBackend(VideoCaptureBackend):
+    """
+    Side-by-side stereo video file, played at its frame rate or as fast as it decodes.
+    """
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = True) -> None:
+        """Open the video.
+
+        Parameters
+        ----------
+        path : str
+        realtime : bool
+            Deliver frames at the video's frame rate, otherwise as fast as they are read.
+        loop : bool
+            Start over at the end of the video.
+
+        Returns
+        -------
+        None
+        """
+        super().__init__(path)
+        self.realtime = realtime
+        self.loop = loop
+        self.start = None
+
+    def _timestamp(self) -> float:
+        return self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+
+    def read(self) -> tuple[np.ndarray, np.ndarray, float] | None:
+        pair = super().read()
+        if pair is None and self.loop and self.frames:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.start = None
+            pair = super().read()
+        if pair is None or not self.realtime:
+            return pair
+        # Hold the frame until its time in the video has come
+        if self.start is None:
+            self.start = time.perf_counter() - pair[2]
+        wait = self.start + pair[2] - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        return pair
+
+
+class DualPicameraBackend(CaptureBackend):
+    """
+    Two Raspberry Pi cameras, read with picamera2 and paired by sensor timestamp.
+
+    Each camera is drained on its own thread, copying frames straight from the driver's mapped buffers into
+    the pairer's preallocated slots, so requests go back to the driver right away and nothing is allocated per
+    frame. Both sensors timestamp frames on the same clock, which the pairing relies on.
+    """
+
+    def __init__(self, cameras: tuple[int, int] = (0, 1), size: tuple[int, int] = CAPTURE_SIZE,
+                 fps: float = CAPTURE_FPS, buffers: int = CAPTURE_BUFFERS,
+                 tolerance: float = CAPTURE_PAIR_TOLERANCE) -> None:
+        """Configure and start both cameras.
+
+        Parameters
+        ----------
+        cameras : tuple[int, int]
+            Camera indices of the left and right views.
+        size : tuple[int, int]
+            (width, height) of each view.
+        fps : float
+            Requested frame rate of each camera.
+        buffers : int
+            Frame slots per camera.
+        tolerance : float
+            Largest sensor timestamp difference of a pair, in seconds.
+
+        Returns
+        -------
+        None
+        """
+        from picamera2 import Picamera2
+        width, height = size
+        self.frame_width, self.frame_height, self.fps = 2 * width, height, fps
+        self.pairer = StereoPairer((height, width, 3), np.uint8, buffers, tolerance)
+        self.cameras = []
+        for index in cameras:
+            camera = Picamera2(index)
+            config = camera.create_video_configuration(main={"size": size, "format": "RGB888"})
+            camera.align_configuration(config)
+            camera.configure(config)
+            camera.set_controls({"FrameRate": fps})
+            self.cameras.append(camera)
+
+        self._running = threading.Event()
+        self._running.set()
+        self.threads = [
+            threading.Thread(target=self._drain, args=(side, camera), name=f"evie-camera-{side}", daemon=True)
+            for side, camera in zip((LEFT, RIGHT), self.cameras)
+        ]
+        for camera in self.cameras:
+            camera.start()
+        for thread in self.threads:
+            thread.start()
+
+    def _drain(self, side: int, camera) -> None:
+        from picamera2 import MappedArray
+        height, width = self.pairer.buffers[side].shape[1:3]
+        while self._running.is_set():
+            request = camera.capture_request()
+            try:
+                timestamp = request.get_metadata()["SensorTimestamp"] * 1e-9
+                slot, buffer = self.pairer.acquire(side)
+                with MappedArray(request, "main") as mapped:
+                    # Mapped rows may be padded past the frame width
+                    np.copyto(buffer, mapped.array[:height, :width, :3])
+            finally:
+                request.release()
+            self.pairer.commit(side, slot, timestamp)
+
+    def read(self) -> tuple[np.ndarray, np.ndarray, float] | None:
+        return self.pairer.pair(timeout=1.0)
+
+    def stats(self) -> dict[str, float]:
+        return self.pairer.stats()
+
+    def close(self) -> None:
+        self._running.clear()
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+        for camera in self.cameras:
+            camera.close()
+
+
+class SyntheticBackend(CaptureBackend):
+    """
+    Two simulated free-running cameras, for testing pairing and benchmarking consumers without hardware.
+
+    Each camera runs on its own thread, drawing a moving gradient into the pairer's slots at its frame rate,
+    with a fixed offset between the cameras, random timestamp jitter and randomly lost frames.
+    """
+
+    def __init__(self, size: tuple[int, int] = CAPTURE_SIZE, fps: float = CAPTURE_FPS,
+                 offset: float = 0.001, jitter: float = 0.0005, loss: float = 0.0, buffers: int = CAPTURE_BUFFERS,
+                 tolerance: float = CAPTURE_PAIR_TOLERANCE, seed: int = 0) -> None:
+        """Start both simulated cameras.
+
+        Parameters
+        ----------
+        size : tuple[int, int]
+            (width, height) of each view.
+        fps : float
+            Frame rate of each camera.
+        offset : float
+            Seconds the right camera runs behind the left one.
+        jitter : float
+            Standard deviation of timestamp noise, in seconds.
+        loss : float
+            Probability of a frame being lost.
+        buffers : int
+        tolerance : float
+            See `DualPicameraBackend`.
+        seed : int
+            Random seed of the jitter and losses.
+
+        Returns
+        -------
+        None
+        """
+        width, height = size
+        self.frame_width, self.frame_height, self.fps = 2 * width, height, fps
+        self.pairer = StereoPairer((height, width, 3), np.uint8, buffers, tolerance)
+        self.offset, self.jitter, self.loss = offset, jitter, loss
+        self.rng = [np.random.default_rng(seed + side) for side in (LEFT, RIGHT)]
+        self.ramp = (np.arange(width, dtype=np.uint16) % 256).astype(np.uint8)
+        self.rows = [np.empty(width, dtype=np.uint8) for _ in (LEFT, RIGHT)]
+
+        self._running = threading.Event()
+        self._running.set()
+        self.threads = [
+            threading.Thread(target=self._generate, args=(side,), name=f"evie-synthetic-{side}", daemon=True)
+            for side in (LEFT, RIGHT)
+        ]
+        self.start = time.perf_counter()
+        for thread in self.threads:
+            thread.start()
+
+    def _generate(self, side: int) -> None:
+        rng = self.rng[side]
+        interval = 1.0 / self.fps
+        start = self.start + (self.offset if side == RIGHT else 0.0)
+        frame = 0
+        while self._running.is_set():
+            due = start + frame * interval
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            if rng.random() >= self.loss:
+                slot, buffer = self.pairer.acquire(side)
+                # Gradient shifted by the frame number, the same in both views, drawn in place
+                np.add(self.ramp, np.uint8(frame % 256), out=self.rows[side])
+                buffer[...] = self.rows[side][None, :, None]
+                self.pairer.commit(side, slot, due + rng.normal(0.0, self.jitter))
+            frame += 1
+
+    def read(self) -> tuple[np.ndarray, np.ndarray, float] | None:
+        return self.pairer.pair(timeout=1.0)
+
+    def stats(self) -> dict[str, float]:
+        return self.pairer.stats()
+
+    def close(self) -> None:
+        self._running.clear()
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+
+
+def create_backend(kind: str = CAPTURE_BACKEND, source: 'int | str' = None) -> CaptureBackend:
+    """Create a capture backend.
+
+    Parameters
+    ----------
+    kind : str
+        "cv2" for a side-by-side camera, "video" for a side-by-side video file, "picamera2" for two Raspberry Pi
+        cameras or "synthetic".
+    source : int | str
+        Device index of "cv2", path of "video". Defaults to `STEREO_CAMERA_ID` and `CAPTURE_VIDEO_PATH`.
+
+    Returns
+    -------
+    CaptureBackend
+    """
+    if kind == "cv2":
+        return VideoCaptureBackend(STEREO_CAMERA_ID if source is None else source)
+    if kind == "video":
+        return VideoFileBackend(CAPTURE_VIDEO_PATH if source is None else source)
+    if kind == "picamera2":
+        return DualPicameraBackend()
+    if kind == "synthetic":
+        return SyntheticBackend()
+    raise ValueError(f"Unknown capture backend '{kind}'.")
@@ -0,0 +1,152 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+from evie.core.config import *
+
+__all__ = ['StereoPairer']
+
+
+class StereoPairer:
+    """
+    Pairs frames of two free-running cameras by sensor timestamp.
+
+    Each camera fills slots of its own ring of preallocated buffers: `acquire` a slot, write the frame into it,
+    and `commit` it with its timestamp. `pair` hands out the oldest left and right frames whose timestamps are
+    within the tolerance. A frame older than any possible partner is dropped, as is the oldest waiting frame
+    of a camera that runs out of slots because the consumer is behind.
+
+    The paired slots stay untouched until the next `pair`, so their buffers can be used without copying.
+    """
+
+    def __init__(self, shape: tuple[int, ...], dtype: np.dtype = np.uint8, buffers: int = CAPTURE_BUFFERS,
+                 tolerance: float = CAPTURE_PAIR_TOLERANCE) -> None:
+        """Allocate the rings.
+
+        Parameters
+        ----------
+        shape : tuple[int, ...]
+            Shape of one camera's frames.
+        dtype : np.dtype
+        buffers : int
+            Slots per camera, at least 3: one paired, one waiting and one being written.
+        tolerance : float
+            Largest timestamp difference of a pair, in seconds.
+
+        Returns
+        -------
+        None
+        """
+        buffers = max(buffers, 3)
+        self.buffers = tuple(np.empty((buffers,) + tuple(shape), dtype=dtype) for _ in (LEFT, RIGHT))
+        self.tolerance = tolerance
+        self.free = (deque(range(buffers)), deque(range(buffers)))
+        self.waiting: tuple[deque, deque] = (deque(), deque())  # (timestamp, slot) per camera, oldest first
+        self.held: tuple[int, int] | None = None
+        self.condition = threading.Condition()
+
+        self.pairs = 0
+        self.dropped = [0, 0]
+        self.skew_sum = 0.0
+        self.skew_max = 0.0
+
+    def acquire(self, side: int) -> tuple[int, np.ndarray]:
+        """Slot to write a camera's next frame into.
+
+        Parameters
+        ----------
+        side : int
+            LEFT or RIGHT.
+
+        Returns
+        -------
+        int
+            Slot, passed to `commit`.
+        np.ndarray
+            Buffer of the slot.
+        """
+        with self.condition:
+            if not self.free[side]:
+                # The consumer is behind, overwrite the oldest waiting frame
+                _, slot = self.waiting[side].popleft()
+                self.dropped[side] += 1
+            else:
+                slot = self.free[side].popleft()
+        return slot, self.buffers[side][slot]
+
+    def commit(self, side: int, slot: int, timestamp: float) -> None:
+        """Mark a slot written.
+
+        Parameters
+        ----------
+        side : int
+        slot : int
+        timestamp : float
+            Sensor timestamp of the frame, in seconds, on a clock shared by both cameras.
+
+        Returns
+        -------
+        None
+        """
+        with self.condition:
+            self.waiting[side].append((timestamp, slot))
+            self.condition.notify()
+
+    def _match(self) -> tuple[int, int, float, float] | None:
+        left, right = self.waiting
+        while left and right:
+            (time_l, slot_l), (time_r, slot_r) = left[0], right[0]
+            if abs(time_l - time_r) <= self.tolerance:
+                left.popleft()
+                right.popleft()
+                return slot_l, slot_r, time_l, time_r
+            # The older frame cannot pair with anything later
+            side = LEFT if time_l < time_r else RIGHT
+            _, slot = self.waiting[side].popleft()
+            self.free[side].append(slot)
+            self.dropped[side] += 1
+        return None
+
+    def pair(self, timeout: float = None) -> tuple[np.ndarray, np.ndarray, float] | None:
+        """Wait for the next pair.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds to wait at most, None to wait indefinitely.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, float] | None
+            Left and right buffers, valid until the next call, and the pair's mean timestamp. None on timeout.
+        """
+        with self.condition:
+            if self.held is not None:
+                for side, slot in zip((LEFT, RIGHT), self.held):
+                    self.free[side].append(slot)
+                self.held = None
+            deadline = None if timeout is None else time.monotonic() + timeout
+            match = self._match()
+            while match is None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+                match = self._match()
+            slot_l, slot_r, time_l, time_r = match
+            self.held = (slot_l, slot_r)
+            skew = abs(time_l - time_r)
+            self.pairs += 1
+            self.skew_sum += skew
+            self.skew_max = max(self.skew_max, skew)
+        return self.buffers[LEFT][slot_l], self.buffers[RIGHT][slot_r], (time_l + time_r) / 2
+
+    def stats(self) -> dict[str, float]:
+        """Pairs made, frames dropped per camera, and the mean and largest timestamp skew of pairs, in ms."""
+        return {
+            "pairs": self.pairs,
+            "dropped_l": self.dropped[LEFT],
+            "dropped_r": self.dropped[RIGHT],
+            "skew_mean_ms": self.skew_sum / self.pairs * 1000 if self.pairs else 0.0,
+            "skew_max_ms": self.skew_max * 1000
+        }
@@ -1,11 +1,39 @@
+import os
 import ctypes
 import numpy as np
 
 __all__ = [
-    'SCREEN_WIDTH', 'SCREEN_HEIGHT', 'VSYNC',
+    'SCREEN_WIDTH', 'SCREEN_HEIGHT', 'VSYNC', 'REFRESH_RATE', 'NEAR_PLANE', 'FAR_PLANE',
+    'WINDOW_BACKEND', 'HEADLESS_READBACK',
+    'FRAME_PACING', 'FRAME_PACING_MARGIN', 'FRAME_STATS_CAPACITY',
+    'SIMULATION_THREAD', 'SIMULATION_RATE', 'SIMULATION_MAX_STEPS',
+    'IMU_REPLAY_PATH', 'IMU_RATE', 'IMU_BATCH_INTERVAL', 'IMU_BATCH_SIZE', 'IMU_FILTER_BETA', 'IMU_PREDICTION_MAX',
+    'PROFILER', 'PROFILER_FRAMES', 'PROFILER_MAX_SPANS', 'PROFILER_GPU_LATENCY', 'PROFILER_OVERLAY',
+    'PROFILER_TRACE_PATH',
+    'REPROJECTION', 'REPROJECTION_POSITIONAL',
+    'DYNAMIC_RESOLUTION', 'RESOLUTION_SCALES', 'RESOLUTION_WINDOW', 'RESOLUTION_LOWER_THRESHOLD',
+    'RESOLUTION_RAISE_THRESHOLD', 'RESOLUTION_COOLDOWN', 'RESOLUTION_MISSES',
+    'LENS_DISTORTION_COEFFS', 'LENS_CHROMATIC_SCALE', 'LENS_CENTER_OFFSET', 'LENS_FIT_SCALE',
+    'DISTORTION_MESH_RESOLUTION',
+    'STATIC_BATCHING', 'STATIC_CHUNK_SIZE', 'INDIRECT_DRAW', 'OCCLUSION_CULLING',
+    'LIGHTING', 'LIGHT_CAPACITY', 'LIGHT_CLUSTER_GRID', 'LIGHT_AMBIENT',
+    'DYNAMIC_BUFFER_MODE', 'DYNAMIC_BUFFER_SEGMENTS',
+    'TEXT_FONT', 'TEXT_FONT_SIZE', 'TEXT_CACHE_DIR',
+    'ASSET_ROOT', 'ASSET_BUDGET', 'ASSET_IDLE_FRAMES',
+    'ASSET_STREAMING', 'ASSET_STREAM_WORKERS', 'ASSET_STREAM_PROCESSES', 'ASSET_UPLOAD_BUDGET_MS',
+    'STEREO_CAMERA_ID', 'STEREO_CALIBRATION', 'PASSTHROUGH', 'GRAB_BUFFERS',
+    'CAPTURE_BACKEND', 'CAPTURE_VIDEO_PATH', 'CAPTURE_SIZE', 'CAPTURE_FPS', 'CAPTURE_BUFFERS', 'CAPTURE_PAIR_TOLERANCE',
+    'CAPTURE_RECORD_PATH', 'CAPTURE_REPLAY_PATH', 'RECORDING_COMPRESSION', 'RECORDING_ZLIB_LEVEL',
+    'RECORDING_CHUNK_FRAMES', 'RECORDING_BUFFERS',
+    'DEPTH_MATCHER', 'DEPTH_SCALE', 'DEPTH_ROI', 'DEPTH_NUM_DISPARITIES', 'DEPTH_BLOCK_SIZE',
+    'DEPTH_REUSE_INTERVAL', 'DEPTH_TEMPORAL_ALPHA', 'DEPTH_UNIT_SCALE', 'DEPTH_MAX', 'DEPTH_OCCLUSION',
+    'ODOMETRY', 'ODOMETRY_SCALE', 'ODOMETRY_DETECTOR', 'ODOMETRY_FAST_THRESHOLD', 'ODOMETRY_MAX_FEATURES',
+    'ODOMETRY_MIN_DISTANCE', 'ODOMETRY_KEYFRAME_TRACKS', 'ODOMETRY_KEYFRAME_INTERVAL', 'ODOMETRY_FLOW_WINDOW',
+    'ODOMETRY_FLOW_LEVELS', 'ODOMETRY_ROW_TOLERANCE', 'ODOMETRY_RANSAC_ERROR', 'ODOMETRY_RANSAC_ITERATIONS',
+    'ODOMETRY_MIN_INLIERS', 'ODOMETRY_MIN_INLIER_RATIO', 'ODOMETRY_MAX_DEPTH',
     'LEFT', 'RIGHT',
     'GLOBAL_X', 'GLOBAL_Y', 'GLOBAL_Z',
-    'ENTITY_TYPE', 'UNIFORM_TYPE', 'PIPELINE_TYPE',
+    'ENTITY_TYPE', 'UNIFORM_TYPE', 'PIPELINE_TYPE', 'HUD_LAYER', 'RENDER_PASS',
     'glfw_error_callback'
 ]
 
@@ -14,6 +42,147 @@ __all__ = [
 SCREEN_WIDTH = 2560
 SCREEN_HEIGHT = 1440
 VSYNC = True
+REFRESH_RATE = 60.0  # Display refresh rate in Hz, sets the frame time budget
+NEAR_PLANE = 0.1  # Eye projection clip distances, in meters
+FAR_PLANE = 100.0
+
+# Window backend: "glfw" for the headset display, "egl" or "osmesa" for headless offscreen rendering
+WINDOW_BACKEND = os.environ.get("EVIE_BACKEND", "glfw")
+HEADLESS_READBACK = False  # Read every headless frame back to the CPU, for image-diff tests
+
+# PyOpenGL binds to a platform on first import, so point it at the headless backend before anything imports it.
+# `evie` imports OpenGL as soon as it is imported, so a different backend has to be chosen through EVIE_BACKEND.
+if WINDOW_BACKEND in ("egl", "osmesa"):
+    os.environ["PYOPENGL_PLATFORM"] = WINDOW_BACKEND
+
+# Frame pacing settings
+FRAME_PACING = False  # Sleep before each frame so it starts as late as possible
+FRAME_PACING_MARGIN = 0.002  # Seconds kept free before the predicted vsync
+FRAME_STATS_CAPACITY = 600  # Number of frames kept in the timing statistics
+
+# Simulation settings
+SIMULATION_THREAD = True  # Step the scene on its own thread, rendering from published transform snapshots
+SIMULATION_RATE = 90.0  # Scene steps per second
+SIMULATION_MAX_STEPS = 5  # Most steps run to catch up at once, time beyond is dropped
+
+# Head tracking settings
+IMU_REPLAY_PATH = None  # Recorded IMU log driving the head pose, e.g. "../data/imu.csv", None for a fixed head
+IMU_RATE = 1000.0  # Nominal IMU samples per second
+IMU_BATCH_INTERVAL = 0.004  # Seconds between filter batches, longer wakes the tracker less but ages poses
+IMU_BATCH_SIZE = 64  # Samples per batch when replaying as fast as possible
+IMU_FILTER_BETA = 0.05  # Madgwick filter gain, higher trusts the accelerometer more
+IMU_PREDICTION_MAX = 0.05  # Longest head pose extrapolation, in seconds
+
+# Profiler settings
+PROFILER = False  # Record CPU spans and GPU pass timings every frame, GPU ones need GL 3.3 or ARB_timer_query
+PROFILER_FRAMES = 600  # Number of frames kept by the profiler
+PROFILER_MAX_SPANS = 32  # Maximum CPU spans, and GPU passes, recorded per frame
+PROFILER_GPU_LATENCY = 4  # Frames before GPU timer queries are read back, so reading never stalls
+PROFILER_OVERLAY = False  # Draw a frame time graph inside the headset
+PROFILER_TRACE_PATH = None  # Write a Chrome trace of the last frames here on quit, e.g. "../trace.json"
+
+# Reprojection settings
+REPROJECTION = True  # Warp the last frame to the newest pose when a new frame would miss its vsync
+REPROJECTION_POSITIONAL = False  # Also correct for head translation using the eye depth buffers
+
+# Dynamic resolution settings
+DYNAMIC_RESOLUTION = True  # Scale the eye buffers with the measured frame time
+RESOLUTION_SCALES = (0.5, 0.625, 0.75, 0.875, 1.0)  # Eye buffer scale steps, ascending
+RESOLUTION_WINDOW = 30  # Number of frames in the rolling frame time window
+RESOLUTION_LOWER_THRESHOLD = 0.9  # Step down when frame time exceeds this fraction of the budget
+RESOLUTION_RAISE_THRESHOLD = 0.7  # Step up when frame time stays below this fraction of the budget
+RESOLUTION_COOLDOWN = 30  # Frames to wait after a change before stepping up, or down on missed vsyncs, again
+RESOLUTION_MISSES = 3  # Missed vsyncs within the window that step the scale down
+
+# Lens correction settings
+LENS_DISTORTION_COEFFS = (0.22, 0.24)  # Radial polynomial k1, k2, ... applied as 1 + k1*r^2 + k2*r^4 + ...
+LENS_CHROMATIC_SCALE = (0.994, 1.0, 1.014)  # Per-channel (R, G, B) scale of the distortion
+LENS_CENTER_OFFSET = 0.0  # Horizontal offset of the lens centre towards the nose, in eye NDC units
+LENS_FIT_SCALE = 1.0  # Zoom applied after distortion, > 1 to pull black edges into view
+DISTORTION_MESH_RESOLUTION = (32, 32)  # Grid cells per eye (columns, rows), higher is more accurate
+
+# Static batching settings
+STATIC_BATCHING = True  # Merge static entities sharing a mesh and material into one pre-transformed buffer
+STATIC_CHUNK_SIZE = 8.0  # Edge length in meters of the spatial chunks static batches are culled by
+
+# Indirect drawing settings
+INDIRECT_DRAW = True  # Draw dynamic entities from a shared mesh arena with indirect commands, not one call each
+OCCLUSION_CULLING = True  # Skip entities hidden behind others, for types enabled with set_occlusion_culling
+LIGHTING = True  # Shade with the point lights of GraphicsEngine.lighting, unlit while there are none
+LIGHT_CAPACITY = 256  # Initial number of point lights, grows as needed
+LIGHT_CLUSTER_GRID = (16, 8, 24)  # Light clusters along x, y and depth of each eye's frustum
+LIGHT_AMBIENT = (0.2, 0.2, 0.2)  # Light reaching every surface when lighting is on
+
+# Dynamic vertex buffer settings
+DYNAMIC_BUFFER_MODE = "auto"  # "map" for unsynchronized mapped writes with fences, "orphan", or "auto"
+DYNAMIC_BUFFER_SEGMENTS = 3  # Ring segments, i.e. frames the GPU may lag behind the CPU
+
+# Text settings
+TEXT_FONT = "DejaVuSans.ttf"  # TrueType font for HUD text, PIL's built-in font if not found
+TEXT_FONT_SIZE = 32  # Glyph atlas rasterisation size in pixels
+TEXT_CACHE_DIR = "../cache/fonts"  # Rasterised glyph atlases are cached here
+
+# Asset settings
+# Directory asset paths are relative to, the repository's assets folder unless overridden
+ASSET_ROOT = os.environ.get(
+    "EVIE_ASSET_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "assets")
+)
+ASSET_BUDGET = 512 * 1024 * 1024  # GPU bytes kept by unused assets before least recently used ones are evicted
+ASSET_IDLE_FRAMES = 300  # Frames an entity type may go undrawn before its assets are released
+ASSET_STREAMING = True  # Decode path-registered assets in the background, drawing placeholders meanwhile
+ASSET_STREAM_WORKERS = 2  # Worker threads, or processes, decoding assets
+ASSET_STREAM_PROCESSES = False  # Decode in worker processes instead of threads
+ASSET_UPLOAD_BUDGET_MS = 2.0  # Render thread milliseconds per frame spent uploading decoded assets
+
+# Stereo camera settings
+CAPTURE_BACKEND = None  # "cv2", "picamera2" (two cameras), "video" (file), "synthetic", or None to disable
+STEREO_CAMERA_ID = 0  # cv2 device index of the side-by-side stereo camera
+STEREO_CALIBRATION = "../data/calibration.npz"
+PASSTHROUGH = True  # Draw the camera feed behind the virtual scene
+GRAB_BUFFERS = 3  # Rotating output pairs of StereoCam.grab, a pair is overwritten this many grabs later
+CAPTURE_VIDEO_PATH = "../data/stereo.mp4"  # Side-by-side video read by the "video" backend
+CAPTURE_SIZE = (1440, 1280)  # (width, height) of each view of the "picamera2" and "synthetic" backends
+CAPTURE_FPS = 56.0  # Frame rate of each camera of the "picamera2" and "synthetic" backends
+CAPTURE_BUFFERS = 4  # Frame slots per camera of paired backends, frames beyond are dropped
+CAPTURE_PAIR_TOLERANCE = 0.004  # Largest sensor timestamp difference of a left and right frame, in seconds
+
+# Recording settings
+CAPTURE_RECORD_PATH = None  # Record rectified pairs, timestamps and head poses here, e.g. "../data/session.rec"
+CAPTURE_REPLAY_PATH = None  # Replay a recording in place of the stereo camera
+RECORDING_COMPRESSION = "raw"  # "raw" to replay straight from a memory map, "zlib" for lossless compression
+RECORDING_ZLIB_LEVEL = 1  # zlib level, higher is smaller but slower to write
+RECORDING_CHUNK_FRAMES = 64  # Frames per indexed chunk, a recording cut short keeps its complete chunks
+RECORDING_BUFFERS = 4  # Frames that may wait for the writer thread before new ones are dropped
+
+# Stereo depth settings
+DEPTH_MATCHER = "sgbm"  # "sgbm" (semi-global) or "bm" (block matching, faster)
+DEPTH_SCALE = 0.5  # Downscale factor applied to the ROI before matching
+DEPTH_ROI = None  # (x, y, w, h) in rectified pixels, None for the full frame
+DEPTH_NUM_DISPARITIES = 64  # At full resolution, rounded up to a multiple of 16 after scaling
+DEPTH_BLOCK_SIZE = 7
+DEPTH_REUSE_INTERVAL = 2  # Recompute disparity every N frames, reuse it in between
+DEPTH_TEMPORAL_ALPHA = 0.6  # Weight of the new disparity when blending with the previous one
+DEPTH_UNIT_SCALE = 1e-3  # Calibration units (mm) to scene units (m)
+DEPTH_MAX = 10.0  # Depth beyond this, in scene units, is treated as invalid
+DEPTH_OCCLUSION = True  # Let real-world depth occlude virtual objects
+
+# Stereo visual odometry settings
+ODOMETRY = False  # Track the head pose from calibrated stereo pairs, its position only if an IMU tracks too
+ODOMETRY_SCALE = 0.5  # Downscale factor applied to the views before tracking
+ODOMETRY_DETECTOR = "fast"  # "fast" (FAST corners) or "orb" (ORB detector, slower but multi-scale)
+ODOMETRY_FAST_THRESHOLD = 20  # Corner intensity threshold of the detectors
+ODOMETRY_MAX_FEATURES = 300  # Most landmarks tracked at once
+ODOMETRY_MIN_DISTANCE = 16  # Feature grid cell size in downscaled pixels, one feature per cell
+ODOMETRY_KEYFRAME_TRACKS = 150  # Detect new features when fewer landmarks are tracked
+ODOMETRY_KEYFRAME_INTERVAL = 30  # Detect new features after this many frames at the latest
+ODOMETRY_FLOW_WINDOW = 21  # Optical flow window size, in downscaled pixels
+ODOMETRY_FLOW_LEVELS = 3  # Optical flow pyramid levels above the base image
+ODOMETRY_ROW_TOLERANCE = 1.0  # Largest row difference of a stereo match, in downscaled pixels
+ODOMETRY_RANSAC_ERROR = 2.0  # Largest reprojection error of a PnP inlier, in downscaled pixels
+ODOMETRY_RANSAC_ITERATIONS = 100
+ODOMETRY_MIN_INLIERS = 15  # Tracking is lost with fewer PnP inliers
+ODOMETRY_MIN_INLIER_RATIO = 0.5  # Tracking is lost when fewer of the tracked landmarks are PnP inliers
+ODOMETRY_MAX_DEPTH = 8.0  # Farther features, in scene units, are too uncertain to be landmarks
 
 # LEFT and RIGHT flags for stereoscopic rendering.
 LEFT = 0
@@ -31,11 +200,28 @@ UNIFORM_TYPE = {
     "MODEL": 0,
     "VIEW": 1,
     "PROJECTION": 2,
-    "BASE_COLOR": 3
+    "BASE_COLOR": 3,
+    "VIEWPORT": 4,
+    "OCCLUSION_ENABLED": 5,
+    "OCCLUSION_RECT": 6
 }
 
 PIPELINE_TYPE = {
-    "Standard": 0
+    "Standard": 0,
+    "Distortion": 1
+}
+
+# HUD layers, drawn in this order: world-locked content is placed in the scene, head-locked follows the head
+HUD_LAYER = {
+    "WORLD": 0,
+    "HEAD": 1
+}
+
+# Render queue passes, drawn in this order: opaque front-to-back, transparent back-to-front
+RENDER_PASS = {
+    "OPAQUE": 0,
+    "TRANSPARENT": 1,
+    "OVERLAY": 2
 }
 
 
@@ -1,11 +1,52 @@
 import numpy as np
 
-__all__ = ['vertex']
+__all__ = ['vertex', 'distortion_vertex', 'hud_vertex', 'draw_elements_indirect_command', 'imu_sample',
+           'recording_entry']
 
-# Vertex data type
+# Vertex data type: position, texture coordinate and normal
 vertex = np.dtype({
-    'names': ['x', 'y', 'z', 's', 't'],
-    'formats': [np.float32, np.float32, np.float32, np.float32, np.float32],
+    'names': ['x', 'y', 'z', 's', 't', 'nx', 'ny', 'nz'],
+    'formats': [np.float32] * 8,
+    'offsets': [0, 4, 8, 12, 16, 20, 24, 28],
+    'itemsize': 32  # 8 * 4 bytes
+})
+
+# Lens distortion mesh vertex: screen position and one texture coordinate per color channel
+distortion_vertex = np.dtype({
+    'names': ['x', 'y', 'rs', 'rt', 'gs', 'gt', 'bs', 'bt'],
+    'formats': [np.float32] * 8,
+    'offsets': [0, 4, 8, 12, 16, 20, 24, 28],
+    'itemsize': 32  # 8 * 4 bytes
+})
+
+# HUD vertex: position, texture coordinate and RGBA color
+hud_vertex = np.dtype({
+    'names': ['x', 'y', 'z', 's', 't', 'r', 'g', 'b', 'a'],
+    'formats': [np.float32] * 9,
+    'offsets': [0, 4, 8, 12, 16, 20, 24, 28, 32],
+    'itemsize': 36  # 9 * 4 bytes
+})
+
+# Indirect draw command, laid out as OpenGL's DrawElementsIndirectCommand
+draw_elements_indirect_command = np.dtype({
+    'names': ['count', 'instance_count', 'first_index', 'base_vertex', 'base_instance'],
+    'formats': [np.uint32, np.uint32, np.uint32, np.int32, np.uint32],
     'offsets': [0, 4, 8, 12, 16],
     'itemsize': 20  # 5 * 4 bytes
 })
+
+# IMU sample: timestamp in seconds, angular velocity in rad/s and acceleration in any unit, in sensor axes
+imu_sample = np.dtype({
+    'names': ['t', 'gx', 'gy', 'gz', 'ax', 'ay', 'az'],
+    'formats': [np.float64] + [np.float32] * 6,
+    'offsets': [0, 8, 12, 16, 20, 24, 28],
+    'itemsize': 32  # 8 + 6 * 4 bytes
+})
+
+# Recording index entry: capture time, file offset and byte sizes of both views, and the head pose at capture
+recording_entry = np.dtype({
+    'names': ['t', 'offset', 'size_l', 'size_r', 'position', 'rotation'],
+    'formats': [np.float64, np.uint64, np.uint32, np.uint32, (np.float32, 3), (np.float32, (3, 3))],
+    'offsets': [0, 8, 16, 20, 24, 36],
+    'itemsize': 72  # 8 + 8 + 2 * 4 + 3 * 4 + 9 * 4 bytes
+})
@@ -1,15 +1,39 @@
 import numpy as np
 from scipy.spatial.transform import Rotation
 
-__all__ = ['Entity', 'Cube']
+__all__ = ['Entity', 'Cube', 'model_matrices']
 
 
 class Entity:
 
+    # Per entity class, bumped whenever one of its entities becomes or stops being static, or a static one is
+    # transformed, so the engine only rebuilds the static batches holding that class
+    static_versions: dict[type, int] = {}
+
     def __init__(self):
         self._pos_mat = np.identity(4, dtype=np.float32)
         self._rot_mat = np.identity(4, dtype=np.float32)
         self._scale_mat = np.identity(4, dtype=np.float32)
+        self._static = False
+
+    @property
+    def static(self) -> bool:
+        """Whether the entity never moves. Static entities are merged into batches and not updated."""
+        return self._static
+
+    @static.setter
+    def static(self, static: bool):
+        if static != self._static:
+            self._static = static
+            self._static_changed()
+
+    def _static_changed(self) -> None:
+        cls = type(self)
+        Entity.static_versions[cls] = Entity.static_versions.get(cls, 0) + 1
+
+    def _transformed(self) -> None:
+        if self._static:
+            self._static_changed()
 
     @property
     def position(self):
@@ -18,6 +42,7 @@ class Entity:
     @position.setter
     def position(self, vec3: np.ndarray):
         self._pos_mat[:3, 3] = vec3.astype(np.float32)
+        self._transformed()
 
     @property
     def rotation(self):
@@ -26,6 +51,7 @@ class Entity:
     @rotation.setter
     def rotation(self, mat3: np.ndarray):
         self._rot_mat[:3, :3] = mat3.astype(np.float32)
+        self._transformed()
 
     @property
     def scale(self):
@@ -34,6 +60,7 @@ class Entity:
     @scale.setter
     def scale(self, vec3: np.ndarray):
         self._scale_mat[:3, :3] = np.diag(vec3.astype(np.float32))
+        self._transformed()
 
     @property
     def model_matrix(self):
@@ -58,6 +85,26 @@ class Entity:
         pass
 
 
+def model_matrices(entities: list[Entity]) -> np.ndarray:
+    """Model matrices of many entities at once.
+
+    Parameters
+    ----------
+    entities : list[Entity]
+
+    Returns
+    -------
+    np.ndarray
+        (n, 4, 4) float32 matrices, transposed for OpenGL like `Entity.model_matrix`.
+    """
+    if not entities:
+        return np.zeros((0, 4, 4), dtype=np.float32)
+    positions = np.stack([entity._pos_mat for entity in entities])
+    rotations = np.stack([entity._rot_mat for entity in entities])
+    scales = np.stack([entity._scale_mat for entity in entities])
+    return (positions @ rotations @ scales).transpose(0, 2, 1)
+
+
 class Cube(Entity):
     """
     The beloved default cube.
@@ -1,142 +1,206 @@
-import glfw
-from glfw.GLFW import *
+import os
+import numpy as np
 from evie.core.config import *
 from evie.rendering.engine import *
 from evie.rendering.scene import Scene
+from evie.rendering.simulation import Simulation, SimulationThread
+from evie.rendering.resolution import ResolutionController
+from evie.rendering.pacing import FrameScheduler
+from evie.rendering.profiler import FrameProfiler
+from evie.rendering.window import create_window
+from evie.stereocam import StereoCam
+from evie.capture import create_backend
+from evie.tracking import ImuReplay, ImuTracker
+from evie.vision import StereoDepth, StereoOdometry, CaptureWorker, StereoRecorder, RecordingReplay
 
 __all__ = ['App']
 
 
 class App:
 
-    __slots__ = ["window", "renderer", "scene", "_keys", "poll_interval", "last_time", "frame_count", "frametime"]
+    __slots__ = ["window", "renderer", "scene", "stereo_cam", "depth", "capture", "resolution", "scheduler",
+                 "profiler", "simulation", "simulation_thread", "tracker", "odometry", "odometry_alignment"]
 
-    def __init__(self):
+    def __init__(self, backend: str = WINDOW_BACKEND, simulation_thread: bool = SIMULATION_THREAD):
         """
         Initialise the app
-        """
-        self._init_glfw()
-        self._keys = {}
-        self._init_input_handlers()
 
-        # Set up timers
-        self.poll_interval = 10  # Number of frames before FPS and frame time are updated
-        self.last_time = glfw.get_time()
-        self.frame_count = 0
-        self.frametime = 0
+        Parameters
+        ----------
+        backend : str
+            Window backend, "glfw" for the headset display or "egl"/"osmesa" for headless rendering.
+        simulation_thread : bool
+            Step the scene on its own thread. Otherwise it is stepped by `run`, between frames.
+        """
+        self.window = create_window(backend)
 
         # TODO: Make this cleaner
         self.scene = Scene()
-        self.renderer = GraphicsEngine()
+        self.profiler = FrameProfiler()
+        self.renderer = GraphicsEngine(self.profiler)
+        self.renderer.display_framebuffer = self.window.framebuffer
+        self.resolution = ResolutionController() if DYNAMIC_RESOLUTION else None
+        self.scheduler = FrameScheduler(clock=self.window.get_time)
 
-    def _init_glfw(self):
-        """Initialise the windowing system with GLFW
-        Returns
-        -------
-        None
-        """
-        # Set the error callback
-        glfw.set_error_callback(glfw_error_callback)
-
-        # Initialise GLFW
-        if not glfw.init():
-            raise Exception("Failed to initialise GLFW")
-        glfw.window_hint(GLFW_CONTEXT_VERSION_MAJOR, 3)
-        glfw.window_hint(GLFW_CONTEXT_VERSION_MINOR, 1)
-        glfw.window_hint(GLFW_OPENGL_FORWARD_COMPAT, GLFW_TRUE)
-
-        self.window = glfw.create_window(SCREEN_WIDTH, SCREEN_HEIGHT, "EVIE", glfw.get_primary_monitor(), None)
-        if not self.window:
-            glfw.terminate()
-            raise Exception("Failed to create window")
-
-        glfw.make_context_current(self.window)
-        # Enable VSYNC
-        if VSYNC:
-            glfw.swap_interval(1)
-        else:
-            glfw.swap_interval(0)
+        # The scene steps at a fixed rate, on its own thread or between frames, and the render loop draws
+        # transforms interpolated between the last two steps
+        self.simulation = Simulation(self.scene, clock=self.window.get_time)
+        self.simulation.start()
+        self.simulation_thread = None
+        if simulation_thread:
+            self.simulation_thread = SimulationThread(self.simulation)
+            self.simulation_thread.start()
 
-    def _init_input_handlers(self):
-        """Initialise input handlers
+        self._init_tracking()
+        self._init_capture()
 
-        Sets up mouse and keyboard input handlers.
+    def _init_tracking(self):
+        """Start head tracking from a recorded IMU log
+
+        The tracker fuses samples on its own thread, and the scene latches its predicted pose every frame.
 
         Returns
         -------
         None
         """
-        # Mouse/cursor input
-        glfw.set_input_mode(self.window, GLFW_CURSOR, GLFW_CURSOR_HIDDEN)
-        # Keyboard input
-        glfw.set_key_callback(self.window, self._key_callback)
+        self.tracker = None
+        if IMU_REPLAY_PATH is None:
+            return
 
-    def _key_callback(self, window, key, scancode, action, mods):
-        """
-        Handle a key event
-        Parameters
-        ----------
-        window :
-            The window the event occurred in.
-        key :
-            The key that was pressed or released.
-        scancode :
-            The system-specific scancode of the key.
-        action :
-            The action that was taken (press, release, etc.).
-        mods :
-            Any modifier keys that were pressed.
+        source = ImuReplay(IMU_REPLAY_PATH, clock=self.window.get_time, loop=True)
+        self.tracker = ImuTracker(source, position=self.scene.midpoint.copy())
+        self.tracker.start()
+        self.scene.pose_source = self.tracker.predict
+
+    def _init_capture(self):
+        """Start the stereo camera capture worker
+
+        The worker grabs rectified pairs and computes depth and visual odometry on its own thread, so the render
+        loop never waits on the camera. A recording can stand in for the camera, and pairs can be recorded with
+        the head pose. Odometry drives the head pose, or only its position when the IMU tracks the orientation.
 
         Returns
         -------
         None
         """
-        key_state = (action == GLFW_PRESS)
-        self._keys[key] = key_state
-
-    def _calculate_fps(self):
-        """Calculate the frames per second
+        self.stereo_cam, self.depth, self.odometry, self.capture = None, None, None, None
+        # Rotation from the odometry's axes, those of its first frame, into the IMU tracker's scene axes
+        self.odometry_alignment = None
+        if CAPTURE_REPLAY_PATH is not None:
+            self.stereo_cam = RecordingReplay(CAPTURE_REPLAY_PATH, clock=self.window.get_time, loop=True)
+        elif CAPTURE_BACKEND is not None:
+            self.stereo_cam = StereoCam(backend=create_backend(CAPTURE_BACKEND))
+            # Synthetic frames and uncalibrated rigs go without rectification and depth
+            if os.path.exists(STEREO_CALIBRATION):
+                self.stereo_cam.load_calibration(STEREO_CALIBRATION)
+                self.stereo_cam.undistort = True
+        else:
+            return
+
+        recorder = None
+        if CAPTURE_RECORD_PATH is not None:
+            q = self.stereo_cam.q
+            recorder = StereoRecorder(CAPTURE_RECORD_PATH, metadata={"q": q.tolist() if q is not None else None})
+        pose_source = self.tracker.predict if self.tracker is not None else None
+
+        processors = {}
+        if self.stereo_cam.q is not None:
+            self.depth = StereoDepth(self.stereo_cam.q)
+            processors["depth"] = self.depth
+        if ODOMETRY and self.stereo_cam.q is not None:
+            self.odometry = StereoOdometry(self.stereo_cam.q, origin=self.scene.midpoint.copy())
+            processors["odometry"] = self.odometry
+            if self.tracker is None:
+                self.scene.pose_source = self.odometry.predict
+        self.capture = CaptureWorker(self.stereo_cam, processors, recorder, pose_source, clock=self.window.get_time)
+        self.capture.start()
+
+    def _update_capture(self):
+        """Hand the latest capture results to the renderer
 
         Returns
         -------
         None
         """
-        self.frame_count += 1
-        if (self.frame_count % self.poll_interval) == 0:
-            current_time = glfw.get_time()
-            elapsed_time = current_time - self.last_time
-
-            fps = self.frame_count / elapsed_time
-            self.frametime = (elapsed_time / self.frame_count)
-
-            # STDOUT the FPS and frame time
-            print(f"FPS: {fps}, Frame Time: {self.frametime * 1000} ms")
-
-            self.last_time = current_time
-            self.frame_count = 0
-
-    def run(self):
+        if self.capture is None:
+            return
+        result = self.capture.latest
+        if result is not None:
+            if PASSTHROUGH:
+                self.renderer.set_passthrough(result.img_l, result.img_r, result.frame_id)
+            if self.depth is not None:
+                self.renderer.set_occlusion_depth(result.outputs["depth"], result.output_frames["depth"],
+                                                  self.depth.roi_uv)
+            if self.odometry is not None and self.tracker is not None:
+                pose = result.outputs["odometry"]
+                if pose.valid and self.odometry_alignment is None and self.tracker.latest is not None:
+                    # Both rotations describe the same head at capture, so they differ by the change of axes
+                    _, rotation = self.tracker.predict(result.timestamp)
+                    self.odometry_alignment = rotation.T @ pose.rotation
+                if pose.valid and self.odometry_alignment is not None:
+                    origin = self.odometry.origin
+                    position = origin + self.odometry_alignment @ (pose.position - origin)
+                    self.tracker.position = position.astype(np.float32)
+
+    def run(self, frames: int = None):
         """Run the main application loop
 
+        Parameters
+        ----------
+        frames : int
+            Number of frames to run for, or None to run until the window is closed.
+
         Returns
         -------
         None
         """
         running = True
+        frame = 0
+        profiler = self.profiler
         while running:
-            glfw.poll_events()
-
-            if glfw.window_should_close(self.window) or self._keys.get(GLFW_KEY_ESCAPE, False):
+            profiler.begin_frame()
+            # Start as late as the vsync prediction allows
+            with profiler.span("wait"):
+                self.scheduler.wait()
+            frame_start = self.window.get_time()
+            with profiler.span("poll"):
+                self.window.poll_events()
+            self.scheduler.begin_frame()
+
+            frame += 1
+            if self.window.should_close() or (frames is not None and frame >= frames):
                 running = False
 
             # TODO: Add loop logic here
-            self.scene.update(self.frametime)
-            # Render both eyes
-            self.renderer.render(self.scene.cameras, self.scene.entities)
-
-            glfw.swap_buffers(self.window)
-
-            self._calculate_fps()
+            with profiler.span("update"):
+                if self.simulation_thread is None:
+                    self.simulation.advance()
+                self._update_capture()
+            # Latch the freshest pose right before the view matrices are uploaded
+            self.scene.latch_pose(self.scheduler.predicted_display_time)
+            self.scheduler.latch()
+            # Render both eyes, or warp the last frame to the new pose if a render would miss the vsync
+            reprojected = self.renderer.can_reproject() and self.scheduler.should_reproject()
+            if reprojected:
+                with profiler.span("reproject"):
+                    self.renderer.reproject(self.scene.cameras)
+            else:
+                render_start = self.window.get_time()
+                with profiler.span("render"):
+                    entities, models = self.simulation.interpolate(frame_start)
+                    self.renderer.render(self.scene.cameras, entities, models)
+                self.scheduler.record_render(self.window.get_time() - render_start)
+
+            work_time = self.window.get_time() - frame_start
+
+            with profiler.span("swap"):
+                self.window.swap_buffers()
+            self.scheduler.end_frame(work_time)
+
+            # Adapt the eye buffer resolution to the measured frame time
+            if self.resolution is not None:
+                missed = VSYNC and self.scheduler.last_missed > 0
+                self.renderer.set_resolution_scale(self.resolution.record(work_time, missed, reprojected))
 
     def quit(self):
         """Clean up the application
@@ -145,11 +209,15 @@ class App:
         -------
         None
         """
+        if self.simulation_thread is not None:
+            self.simulation_thread.stop()
+        if self.tracker is not None:
+            self.tracker.stop()
+        if self.capture is not None:
+            self.capture.stop()
+            self.stereo_cam.close()
+        if PROFILER_TRACE_PATH is not None and self.profiler.enabled:
+            self.profiler.export_chrome_trace(PROFILER_TRACE_PATH)
         self.renderer.destroy()
-        glfw.destroy_window(self.window)
-        glfw.terminate()
-
+        self.window.destroy()
 
-my_app = App()
-my_app.run()
-my_app.quit()
@@ -0,0 +1,307 @@
+from collections import OrderedDict
+from typing import Callable
+from evie.core.config import *
+from evie.rendering.mesh import Mesh, ObjMesh
+from evie.rendering.material import Material
+from evie.rendering.shader import Shader
+from evie.rendering.streaming import AssetStreamer, decode_mesh, decode_material
+from evie.utils import asset_path
+
+__all__ = ['AssetManager']
+
+
+class _Asset:
+    """
+    Registry entry of one loaded resource.
+    """
+    __slots__ = ("key", "resource", "references", "nbytes")
+
+    def __init__(self, key: tuple, resource: object, nbytes: int):
+        self.key = key
+        self.resource = resource
+        self.references = 0
+        self.nbytes = nbytes
+
+
+class AssetManager:
+    """
+    Loads meshes, materials and shaders by path on first use and shares them between users.
+
+    Every `mesh`, `material` and `shader` call takes a reference, returned with `release`. Resources nobody
+    references stay resident as a cache, until the GPU memory of all resident resources exceeds the budget; then
+    unreferenced resources are destroyed, least recently used first. Referenced resources are never evicted.
+
+    `request_mesh` and `request_material` load without blocking instead: files are decoded by an `AssetStreamer`
+    and uploaded by `upload`, called once per frame on the render thread. A requested asset is not evicted
+    before it is requested again and handed out, unless the request is dropped with `cancel`.
+
+    Paths are relative to `ASSET_ROOT`.
+    """
+
+    def __init__(self, budget: int = ASSET_BUDGET, streamer: AssetStreamer = None) -> None:
+        """Create an asset manager.
+
+        Parameters
+        ----------
+        budget : int
+            GPU bytes above which unreferenced resources are evicted.
+        streamer : AssetStreamer
+            Worker pool decoding requested assets. Started on the first request if omitted.
+
+        Returns
+        -------
+        None
+        """
+        self.budget = budget
+        # Least recently used first
+        self.assets: OrderedDict[tuple, _Asset] = OrderedDict()
+        self.keys: dict[int, tuple] = {}  # id(resource): key
+        self.resident_bytes = 0
+        self.streamer = streamer
+        # Keys requested but not handed out yet, kept from eviction
+        self.requested: set[tuple] = set()
+
+    def _register(self, key: tuple, resource: object) -> _Asset:
+        asset = _Asset(key, resource, getattr(resource, "nbytes", 0))
+        self.assets[key] = asset
+        self.keys[id(resource)] = key
+        self.resident_bytes += asset.nbytes
+        self.collect()
+        return asset
+
+    def _acquire(self, key: tuple, load: Callable[[], object]) -> object:
+        asset = self.assets.get(key)
+        if asset is None:
+            asset = self._register(key, load())
+        asset.references += 1
+        self.assets.move_to_end(key)
+        return asset.resource
+
+    def _request(self, key: tuple, decode: Callable[[str], object]) -> object | None:
+        asset = self.assets.get(key)
+        if asset is not None:
+            self.requested.discard(key)
+            asset.references += 1
+            self.assets.move_to_end(key)
+            return asset.resource
+        if self.streamer is None:
+            self.streamer = AssetStreamer()
+        error = self.streamer.failed.pop(key, None)
+        if error is not None:
+            self.requested.discard(key)
+            raise error
+        self.requested.add(key)
+        self.streamer.submit(key, decode, key[1])
+        return None
+
+    def mesh(self, path: str) -> Mesh:
+        """Get the mesh of an .obj file, loading it if needed.
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+        Mesh
+        """
+        path = asset_path(path)
+        return self._acquire(("mesh", path), lambda: ObjMesh(path))
+
+    def material(self, path: str) -> Material:
+        """Get the material of an image file, loading it if needed.
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+        Material
+        """
+        path = asset_path(path)
+        return self._acquire(("material", path), lambda: Material(path))
+
+    def request_mesh(self, path: str) -> Mesh | None:
+        """Get the mesh of an .obj file if resident, otherwise start streaming it in.
+
+        A reference is taken only when the mesh is returned.
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+        Mesh | None
+            The mesh, or None while it is still loading.
+
+        Raises
+        ------
+        Exception
+            Whatever decoding the file raised, once.
+        """
+        return self._request(("mesh", asset_path(path)), decode_mesh)
+
+    def request_material(self, path: str) -> Material | None:
+        """Get the material of an image file if resident, otherwise start streaming it in.
+
+        A reference is taken only when the material is returned.
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+        Material | None
+            The material, or None while it is still loading.
+
+        Raises
+        ------
+        Exception
+            Whatever decoding the file raised, once.
+        """
+        return self._request(("material", asset_path(path)), decode_material)
+
+    def cancel(self, kind: str, path: str) -> None:
+        """Drop a request made with `request_mesh` or `request_material`, letting its asset be evicted.
+
+        Parameters
+        ----------
+        kind : str
+            "mesh" or "material".
+        path : str
+
+        Returns
+        -------
+        None
+        """
+        self.requested.discard((kind, asset_path(path)))
+
+    def upload(self, budget_ms: float = ASSET_UPLOAD_BUDGET_MS) -> int:
+        """Upload streamed assets decoded since the last call, within a time budget. Call on the render thread.
+
+        Uploaded assets are resident but unreferenced until requested again, and kept from eviction until then.
+
+        Parameters
+        ----------
+        budget_ms : float
+            Milliseconds to spend on uploads.
+
+        Returns
+        -------
+        int
+            Number of assets uploaded.
+        """
+        if self.streamer is None:
+            return 0
+        return self.streamer.upload(self._create, budget_ms)
+
+    def _create(self, key: tuple, data: object) -> None:
+        if key in self.assets:
+            return
+        if key[0] == "mesh":
+            vertex_data, index_data = data
+            self._register(key, Mesh(vertex_data, index_data))
+        else:
+            self._register(key, Material(image=data))
+
+    def shader(self, vertex_path: str, fragment_path: str) -> Shader:
+        """Get a shader program, compiling it if needed.
+
+        Parameters
+        ----------
+        vertex_path : str
+        fragment_path : str
+
+        Returns
+        -------
+        Shader
+        """
+        vertex_path, fragment_path = asset_path(vertex_path), asset_path(fragment_path)
+        return self._acquire(("shader", vertex_path, fragment_path), lambda: Shader(vertex_path, fragment_path))
+
+    def touch(self, resource: object) -> None:
+        """Mark a resource as used, e.g. drawn this frame.
+
+        Parameters
+        ----------
+        resource : object
+
+        Returns
+        -------
+        None
+        """
+        key = self.keys.get(id(resource))
+        if key is not None:
+            self.assets.move_to_end(key)
+
+    def release(self, resource: object) -> None:
+        """Return a reference taken by `mesh`, `material` or `shader`.
+
+        The resource stays resident until evicted.
+
+        Parameters
+        ----------
+        resource : object
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        KeyError
+            If the resource is not managed by this asset manager.
+        """
+        asset = self.assets[self.keys[id(resource)]]
+        asset.references = max(asset.references - 1, 0)
+        self.collect()
+
+    def collect(self) -> int:
+        """Evict unreferenced resources, least recently used first, until the budget is met.
+
+        Resources streamed in for a pending request are kept.
+
+        Returns
+        -------
+        int
+            GPU bytes freed.
+        """
+        freed = 0
+        if self.resident_bytes <= self.budget:
+            return freed
+        for key in [key for key, asset in self.assets.items() if asset.references == 0 and key not in self.requested]:
+            if self.resident_bytes <= self.budget:
+                break
+            freed += self._evict(key)
+        return freed
+
+    def _evict(self, key: tuple) -> int:
+        asset = self.assets.pop(key)
+        del self.keys[id(asset.resource)]
+        asset.resource.destroy()
+        self.resident_bytes -= asset.nbytes
+        return asset.nbytes
+
+    def stats(self) -> dict[str, int]:
+        """Counts of resident and referenced resources, and resident GPU bytes."""
+        return {
+            "resident": len(self.assets),
+            "referenced": sum(asset.references > 0 for asset in self.assets.values()),
+            "resident_bytes": self.resident_bytes,
+            "budget": self.budget
+        }
+
+    def destroy(self) -> None:
+        """Destroy every resident resource, referenced or not, and stop streaming.
+
+        Returns
+        -------
+        None
+        """
+        if self.streamer is not None:
+            self.streamer.destroy()
+        for key in list(self.assets):
+            self._evict(key)
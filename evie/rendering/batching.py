@@ -0,0 +1,114 @@
+import numpy as np
+from OpenGL.GL import *
+from evie.core.config import *
+import evie.core.datatypes as dt
+from evie.rendering.mesh import Mesh, index_type
+from evie.objects.entity import Entity
+from evie.utils import aabb_in_frustum
+
+__all__ = ['StaticBatch']
+
+
+class StaticBatch(Mesh):
+    """
+    Static entities of one type merged into a single pre-transformed vertex and index buffer.
+
+    Entities are grouped into spatial chunks of `chunk_size` meters, each a contiguous index range with its own
+    bounding box, so chunks outside the view frustum are skipped. Neighbouring visible chunks are drawn with a
+    single call, so a fully visible batch costs one draw.
+    """
+
+    def __init__(self, mesh: Mesh, entities: list[Entity], chunk_size: float = STATIC_CHUNK_SIZE) -> None:
+        """Build the batch.
+
+        Parameters
+        ----------
+        mesh : Mesh
+            Mesh shared by the entities.
+        entities : list[Entity]
+            Static entities, baked with their current model matrices.
+        chunk_size : float
+            Edge length of the spatial cells entities are grouped by.
+
+        Returns
+        -------
+        None
+        """
+        source_vertices, source_indices = mesh.vertex_data, mesh.index_data.astype(np.int64)
+        vertex_count = len(source_vertices)
+
+        # Group entities by spatial cell, so each chunk is a contiguous run
+        positions = np.array([entity.position for entity in entities], dtype=np.float64)
+        _, cells = np.unique(np.floor(positions / chunk_size).astype(np.int64), axis=0, return_inverse=True)
+        cells = cells.ravel()
+        order = np.argsort(cells, kind='stable')
+        models = np.array([entities[i].model_matrix for i in order], dtype=np.float32)
+
+        # Models are stored transposed, so row vectors multiply on the left
+        local = np.ones((vertex_count, 4), dtype=np.float32)
+        local[:, 0], local[:, 1], local[:, 2] = source_vertices['x'], source_vertices['y'], source_vertices['z']
+        world = np.einsum('vi,nij->nvj', local, models)
+
+        vertices = np.empty((len(entities), vertex_count), dtype=dt.vertex)
+        vertices['x'], vertices['y'], vertices['z'] = world[..., 0], world[..., 1], world[..., 2]
+        vertices['s'], vertices['t'] = source_vertices['s'], source_vertices['t']
+
+        # Normals go through the inverse transpose, so non-uniform scales keep them perpendicular
+        normals = np.stack((source_vertices['nx'], source_vertices['ny'], source_vertices['nz']), axis=1)
+        normal_matrices = np.linalg.inv(models[:, :3, :3]).transpose(0, 2, 1)
+        world_normals = np.einsum('vi,nij->nvj', normals, normal_matrices)
+        world_normals /= np.maximum(np.linalg.norm(world_normals, axis=2, keepdims=True), 1e-12)
+        for i, name in enumerate(('nx', 'ny', 'nz')):
+            vertices[name] = world_normals[..., i]
+
+        dtype = index_type(len(entities) * vertex_count)[0]
+        indices = (source_indices[None, :] + vertex_count * np.arange(len(entities))[:, None]).astype(dtype)
+
+        super().__init__(vertices.ravel(), indices.ravel())
+        # The merged data lives on the GPU only
+        self.vertex_data = self.index_data = None
+
+        # Chunk index ranges and bounds
+        sorted_cells = cells[order]
+        starts = np.flatnonzero(np.diff(sorted_cells, prepend=-1))
+        lengths = np.diff(np.append(starts, len(entities)))
+        per_entity = len(source_indices)
+        self.chunk_first = starts * per_entity
+        self.chunk_count = lengths * per_entity
+        self.chunk_min = np.minimum.reduceat(world[..., :3].min(axis=1), starts)
+        self.chunk_max = np.maximum.reduceat(world[..., :3].max(axis=1), starts)
+        self.entity_count = len(entities)
+
+    def draw_visible(self, planes: np.ndarray) -> int:
+        """Draw the chunks intersecting a view frustum.
+
+        Parameters
+        ----------
+        planes : np.ndarray
+            Frustum planes from `evie.utils.frustum_planes`.
+
+        Returns
+        -------
+        int
+            Number of draw calls issued.
+
+        Raises
+        ------
+        RuntimeError
+            If the vertex array object is not armed.
+        """
+        if not self.is_armed:
+            raise RuntimeError("Vertex Array Object is not armed. Call the `arm` method before drawing.")
+        visible = aabb_in_frustum(planes, self.chunk_min, self.chunk_max)
+        if not visible.any():
+            return 0
+
+        # Runs of consecutive visible chunks are contiguous in the index buffer
+        edges = np.diff(np.concatenate(([False], visible, [False])).astype(np.int8))
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)
+        firsts = self.chunk_first[run_starts]
+        counts = self.chunk_first[run_ends - 1] + self.chunk_count[run_ends - 1] - firsts
+        for first, count in zip(firsts.tolist(), counts.tolist()):
+            glDrawElements(GL_TRIANGLES, count, self.index_type, ctypes.c_void_p(first * self.index_size))
+        return len(firsts)
@@ -0,0 +1,190 @@
+import numpy as np
+from OpenGL.GL import *
+import evie.core.datatypes as dt
+from evie.core.config import *
+from evie.rendering.shader import Shader
+from evie.rendering.framebuffer import RenderTarget
+from evie.utils import asset_path
+
+__all__ = ['build_distortion_mesh', 'DistortionPass']
+
+
+def build_distortion_mesh(resolution: tuple[int, int], coefficients: tuple[float, ...],
+                          chromatic_scale: tuple[float, float, float], center: tuple[float, float] = (0.0, 0.0),
+                          aspect: float = 1.0, fit_scale: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+    """Build a lens distortion mesh for one eye.
+
+    The mesh covers the eye viewport in NDC. Each vertex stores the eye buffer texture coordinate to sample for
+    each color channel, so the radial polynomial is only evaluated once per vertex instead of once per pixel.
+
+    Parameters
+    ----------
+    resolution : tuple[int, int]
+        Number of grid cells (columns, rows).
+    coefficients : tuple[float, ...]
+        Radial distortion coefficients k1, k2, ... The distortion factor is 1 + k1*r^2 + k2*r^4 + ...
+    chromatic_scale : tuple[float, float, float]
+        Per-channel scale of the distortion, correcting lateral chromatic aberration.
+    center : tuple[float, float]
+        Lens centre in NDC.
+    aspect : float
+        Width over height of the eye viewport. Radii are measured in units of half the viewport height.
+    fit_scale : float
+        Zoom applied after distortion.
+
+    Returns
+    -------
+    np.ndarray[dt.distortion_vertex]
+        Mesh vertices.
+    np.ndarray[np.uint32]
+        Triangle indices.
+    """
+    cols, rows = resolution
+    x, y = np.meshgrid(np.linspace(-1.0, 1.0, cols + 1, dtype=np.float32),
+                       np.linspace(-1.0, 1.0, rows + 1, dtype=np.float32))
+    dx = x - center[0]
+    dy = y - center[1]
+    r2 = (dx * aspect) ** 2 + dy ** 2
+
+    factor = np.ones_like(r2)
+    r_power = np.ones_like(r2)
+    for k in coefficients:
+        r_power *= r2
+        factor += k * r_power
+    factor /= fit_scale
+
+    vertex_data = np.zeros(x.size, dtype=dt.distortion_vertex)
+    vertex_data['x'] = x.ravel()
+    vertex_data['y'] = y.ravel()
+    for channel, scale in zip("rgb", chromatic_scale):
+        vertex_data[channel + 's'] = ((center[0] + dx * factor * scale + 1.0) * 0.5).ravel()
+        vertex_data[channel + 't'] = ((center[1] + dy * factor * scale + 1.0) * 0.5).ravel()
+
+    # Two triangles per grid cell
+    stride = cols + 1
+    corner = (np.arange(rows)[:, None] * stride + np.arange(cols)[None, :]).ravel()
+    index_data = np.column_stack((
+        corner, corner + 1, corner + stride + 1,
+        corner + stride + 1, corner + stride, corner
+    )).astype(np.uint32).ravel()
+
+    return vertex_data, index_data
+
+
+class DistortionPass:
+    """
+    Final pass warping the eye buffers onto the display through a precomputed distortion mesh.
+    """
+
+    def __init__(self, eye_width: int, eye_height: int,
+                 resolution: tuple[int, int] = DISTORTION_MESH_RESOLUTION,
+                 coefficients: tuple[float, ...] = LENS_DISTORTION_COEFFS,
+                 chromatic_scale: tuple[float, float, float] = LENS_CHROMATIC_SCALE,
+                 center_offset: float = LENS_CENTER_OFFSET,
+                 fit_scale: float = LENS_FIT_SCALE) -> None:
+        """Create the distortion pass.
+
+        Parameters
+        ----------
+        eye_width : int
+            Width of one eye on the display, in pixels.
+        eye_height : int
+            Height of one eye on the display, in pixels.
+        resolution : tuple[int, int]
+            Distortion mesh resolution (columns, rows). Higher is more accurate but costs more vertices.
+        coefficients : tuple[float, ...]
+            Radial distortion coefficients.
+        chromatic_scale : tuple[float, float, float]
+            Per-channel distortion scale.
+        center_offset : float
+            Horizontal offset of each lens centre towards the nose, in eye NDC units.
+        fit_scale : float
+            Zoom applied after distortion.
+
+        Returns
+        -------
+        None
+        """
+        self.eye_width = eye_width
+        self.eye_height = eye_height
+        self.shader = Shader(asset_path("shaders/distortion.vert"), asset_path("shaders/distortion.frag"))
+        self.shader.use()
+        glUniform1i(glGetUniformLocation(self.shader.program, "eyeTexture"), 0)
+        self.uv_scale_location = glGetUniformLocation(self.shader.program, "uvScale")
+
+        aspect = eye_width / eye_height
+        # The left lens centre sits right of the left viewport centre, and mirrored for the right eye
+        left_vertices, index_data = build_distortion_mesh(
+            resolution, coefficients, chromatic_scale, (center_offset, 0.0), aspect, fit_scale)
+        right_vertices, _ = build_distortion_mesh(
+            resolution, coefficients, chromatic_scale, (-center_offset, 0.0), aspect, fit_scale)
+
+        self.index_count = len(index_data)
+        vertex_data = np.concatenate((left_vertices, right_vertices))
+        index_data = np.concatenate((index_data, index_data + len(left_vertices)))
+        if len(vertex_data) <= np.iinfo(np.uint16).max:
+            index_data = index_data.astype(np.uint16)
+            self.index_type = GL_UNSIGNED_SHORT
+        else:
+            self.index_type = GL_UNSIGNED_INT
+        self.index_size = index_data.itemsize
+
+        self.VAO = glGenVertexArrays(1)
+        glBindVertexArray(self.VAO)
+
+        self.VBO = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        glBufferData(GL_ARRAY_BUFFER, vertex_data.nbytes, vertex_data, GL_STATIC_DRAW)
+
+        stride = dt.distortion_vertex.itemsize
+        # Position, then red, green and blue texture coordinates
+        for attribute_index in range(4):
+            glVertexAttribPointer(attribute_index, 2, GL_FLOAT, GL_FALSE, stride,
+                                  ctypes.c_void_p(attribute_index * 8))
+            glEnableVertexAttribArray(attribute_index)
+
+        self.EBO = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, index_data.nbytes, index_data, GL_STATIC_DRAW)
+        glBindVertexArray(0)
+
+    def draw(self, targets: dict[int, RenderTarget], framebuffer: int = 0) -> None:
+        """Warp the eye buffers onto the display.
+
+        Only the rendered region of each eye buffer is sampled, so scaled down eye buffers are upscaled to the
+        panel in the same pass.
+
+        Parameters
+        ----------
+        targets : dict[int, RenderTarget]
+            Eye buffers keyed by LEFT and RIGHT.
+        framebuffer : int
+            Framebuffer to draw into, the default framebuffer unless rendering offscreen.
+
+        Returns
+        -------
+        None
+        """
+        glBindFramebuffer(GL_FRAMEBUFFER, framebuffer)
+        glViewport(0, 0, self.eye_width * 2, self.eye_height)
+        glClear(GL_COLOR_BUFFER_BIT)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_BLEND)
+
+        self.shader.use()
+        glBindVertexArray(self.VAO)
+        glActiveTexture(GL_TEXTURE0)
+        for side, target in targets.items():
+            glViewport(side * self.eye_width, 0, self.eye_width, self.eye_height)
+            glBindTexture(GL_TEXTURE_2D, target.color)
+            glUniform2f(self.uv_scale_location, *target.uv_scale)
+            offset = side * self.index_count * self.index_size
+            glDrawElements(GL_TRIANGLES, self.index_count, self.index_type, ctypes.c_void_p(offset))
+
+        glEnable(GL_BLEND)
+        glEnable(GL_DEPTH_TEST)
+
+    def destroy(self) -> None:
+        glDeleteBuffers(2, (self.VBO, self.EBO))
+        glDeleteVertexArrays(1, self.VAO)
+        self.shader.destroy()
@@ -1,12 +1,29 @@
+import logging
 import numpy as np
 from OpenGL.GL import *
 from evie.core.config import *
-from evie.rendering.mesh import Mesh, ObjMesh
+from evie.rendering.mesh import Mesh
 from evie.rendering.material import Material
 from evie.rendering.shader import Shader
-from evie.objects.entity import Entity
+from evie.rendering.texture import DepthTexture
+from evie.rendering.framebuffer import RenderTarget
+from evie.rendering.distortion import DistortionPass
+from evie.rendering.reprojection import ReprojectionPass
+from evie.rendering.passthrough import PassthroughPass
+from evie.rendering.profiler import FrameProfiler, ProfilerOverlay
+from evie.rendering.text import GlyphAtlas, TextRenderer
+from evie.rendering.hud import HudBatch
+from evie.rendering.batching import StaticBatch
+from evie.rendering.indirect import IndirectRenderer
+from evie.rendering.assets import AssetManager
+from evie.rendering.render_queue import RenderQueue, StateTracker
+from evie.rendering.occlusion import OcclusionCuller
+from evie.rendering.lighting import ClusteredLighting
+from evie.objects.entity import Entity, model_matrices
 from evie.objects.camera import Camera
-from evie.utils import perspective_projection_matrix
+from evie.utils import perspective_projection_matrix, frustum_planes
+
+logger = logging.getLogger(__name__)
 
 # TODO: SWITCH TO GLM!
 __all__ = ['GraphicsEngine']
@@ -14,9 +31,14 @@ __all__ = ['GraphicsEngine']
 
 class GraphicsEngine:
 
-    def __init__(self):
+    def __init__(self, profiler: FrameProfiler = None):
         """
         Initialise the graphics engine
+
+        Parameters
+        ----------
+        profiler : FrameProfiler
+            Profiler timing the eye and lens correction passes. A disabled one is used if omitted.
         """
         # Initialise OpenGL
         glClearColor(0.0, 0.0, 0.0, 1)
@@ -37,36 +59,328 @@ class GraphicsEngine:
         # Get uniform locations
         self._get_uniform_locations()
 
+        # Real-world depth used to occlude virtual objects
+        self.occlusion_depth = DepthTexture()
+        self.occlusion_rect = np.array([0.0, 0.0, 1.0, 1.0], dtype=np.float32)
+
+        # Each eye is rendered offscreen, then warped onto the display by the lens correction pass
+        self.eye_width, self.eye_height = SCREEN_WIDTH // 2, SCREEN_HEIGHT
+        self.eye_targets: dict[int, RenderTarget] = {
+            LEFT: RenderTarget(self.eye_width, self.eye_height),
+            RIGHT: RenderTarget(self.eye_width, self.eye_height)
+        }
+        self.distortion = DistortionPass(self.eye_width, self.eye_height)
+        self.display_framebuffer = 0
+
+        # Last rendered views, kept to reproject the eye buffers when a frame is late
+        self.reprojection = ReprojectionPass(self.projection, REPROJECTION_POSITIONAL)
+        self.reprojection_targets: dict[int, RenderTarget] = {
+            LEFT: RenderTarget(self.eye_width, self.eye_height),
+            RIGHT: RenderTarget(self.eye_width, self.eye_height)
+        }
+        self.rendered_views: dict[int, np.ndarray] = {}
+        self.rendered_uv_scales: dict[int, tuple[float, float]] = {}
+
+        # Camera feed drawn behind the virtual scene
+        self.passthrough = PassthroughPass()
+
+        # Static entities merged per entity type, rebuilt only when the set of static entities changes
+        self.static_batches: dict[int, StaticBatch] = {}
+        self._static_keys: dict[int, tuple[tuple[Entity, ...], tuple[type, ...], tuple[int, ...]]] = {}
+        self._dynamic_entities: dict[int, tuple[list[Entity], np.ndarray]] = {}
+        self.identity = np.identity(4, dtype=np.float32)
+
+        # Direct draws are sorted per eye by state and depth, then submitted with redundant binds skipped
+        self.render_queue = RenderQueue(far=FAR_PLANE)
+        self.state = StateTracker()
+        # Entities hidden behind others in the previous frame are skipped
+        self.occlusion_culler = OcclusionCuller(self.projection) if OCCLUSION_CULLING else None
+
+        # Dynamic entities of every type drawn from one mesh arena with indirect commands
+        if INDIRECT_DRAW:
+            self.indirect = IndirectRenderer(self.projection)
+            for ent_type, mesh in self.meshes.items():
+                self.indirect.add_mesh(ent_type, mesh)
+
+        # Point lights, binned per eye into a cluster grid
+        self.lighting = ClusteredLighting(self.projection, NEAR_PLANE, FAR_PLANE)
+        self.lighting.link(self.shaders[PIPELINE_TYPE["Standard"]])
+        if self.indirect is not None:
+            self.lighting.link(self.indirect.shader)
+
+        # HUD primitives and head-locked text
+        self.hud = HudBatch(self.projection)
+        self.text = TextRenderer(GlyphAtlas(), self.projection)
+        self.hud_views: dict[int, np.ndarray] = {
+            LEFT: np.identity(4, dtype=np.float32),
+            RIGHT: np.identity(4, dtype=np.float32)
+        }
+
+        # Instrumentation, and the optional frame time graph drawn into each eye
+        self.profiler = profiler if profiler is not None else FrameProfiler(enabled=False)
+        self.overlay = ProfilerOverlay(self.profiler) if PROFILER_OVERLAY and self.profiler.enabled else None
+
     def _link_assets(self) -> None:
         """
         Link assets to the engine
         """
-        # Load meshes
-        self.meshes: dict[int, Mesh] = {
-            ENTITY_TYPE["CUBE"]: ObjMesh("../assets/models/cube.obj")
-        }
+        # Meshes, materials and shaders are shared through the asset manager and loaded on first use
+        self.assets = AssetManager()
+        self.meshes: dict[int, Mesh] = {}
+        self.materials: dict[int, Material] = {}
+        # Entity types registered by path: (mesh path, material path), and the frame each was last drawn
+        self.type_assets: dict[int, tuple[str, str]] = {}
+        self.type_last_used: dict[int, int] = {}
+        self.frame = 0
+        self.indirect = None
+        # Parts of path-registered types still streaming in: {"mesh", "material"}
+        self.loading: dict[int, set[str]] = {}
+        # Parts that failed to load, drawn with their placeholder until the type is released
+        self.load_failed: dict[int, set[str]] = {}
 
-        # Load materials
-        self.materials: dict[int, Material] = {
-            ENTITY_TYPE["CUBE"]: Material("../assets/textures/uvgrid.png")
-        }
+        # Drawn in place of assets that are not resident yet
+        self.placeholder_mesh = self.assets.mesh("models/cube.obj")
+        checker = np.full((2, 2, 4), 255, dtype=np.uint8)
+        checker[0, 0, :3] = checker[1, 1, :3] = 128
+        self.placeholder_material = Material(image=checker)
+
+        self.register_type(ENTITY_TYPE["CUBE"], "models/cube.obj", "textures/uvgrid.png")
 
         # Load shaders
         self.shaders: dict[int, Shader] = {
-            PIPELINE_TYPE["Standard"]: Shader("../assets/shaders/vertex.vert", "../assets/shaders/fragment.frag")
+            PIPELINE_TYPE["Standard"]: self.assets.shader("shaders/vertex.vert", "shaders/fragment.frag")
         }
 
+    def register_type(self, ent_type: int, mesh: Mesh | str, material: Material | str) -> None:
+        """Register the mesh and material used to draw an entity type.
+
+        Given as paths, both are loaded through the asset manager the first time an entity of the type is drawn,
+        shared with other types using the same files, and released again once the type goes undrawn for
+        `ASSET_IDLE_FRAMES` frames. With `ASSET_STREAMING` they load in the background, and the type is drawn with
+        placeholders until they are resident. Given as objects, the engine takes ownership of both and destroys them
+        with `unregister_type` or `destroy`.
+
+        Parameters
+        ----------
+        ent_type : int
+        mesh : Mesh | str
+            Mesh, or .obj path relative to `ASSET_ROOT`.
+        material : Material | str
+            Material, or image path relative to `ASSET_ROOT`.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        TypeError
+            If only one of mesh and material is a path.
+        """
+        if isinstance(mesh, str) != isinstance(material, str):
+            raise TypeError("Mesh and material must both be paths or both be objects.")
+        if ent_type in self.meshes or ent_type in self.type_assets:
+            self.unregister_type(ent_type)
+
+        if isinstance(mesh, str):
+            self.type_assets[ent_type] = (mesh, material)
+            return
+        self.meshes[ent_type] = mesh
+        self.materials[ent_type] = material
+        if self.indirect is not None:
+            self.indirect.add_mesh(ent_type, mesh)
+
+    def unregister_type(self, ent_type: int) -> None:
+        """Remove an entity type, destroying its mesh and material or releasing them to the asset manager.
+
+        Parameters
+        ----------
+        ent_type : int
+
+        Returns
+        -------
+        None
+        """
+        managed = ent_type in self.type_assets
+        self.type_last_used.pop(ent_type, None)
+        if managed:
+            if ent_type in self.meshes:
+                self._release_type(ent_type)
+            del self.type_assets[ent_type]
+            return
+        if ent_type not in self.meshes:
+            return
+        mesh, material = self._drop_type(ent_type)
+        mesh.destroy()
+        material.destroy()
+
+    def _release_type(self, ent_type: int) -> None:
+        """Drop a path-registered type, releasing the assets it holds references to."""
+        loading = self.loading.pop(ent_type, set())
+        self.load_failed.pop(ent_type, None)
+        # Assets still streaming in for the type may be evicted once they arrive
+        for kind, path in zip(("mesh", "material"), self.type_assets[ent_type]):
+            if kind in loading:
+                self.assets.cancel(kind, path)
+        mesh, material = self._drop_type(ent_type)
+        if "mesh" not in loading:
+            self.assets.release(mesh)
+        if "material" not in loading:
+            self.assets.release(material)
+
+    def _load_type(self, ent_type: int) -> None:
+        """Acquire the assets of a path-registered type, standing in placeholders for those still loading.
+
+        Assets that fail to load are logged and keep their placeholder.
+        """
+        mesh_path, material_path = self.type_assets[ent_type]
+        if ent_type not in self.meshes:
+            self.meshes[ent_type] = self.placeholder_mesh
+            self.materials[ent_type] = self.placeholder_material
+            self.loading[ent_type] = {"mesh", "material"}
+            if self.indirect is not None:
+                self.indirect.add_mesh(ent_type, self.placeholder_mesh)
+        loading = self.loading[ent_type]
+        failed = self.load_failed.setdefault(ent_type, set())
+
+        if "mesh" in loading and "mesh" not in failed:
+            try:
+                mesh = self.assets.request_mesh(mesh_path) if ASSET_STREAMING else self.assets.mesh(mesh_path)
+            except Exception:
+                logger.exception("Failed to load mesh %s of entity type %d", mesh_path, ent_type)
+                failed.add("mesh")
+                mesh = None
+            if mesh is not None:
+                loading.discard("mesh")
+                self.meshes[ent_type] = mesh
+                # Batches built from the placeholder are rebuilt
+                self._static_keys.pop(ent_type, None)
+                if self.indirect is not None:
+                    self.indirect.add_mesh(ent_type, mesh)
+        if "material" in loading and "material" not in failed:
+            try:
+                material = (self.assets.request_material(material_path) if ASSET_STREAMING
+                            else self.assets.material(material_path))
+            except Exception:
+                logger.exception("Failed to load material %s of entity type %d", material_path, ent_type)
+                failed.add("material")
+                material = None
+            if material is not None:
+                loading.discard("material")
+                self.materials[ent_type] = material
+        if not loading:
+            del self.loading[ent_type]
+
+    def _drop_type(self, ent_type: int) -> tuple[Mesh, Material]:
+        """Forget the mesh, material and derived batches of a type, returning the mesh and material."""
+        if self.indirect is not None:
+            self.indirect.remove_mesh(ent_type)
+        self._static_keys.pop(ent_type, None)
+        self._dynamic_entities.pop(ent_type, None)
+        batch = self.static_batches.pop(ent_type, None)
+        if batch is not None:
+            batch.destroy()
+        return self.meshes.pop(ent_type), self.materials.pop(ent_type)
+
+    def _update_assets(self, renderables: dict[int, list[Entity]]) -> None:
+        """Load the assets of path-registered types about to be drawn, and release those of idle types.
+
+        Parameters
+        ----------
+        renderables : dict[int, list[Entity]]
+
+        Returns
+        -------
+        None
+        """
+        self.frame += 1
+        self.assets.upload(ASSET_UPLOAD_BUDGET_MS)
+        for ent_type, entities in renderables.items():
+            if not entities or ent_type not in self.type_assets:
+                continue
+            if ent_type not in self.meshes or ent_type in self.loading:
+                self._load_type(ent_type)
+            self.assets.touch(self.meshes[ent_type])
+            self.assets.touch(self.materials[ent_type])
+            self.type_last_used[ent_type] = self.frame
+
+        idle = [ent_type for ent_type, frame in self.type_last_used.items() if self.frame - frame > ASSET_IDLE_FRAMES]
+        for ent_type in idle:
+            del self.type_last_used[ent_type]
+            self._release_type(ent_type)
+
+    def set_occlusion_culling(self, ent_type: int, enabled: bool = True) -> None:
+        """Enable or disable occlusion culling of an entity type's dynamic entities.
+
+        Does nothing if `OCCLUSION_CULLING` is off.
+
+        Parameters
+        ----------
+        ent_type : int
+        enabled : bool
+
+        Returns
+        -------
+        None
+        """
+        if self.occlusion_culler is not None:
+            self.occlusion_culler.enable(ent_type, enabled)
+
+    def _partition_static(self, ent_type: int, entities: list[Entity]) -> tuple[list[Entity], np.ndarray | None]:
+        """Split off the static entities of a type into its static batch.
+
+        The split is cached with the entities it was made from and the static versions of their classes. It is
+        redone when an entity of the type was added, removed or replaced, or when an entity of one of its classes
+        changed its static flag or, being static, its transform. Other types keep their batches.
+
+        Parameters
+        ----------
+        ent_type : int
+        entities : list[Entity]
+
+        Returns
+        -------
+        list[Entity]
+            Entities still drawn one by one.
+        np.ndarray | None
+            Their indices in `entities`, None if all of them.
+        """
+        if not STATIC_BATCHING:
+            return entities, None
+        cached = self._static_keys.get(ent_type)
+        if cached is not None:
+            members, classes, versions = cached
+            # Entities compare by identity, snapshot tuples shared across steps short-circuit
+            if ((members is entities or members == tuple(entities))
+                    and versions == tuple(Entity.static_versions.get(cls, 0) for cls in classes)):
+                return self._dynamic_entities[ent_type]
+
+        members = entities if isinstance(entities, tuple) else tuple(entities)
+        classes = tuple({type(entity) for entity in members})
+        self._static_keys[ent_type] = (members, classes, tuple(Entity.static_versions.get(cls, 0) for cls in classes))
+        flags = np.array([entity.static for entity in entities], dtype=bool)
+        static = [entity for entity in entities if entity.static]
+        dynamic = [entity for entity in entities if not entity.static]
+        self._dynamic_entities[ent_type] = (dynamic, None if not static else np.flatnonzero(~flags))
+        batch = self.static_batches.pop(ent_type, None)
+        if batch is not None:
+            batch.destroy()
+        if static:
+            self.static_batches[ent_type] = StaticBatch(self.meshes[ent_type], static)
+        return self._dynamic_entities[ent_type]
+
     def _set_static_uniforms(self) -> None:
         # TODO: Allow for multiple shaders
         shader = self.shaders[PIPELINE_TYPE["Standard"]]
         shader.use()
         glUniform1i(glGetUniformLocation(shader.program, "imageTexture"), 0)
+        glUniform1i(glGetUniformLocation(shader.program, "occlusionDepth"), 1)
 
         aspect = (SCREEN_WIDTH//2) / SCREEN_HEIGHT
-        perspective_projection = perspective_projection_matrix(67.0, aspect, 0.1, 100.0)
+        self.projection = perspective_projection_matrix(67.0, aspect, NEAR_PLANE, FAR_PLANE)
         glUniformMatrix4fv(
             glGetUniformLocation(shader.program, "projection"),
-            1, GL_FALSE, perspective_projection
+            1, GL_FALSE, self.projection
         )
 
     def _get_uniform_locations(self) -> None:
@@ -77,55 +391,285 @@ class GraphicsEngine:
         shader.cache_single_uniform(UNIFORM_TYPE["MODEL"], "model")
         shader.cache_single_uniform(UNIFORM_TYPE["VIEW"], "view")
         shader.cache_single_uniform(UNIFORM_TYPE["BASE_COLOR"], "baseColor")
+        shader.cache_single_uniform(UNIFORM_TYPE["VIEWPORT"], "viewport")
+        shader.cache_single_uniform(UNIFORM_TYPE["OCCLUSION_ENABLED"], "occlusionEnabled")
+        shader.cache_single_uniform(UNIFORM_TYPE["OCCLUSION_RECT"], "occlusionRect")
+
+    def set_occlusion_depth(self, depth: np.ndarray, frame_id: int, roi_uv: tuple[float, float, float, float]) -> None:
+        """Set the real-world depth map used to occlude virtual objects.
+
+        The depth map is assumed to be seen from the render cameras, i.e. the rectified camera views are
+        aligned with the eyes.
+
+        Parameters
+        ----------
+        depth : np.ndarray
+            Depth map in scene units, 0 where invalid. See `evie.vision.StereoDepth`.
+        frame_id : int
+            Capture the depth map belongs to. Re-uploads of the same frame are skipped.
+        roi_uv : tuple[float, float, float, float]
+            Normalised (u0, v0, u1, v1) region of the eye covered by the depth map, v from the top.
+
+        Returns
+        -------
+        None
+        """
+        self.occlusion_depth.update(depth, frame_id)
+        self.occlusion_rect[:] = roi_uv
 
-    def render(self, stereo_cameras: dict[int, Camera], renderables: dict[int, list[Entity]]) -> None:
+    def set_passthrough(self, img_l: np.ndarray, img_r: np.ndarray, frame_id: int) -> None:
+        """Set the camera images drawn behind the virtual scene.
+
+        Parameters
+        ----------
+        img_l : np.ndarray
+            Left BGR camera image.
+        img_r : np.ndarray
+            Right BGR camera image.
+        frame_id : int
+            Capture the images belong to. Re-uploads of the same frame are skipped.
+
+        Returns
+        -------
+        None
+        """
+        self.passthrough.update(img_l, img_r, frame_id)
+
+    def clear_passthrough(self) -> None:
+        """Stop drawing the camera images until the next `set_passthrough`.
+
+        Returns
+        -------
+        None
+        """
+        self.passthrough.clear()
+
+    def set_resolution_scale(self, scale: float) -> None:
+        """Set the eye buffer resolution scale.
+
+        The lens correction pass upscales the rendered region to the panel.
+
+        Parameters
+        ----------
+        scale : float
+            Fraction of the full eye resolution rendered along each axis.
+
+        Returns
+        -------
+        None
+        """
+        for target in (*self.eye_targets.values(), *self.reprojection_targets.values()):
+            target.set_scale(scale)
+
+    def _update_hud_views(self, stereo_cameras: dict[int, Camera]) -> None:
+        """Offset head space by each eye's half of the camera separation, for head-locked HUD content."""
+        half_ipd = np.linalg.norm(stereo_cameras[RIGHT].position - stereo_cameras[LEFT].position) / 2
+        self.hud_views[LEFT][3, 0] = half_ipd
+        self.hud_views[RIGHT][3, 0] = -half_ipd
+
+    def render(self, stereo_cameras: dict[int, Camera], renderables: dict[int, list[Entity]],
+               transforms: dict[int, np.ndarray] = None) -> None:
         """
         Render the scene
+
+        Parameters
+        ----------
+        stereo_cameras : dict[int, Camera]
+        renderables : dict[int, list[Entity]]
+            Entities per type.
+        transforms : dict[int, np.ndarray]
+            (n, 4, 4) model matrices per type, in the order of `renderables`, e.g. from a `TransformSnapshot`.
+            Read from the entities themselves if omitted.
         """
 
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         shader = self.shaders[PIPELINE_TYPE["Standard"]]
         shader.use()
+        profiler = self.profiler
+        if self.overlay is not None:
+            self.overlay.update()
+        # World-locked HUD primitives blend back-to-front as seen from between the eyes
+        self.hud.flush((stereo_cameras[LEFT].position + stereo_cameras[RIGHT].position) / 2)
+        self.text.update()
+        self._update_hud_views(stereo_cameras)
+
+        # Occlusion by real-world depth
+        occlusion = DEPTH_OCCLUSION and self.occlusion_depth.is_ready
+        glUniform1i(shader.get_single_location(UNIFORM_TYPE["OCCLUSION_ENABLED"]), int(occlusion))
+        if occlusion:
+            self.occlusion_depth.use(1)
+            glUniform4fv(shader.get_single_location(UNIFORM_TYPE["OCCLUSION_RECT"]), 1, self.occlusion_rect)
+
+        self._update_assets(renderables)
+        self.lighting.prepare()
+        # Entities drawn one by one, with their model matrices
+        dynamic_entities: dict[int, tuple[list[Entity], np.ndarray]] = {}
+        for ent_type, entities in renderables.items():
+            if ent_type not in self.materials:
+                continue
+            dynamic, indices = self._partition_static(ent_type, entities)
+            if transforms is None:
+                models = model_matrices(dynamic)
+            else:
+                models = transforms[ent_type] if indices is None else transforms[ent_type][indices]
+            dynamic_entities[ent_type] = (dynamic, models)
+
+        culler = self.occlusion_culler
+        drawn_entities = dynamic_entities
+        if culler is not None:
+            culler.begin_frame()
+            with profiler.span("occlusion"):
+                drawn_entities = {}
+                for ent_type, (entities, models) in dynamic_entities.items():
+                    visible = culler.filter(ent_type, entities)
+                    drawn_entities[ent_type] = (entities, models) if visible is None else (
+                        [entity for entity, seen in zip(entities, visible) if seen], models[visible]
+                    )
+        if self.indirect is not None:
+            self.indirect.prepare([
+                (ent_type, self.materials[ent_type], models) for ent_type, (_, models) in drawn_entities.items()
+            ])
 
         # Render scene with each camera
         for side, camera in stereo_cameras.items():
-            # Set viewport
-            if side == LEFT:
-                glViewport(0, 0, SCREEN_WIDTH//2, SCREEN_HEIGHT)
-            elif side == RIGHT:
-                glViewport(SCREEN_WIDTH//2, 0, SCREEN_WIDTH//2, SCREEN_HEIGHT)
+            pass_name = "render_left" if side == LEFT else "render_right"
+            profiler.begin(pass_name)
+            profiler.gpu_begin(pass_name)
+
+            # Draw into the eye buffer
+            target = self.eye_targets[side]
+            target.bind()
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            if self.passthrough.is_ready:
+                self.passthrough.draw(side)
+            shader.use()
+            viewport = (0, 0, target.viewport_width, target.viewport_height)
+            glUniform4f(shader.get_single_location(UNIFORM_TYPE["VIEWPORT"]), *viewport)
 
             # Set view matrix
+            view_matrix = camera.view_matrix
             glUniformMatrix4fv(
                 shader.get_single_location(UNIFORM_TYPE["VIEW"]),
-                1, GL_FALSE, camera.view_matrix
+                1, GL_FALSE, view_matrix
             )
+            self.rendered_views[side] = view_matrix.copy()
+            self.rendered_uv_scales[side] = target.uv_scale
+
+            with profiler.span("cull"):
+                planes = frustum_planes(self.projection, view_matrix)
+            with profiler.span("lights"):
+                self.lighting.bind(view_matrix)
+
+            if self.indirect is not None:
+                self.indirect.draw(view_matrix, viewport, occlusion, self.occlusion_rect)
+                shader.use()
+
+            with profiler.span("queue"):
+                self._queue_draws(side, shader, drawn_entities, view_matrix)
+            self._submit_queue(planes)
+
+            # Test every candidate's bounds against this eye's opaque depth, for the next frame
+            if culler is not None:
+                culler.test(side, view_matrix, self.meshes, dynamic_entities)
+
+            self.hud.draw({HUD_LAYER["WORLD"]: view_matrix, HUD_LAYER["HEAD"]: self.hud_views[side]})
+            self.text.draw(self.hud_views[side])
+            if self.overlay is not None:
+                self.overlay.draw()
+            profiler.gpu_end()
+            profiler.end()
+
+        # Lens distortion and chromatic aberration correction onto the display
+        with profiler.span("distortion"):
+            profiler.gpu_begin("distortion")
+            self.distortion.draw(self.eye_targets, self.display_framebuffer)
+            profiler.gpu_end()
 
-            for ent_type, entities in renderables.items():
-                if ent_type not in self.materials:
-                    continue
+        glFlush()
 
+    def _queue_draws(self, side: int, shader: Shader, dynamic_entities: dict[int, tuple[list[Entity], np.ndarray]],
+                     view: np.ndarray) -> None:
+        """Fill the render queue with the direct draws of one eye: static batches, and entities not drawn
+        indirectly."""
+        queue = self.render_queue
+        queue.clear()
+        opaque = RENDER_PASS["OPAQUE"]
+        culler = self.occlusion_culler
+        for ent_type, (entities, models) in dynamic_entities.items():
+            material = self.materials[ent_type]
+            if self.indirect is None and entities:
                 mesh = self.meshes[ent_type]
-                mesh.arm()
-                material = self.materials[ent_type]
-                material.use()
+                conditional = culler is not None and ent_type in culler.types
+                # Row 3 of a transposed model matrix is the entity's position
+                queue.submit(opaque, shader, material, mesh, queue.view_depths(models[:, 3, :3], view), [
+                    (shader, material, mesh, model, culler.pending(side, entity) if conditional else None)
+                    for entity, model in zip(entities, models)
+                ])
+            batch = self.static_batches.get(ent_type)
+            if batch is not None:
+                center = (batch.chunk_min.min(axis=0) + batch.chunk_max.max(axis=0)) / 2
+                queue.submit(opaque, shader, material, batch, queue.view_depths(center[None, :], view),
+                             [(shader, material, batch, None, None)])
 
-                color = np.array([1.0, 1.0, 1.0, 1.0], dtype=np.float32)  # TODO: Do this properly
+    def _submit_queue(self, planes: np.ndarray) -> None:
+        """Issue the queued draws in key order, binding only state that changed."""
+        state = self.state
+        state.reset()
+        color = np.array([1.0, 1.0, 1.0, 1.0], dtype=np.float32)  # TODO: Do this properly
+        model_location = None
+        for shader, material, mesh, model, query in self.render_queue.sorted():
+            if shader is not state.shader:
+                state.use_shader(shader)
+                model_location = shader.get_single_location(UNIFORM_TYPE["MODEL"])
+                glUniform4fv(shader.get_single_location(UNIFORM_TYPE["BASE_COLOR"]), 1, color)
+            state.use_material(material)
+            state.use_mesh(mesh)
+            if model is None:
+                # Static batches are baked in world space
+                glUniformMatrix4fv(model_location, 1, GL_FALSE, self.identity)
+                mesh.draw_visible(planes)
+            elif query is not None:
+                # Skipped by the GPU if the entity's bounds were hidden last frame
+                glUniformMatrix4fv(model_location, 1, GL_FALSE, model)
+                glBeginConditionalRender(query, GL_QUERY_NO_WAIT)
+                mesh.draw()
+                glEndConditionalRender()
+            else:
+                glUniformMatrix4fv(model_location, 1, GL_FALSE, model)
+                mesh.draw()
 
-                for entity in entities:
-                    # Set model matrix
-                    glUniformMatrix4fv(
-                        shader.get_single_location(UNIFORM_TYPE["MODEL"]),
-                        1, GL_FALSE, entity.model_matrix
-                    )
-                    # Set base color
-                    glUniform4fv(
-                        shader.get_single_location(UNIFORM_TYPE["BASE_COLOR"]),
-                        1, color
-                    )
+    def can_reproject(self) -> bool:
+        """Whether reprojection is enabled and both eyes have been rendered at least once."""
+        return REPROJECTION and len(self.rendered_views) == len(self.eye_targets)
+
+    def reproject(self, stereo_cameras: dict[int, Camera]) -> None:
+        """Show the last rendered frame warped to the current camera poses.
 
-                    mesh.draw()
+        Much cheaper than `render`, used when a new frame would miss its vsync. HUD primitives queued for this
+        frame are dropped, as they are queued again for the next one.
 
+        Parameters
+        ----------
+        stereo_cameras : dict[int, Camera]
+            Cameras at their latest pose.
+
+        Returns
+        -------
+        None
+        """
+        self.hud.clear()
+        self.profiler.gpu_begin("reproject")
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_BLEND)
+        for side, camera in stereo_cameras.items():
+            self.reprojection.draw(
+                self.eye_targets[side], self.reprojection_targets[side], self.rendered_uv_scales[side],
+                self.rendered_views[side], camera.view_matrix
+            )
+        glEnable(GL_BLEND)
+        glEnable(GL_DEPTH_TEST)
+
+        self.distortion.draw(self.reprojection_targets, self.display_framebuffer)
+        self.profiler.gpu_end()
         glFlush()
 
     def destroy(self) -> None:
@@ -137,11 +681,27 @@ class GraphicsEngine:
         -------
         None
         """
-        for mesh in self.meshes.values():
-            mesh.destroy()
+        for ent_type in list(self.meshes):
+            self.unregister_type(ent_type)
+        if self.indirect is not None:
+            self.indirect.destroy()
+
+        # Shaders, placeholders and every resource still cached
+        self.placeholder_material.destroy()
+        self.assets.destroy()
 
-        for material in self.materials.values():
-            material.destroy()
+        self.occlusion_depth.destroy()
 
-        for shader in self.shaders.values():
-            shader.destroy()
+        for target in (*self.eye_targets.values(), *self.reprojection_targets.values()):
+            target.destroy()
+        self.distortion.destroy()
+        self.reprojection.destroy()
+        self.passthrough.destroy()
+        self.lighting.destroy()
+        self.hud.destroy()
+        if self.occlusion_culler is not None:
+            self.occlusion_culler.destroy()
+        self.text.destroy()
+        if self.overlay is not None:
+            self.overlay.destroy()
+        self.profiler.destroy()
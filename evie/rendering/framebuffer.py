@@ -0,0 +1,106 @@
+from OpenGL.GL import *
+
+__all__ = ['RenderTarget']
+
+
+class RenderTarget:
+    """
+    Offscreen framebuffer with a color and a depth texture attachment.
+
+    Attributes
+    ----------
+    FBO : int
+        Framebuffer Object ID.
+    color : int
+        RGBA8 color texture ID.
+    depth : int
+        24-bit depth texture ID.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        """Create a render target.
+
+        Parameters
+        ----------
+        width : int
+        height : int
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        RuntimeError
+            If the framebuffer is incomplete.
+        """
+        self.width = width
+        self.height = height
+        # Region actually rendered to, smaller than the target when the resolution is scaled down
+        self.viewport_width = width
+        self.viewport_height = height
+
+        self.color = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.color)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        # Samples outside the eye buffer come back black
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_BORDER)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_BORDER)
+        glTexParameterfv(GL_TEXTURE_2D, GL_TEXTURE_BORDER_COLOR, (0.0, 0.0, 0.0, 1.0))
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+
+        self.depth = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.depth)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_DEPTH_COMPONENT24, width, height, 0,
+                     GL_DEPTH_COMPONENT, GL_UNSIGNED_INT, None)
+
+        self.FBO = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.FBO)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.color, 0)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_TEXTURE_2D, self.depth, 0)
+
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Render target is incomplete (status {status}).")
+
+    @property
+    def uv_scale(self) -> tuple[float, float]:
+        """Texture coordinate scale covering the rendered region."""
+        return self.viewport_width / self.width, self.viewport_height / self.height
+
+    def set_scale(self, scale: float) -> None:
+        """Set the fraction of the target rendered to along each axis.
+
+        The storage keeps its full size, only the viewport changes, so scaling is free.
+
+        Parameters
+        ----------
+        scale : float
+            Resolution scale in (0, 1].
+
+        Returns
+        -------
+        None
+        """
+        self.viewport_width = max(1, int(self.width * scale))
+        self.viewport_height = max(1, int(self.height * scale))
+
+    def bind(self) -> None:
+        """Bind the render target for drawing and set the viewport to the rendered region.
+
+        Returns
+        -------
+        None
+        """
+        glBindFramebuffer(GL_FRAMEBUFFER, self.FBO)
+        glViewport(0, 0, self.viewport_width, self.viewport_height)
+
+    def destroy(self) -> None:
+        glDeleteFramebuffers(1, [self.FBO])
+        glDeleteTextures(2, (self.color, self.depth))
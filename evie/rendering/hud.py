@@ -0,0 +1,333 @@
+import numpy as np
+from OpenGL.GL import *
+from evie.core.config import *
+import evie.core.datatypes as dt
+from evie.rendering.shader import Shader
+from evie.rendering.mesh import DynamicMesh
+from evie.rendering.material import Material
+from evie.rendering.render_queue import radix_argsort, pack_keys, quantize_depth
+from evie.utils import asset_path
+
+__all__ = ['HudBatch']
+
+# Two triangles per quad, as indices into its four corners
+QUAD_TRIANGLES = np.array([0, 1, 2, 0, 2, 3])
+
+
+class HudBatch:
+    """
+    Immediate-mode batch of 2D HUD primitives: rects, lines, circles and textured sprites.
+
+    Primitives are queued every frame with a layer, then `flush` sorts them by layer and texture, world-locked ones
+    back-to-front first so they blend correctly, streams all vertices into one `DynamicMesh` and merges them into
+    as few draw ranges as possible. `draw` issues those
+    ranges for one eye, typically a handful of draw calls.
+
+    Primitives lie in a plane parallel to the layer's xy plane, at the z of their position. World-locked
+    primitives live in scene coordinates, head-locked ones in head space, meters with x right, y up and
+    -z forward.
+    """
+
+    def __init__(self, projection: np.ndarray, capacity: int = 16384) -> None:
+        """Create the batch.
+
+        Parameters
+        ----------
+        projection : np.ndarray
+            Eye projection matrix, in the engine's upload layout.
+        capacity : int
+            Initial number of vertices per frame. Grows as needed.
+
+        Returns
+        -------
+        None
+        """
+        self.shader = Shader(asset_path("shaders/hud.vert"), asset_path("shaders/hud.frag"))
+        self.shader.use()
+        glUniform1i(glGetUniformLocation(self.shader.program, "image"), 0)
+        glUniformMatrix4fv(glGetUniformLocation(self.shader.program, "projection"), 1, GL_FALSE, projection)
+        self.view_location = glGetUniformLocation(self.shader.program, "view")
+
+        # Untextured primitives sample a white texel, so everything shares one shader
+        self.white = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.white)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, 1, 1, 0, GL_RGBA, GL_UNSIGNED_BYTE,
+                     np.full(4, 255, dtype=np.uint8))
+
+        self.mesh = DynamicMesh(dt.hud_vertex, (3, 2, 4), capacity)
+
+        # Vertices and commands queued this frame
+        self.vertices = np.zeros(capacity, dtype=dt.hud_vertex)
+        self.vertex_count = 0
+        self.commands = np.zeros((256, 4), dtype=np.int64)  # layer, texture, first vertex, vertex count
+        self.centers = np.zeros((256, 3), dtype=np.float32)  # of world-locked commands, for depth sorting
+        self.command_count = 0
+
+        # Draw ranges of the last flush: layer, texture, first vertex, vertex count
+        self.batches = np.zeros((0, 4), dtype=np.int64)
+
+    def _push(self, layer: int, texture: int, positions: np.ndarray, uvs: np.ndarray,
+              color: tuple[float, float, float, float]) -> None:
+        """Queue triangles, given as per-vertex positions and texture coordinates."""
+        count = len(positions)
+        if self.vertex_count + count > len(self.vertices):
+            grown = np.zeros(max(2 * len(self.vertices), self.vertex_count + count), dtype=dt.hud_vertex)
+            grown[:self.vertex_count] = self.vertices[:self.vertex_count]
+            self.vertices = grown
+        if self.command_count == len(self.commands):
+            self.commands = np.concatenate((self.commands, np.zeros_like(self.commands)))
+            self.centers = np.concatenate((self.centers, np.zeros_like(self.centers)))
+
+        chunk = self.vertices[self.vertex_count:self.vertex_count + count]
+        chunk['x'], chunk['y'], chunk['z'] = positions[:, 0], positions[:, 1], positions[:, 2]
+        chunk['s'], chunk['t'] = uvs[:, 0], uvs[:, 1]
+        chunk['r'], chunk['g'], chunk['b'], chunk['a'] = color
+
+        # Consecutive head-locked primitives with the same state extend the previous command, world-locked ones
+        # are kept apart to be depth sorted
+        previous = self.commands[self.command_count - 1]
+        if self.command_count and layer != HUD_LAYER["WORLD"] and previous[0] == layer and previous[1] == texture:
+            previous[3] += count
+        else:
+            self.commands[self.command_count] = (layer, texture, self.vertex_count, count)
+            self.centers[self.command_count] = positions.mean(axis=0)
+            self.command_count += 1
+        self.vertex_count += count
+
+    def _quads(self, corners: np.ndarray, uvs: np.ndarray, layer: int, texture: int,
+               color: tuple[float, float, float, float]) -> None:
+        """Queue quads given as (n, 4, 3) corners and (n, 4, 2) texture coordinates, counter-clockwise."""
+        self._push(layer, texture, corners[:, QUAD_TRIANGLES].reshape(-1, 3), uvs[:, QUAD_TRIANGLES].reshape(-1, 2),
+                   color)
+
+    def rect(self, center: tuple[float, float, float], size: tuple[float, float],
+             color: tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0), layer: int = HUD_LAYER["HEAD"],
+             texture: 'Material | int' = None, uv: tuple[float, float, float, float] = (0.0, 0.0, 1.0, 1.0)) -> None:
+        """Queue a filled, optionally textured rectangle.
+
+        Parameters
+        ----------
+        center : tuple[float, float, float]
+        size : tuple[float, float]
+            Width and height.
+        color : tuple[float, float, float, float]
+            RGBA color, multiplied with the texture.
+        layer : int
+            One of `HUD_LAYER`.
+        texture : Material | int
+            Material or OpenGL texture ID, None for a flat color.
+        uv : tuple[float, float, float, float]
+            Texture region as (s0, t0, s1, t1).
+
+        Returns
+        -------
+        None
+        """
+        x, y, z = center
+        w, h = size[0] / 2, size[1] / 2
+        corners = np.array([[[x - w, y - h, z], [x + w, y - h, z], [x + w, y + h, z], [x - w, y + h, z]]],
+                           dtype=np.float32)
+        s0, t0, s1, t1 = uv
+        uvs = np.array([[[s0, t0], [s1, t0], [s1, t1], [s0, t1]]], dtype=np.float32)
+        if isinstance(texture, Material):
+            texture = texture.texture
+        self._quads(corners, uvs, layer, self.white if texture is None else int(texture), color)
+
+    def sprite(self, texture: 'Material | int', center: tuple[float, float, float], size: tuple[float, float],
+               color: tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0), layer: int = HUD_LAYER["HEAD"],
+               uv: tuple[float, float, float, float] = (0.0, 0.0, 1.0, 1.0)) -> None:
+        """Queue a textured rectangle, such as one of the test pattern textures. See `rect`.
+
+        Returns
+        -------
+        None
+        """
+        self.rect(center, size, color, layer, texture, uv)
+
+    def polyline(self, points: np.ndarray, color: tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0),
+                 thickness: float = 0.002, layer: int = HUD_LAYER["HEAD"], closed: bool = False) -> None:
+        """Queue connected line segments, each drawn as a quad.
+
+        Parameters
+        ----------
+        points : np.ndarray
+            (n, 3) points.
+        color : tuple[float, float, float, float]
+        thickness : float
+            Line width, in the layer's units.
+        layer : int
+        closed : bool
+            Whether to connect the last point back to the first.
+
+        Returns
+        -------
+        None
+        """
+        points = np.asarray(points, dtype=np.float32)
+        if closed:
+            points = np.concatenate((points, points[:1]))
+        start, end = points[:-1], points[1:]
+        direction = end[:, :2] - start[:, :2]
+        length = np.linalg.norm(direction, axis=1, keepdims=True)
+        normal = np.zeros_like(start)
+        normal[:, 0], normal[:, 1] = -direction[:, 1], direction[:, 0]
+        normal *= (thickness / 2) / np.maximum(length, 1e-9)
+
+        corners = np.stack((start - normal, end - normal, end + normal, start + normal), axis=1)
+        self._quads(corners, np.zeros((len(corners), 4, 2), dtype=np.float32), layer, self.white, color)
+
+    def line(self, start: tuple[float, float, float], end: tuple[float, float, float],
+             color: tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0), thickness: float = 0.002,
+             layer: int = HUD_LAYER["HEAD"]) -> None:
+        """Queue a single line segment. See `polyline`.
+
+        Returns
+        -------
+        None
+        """
+        self.polyline(np.array((start, end)), color, thickness, layer)
+
+    def circle(self, center: tuple[float, float, float], radius: float,
+               color: tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0), layer: int = HUD_LAYER["HEAD"],
+               thickness: float = None, segments: int = 32) -> None:
+        """Queue a filled circle, or a ring if `thickness` is given.
+
+        Parameters
+        ----------
+        center : tuple[float, float, float]
+        radius : float
+            Outer radius.
+        color : tuple[float, float, float, float]
+        layer : int
+        thickness : float
+            Ring width, None for a filled disc.
+        segments : int
+            Number of edges approximating the circle.
+
+        Returns
+        -------
+        None
+        """
+        angles = np.linspace(0.0, 2 * np.pi, segments + 1, dtype=np.float32)
+        rim = np.stack((np.cos(angles), np.sin(angles), np.zeros_like(angles)), axis=1)
+        center = np.asarray(center, dtype=np.float32)
+        outer = center + radius * rim
+
+        if thickness is None:
+            triangles = np.empty((segments, 3, 3), dtype=np.float32)
+            triangles[:, 0] = center
+            triangles[:, 1] = outer[:-1]
+            triangles[:, 2] = outer[1:]
+            self._push(layer, self.white, triangles.reshape(-1, 3), np.zeros((3 * segments, 2), dtype=np.float32),
+                       color)
+        else:
+            inner = center + (radius - thickness) * rim
+            corners = np.stack((inner[:-1], outer[:-1], outer[1:], inner[1:]), axis=1)
+            self._quads(corners, np.zeros((segments, 4, 2), dtype=np.float32), layer, self.white, color)
+
+    def flush(self, eye: np.ndarray = None, far: float = FAR_PLANE) -> None:
+        """Sort the queued primitives, stream them to the GPU and start a new frame.
+
+        Call once per frame after queuing and before `draw`.
+
+        Parameters
+        ----------
+        eye : np.ndarray
+            World position world-locked primitives are sorted back-to-front from, e.g. between the eyes.
+            Submission order is kept if omitted.
+        far : float
+            Distance beyond which world-locked primitives are not depth sorted.
+
+        Returns
+        -------
+        None
+        """
+        commands = self.commands[:self.command_count]
+        # Sort by layer, then world-locked back-to-front, then texture, keeping submission order within each state
+        world = commands[:, 0] == HUD_LAYER["WORLD"]
+        depths = np.zeros(len(commands), dtype=np.uint64)
+        if eye is not None:
+            distances = np.linalg.norm(self.centers[:self.command_count] - eye, axis=1)
+            depths[world] = quantize_depth(distances[world], far)
+        keys = np.where(
+            world,
+            pack_keys(RENDER_PASS["TRANSPARENT"], 0, commands[:, 1], 0, depths),
+            pack_keys(RENDER_PASS["OVERLAY"], 0, commands[:, 1], 0, depths)
+        )
+        commands = commands[radix_argsort(keys)]
+
+        # Gather the vertices of the sorted commands into one contiguous stream
+        counts = commands[:, 3]
+        offsets = np.cumsum(counts) - counts
+        total = int(counts.sum())
+        gather = np.repeat(commands[:, 2] - offsets, counts) + np.arange(total)
+
+        # Gathered straight into the mapped buffer, without a temporary
+        self.mesh.begin_frame()
+        np.take(self.vertices, gather, out=self.mesh.map(total))
+        first = self.mesh.unmap()
+
+        # Merge neighbouring commands sharing layer and texture into one draw range
+        if len(commands):
+            starts = np.flatnonzero(np.any(np.diff(commands[:, :2], axis=0) != 0, axis=1)) + 1
+            starts = np.concatenate(([0], starts))
+            self.batches = np.empty((len(starts), 4), dtype=np.int64)
+            self.batches[:, :2] = commands[starts, :2]
+            self.batches[:, 2] = first + offsets[starts]
+            self.batches[:, 3] = np.add.reduceat(counts, starts)
+        else:
+            self.batches = np.zeros((0, 4), dtype=np.int64)
+
+        self.vertex_count = 0
+        self.command_count = 0
+
+    def clear(self) -> None:
+        """Drop the primitives queued this frame without drawing them, e.g. when the frame is reprojected.
+
+        Returns
+        -------
+        None
+        """
+        self.vertex_count = 0
+        self.command_count = 0
+
+    def draw(self, views: dict[int, np.ndarray]) -> None:
+        """Draw the flushed primitives into the currently bound eye buffer.
+
+        World-locked primitives are depth tested against the scene, head-locked ones are drawn on top.
+
+        Parameters
+        ----------
+        views : dict[int, np.ndarray]
+            View matrix per `HUD_LAYER`, in the engine's upload layout.
+
+        Returns
+        -------
+        None
+        """
+        if len(self.batches) == 0:
+            return
+        self.shader.use()
+        self.mesh.arm()
+        glActiveTexture(GL_TEXTURE0)
+        glDepthMask(GL_FALSE)
+        current_layer, current_texture = None, None
+        for layer, texture, first, count in self.batches.tolist():
+            if layer != current_layer:
+                current_layer = layer
+                if layer == HUD_LAYER["HEAD"]:
+                    glDisable(GL_DEPTH_TEST)
+                glUniformMatrix4fv(self.view_location, 1, GL_FALSE, views[layer])
+            if texture != current_texture:
+                current_texture = texture
+                glBindTexture(GL_TEXTURE_2D, texture)
+            self.mesh.draw(GL_TRIANGLES, first, count)
+        glEnable(GL_DEPTH_TEST)
+        glDepthMask(GL_TRUE)
+
+    def destroy(self) -> None:
+        self.mesh.destroy()
+        glDeleteTextures(1, self.white)
+        self.shader.destroy()
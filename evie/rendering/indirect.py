@@ -0,0 +1,279 @@
+import numpy as np
+from OpenGL.GL import *
+from evie.core.config import *
+import evie.core.datatypes as dt
+from evie.rendering.mesh import Mesh
+from evie.rendering.material import Material
+from evie.rendering.shader import Shader
+from evie.utils import asset_path
+
+__all__ = ['MeshArena', 'IndirectRenderer', 'supports_multi_draw_indirect']
+
+
+def supports_multi_draw_indirect() -> bool:
+    """Whether the current context has `glMultiDrawElementsIndirect` with base instances, i.e. GL 4.3."""
+    version = (glGetIntegerv(GL_MAJOR_VERSION), glGetIntegerv(GL_MINOR_VERSION))
+    return version >= (4, 3) and bool(glMultiDrawElementsIndirect)
+
+
+class MeshArena:
+    """
+    One shared vertex and index buffer holding many meshes.
+
+    Each mesh is sub-allocated as a vertex range and an index range. Indices are stored already offset to the
+    mesh's first vertex, so draws need no base vertex, which GL 3.1 lacks.
+    """
+
+    def __init__(self) -> None:
+        self.ranges: dict[int, tuple[int, int]] = {}  # key: (first index, index count)
+        self.meshes: dict[int, Mesh] = {}
+        self.vertex_count = 0
+        self.index_count = 0
+
+        self.VAO = glGenVertexArrays(1)
+        glBindVertexArray(self.VAO)
+        self.VBO = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        # Position
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, dt.vertex.itemsize, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+        # Texture coordinates
+        glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, dt.vertex.itemsize, ctypes.c_void_p(12))
+        glEnableVertexAttribArray(1)
+        # Normal
+        glVertexAttribPointer(2, 3, GL_FLOAT, GL_FALSE, dt.vertex.itemsize, ctypes.c_void_p(20))
+        glEnableVertexAttribArray(2)
+        self.EBO = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
+        glBindVertexArray(0)
+
+    def _upload(self) -> None:
+        """Repack every mesh into freshly sized buffers."""
+        vertices = [mesh.vertex_data for mesh in self.meshes.values()]
+        counts = np.array([len(v) for v in vertices], dtype=np.int64)
+        base_vertices = np.cumsum(counts) - counts
+        indices = [mesh.index_data.astype(np.uint32) + np.uint32(base)
+                   for mesh, base in zip(self.meshes.values(), base_vertices)]
+
+        self.ranges.clear()
+        first = 0
+        for key, index_data in zip(self.meshes, indices):
+            self.ranges[key] = (first, len(index_data))
+            first += len(index_data)
+        self.vertex_count, self.index_count = int(counts.sum()), first
+
+        vertex_data = np.concatenate(vertices) if vertices else np.zeros(0, dtype=dt.vertex)
+        index_data = np.concatenate(indices) if indices else np.zeros(0, dtype=np.uint32)
+        glBindVertexArray(self.VAO)
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        glBufferData(GL_ARRAY_BUFFER, vertex_data.nbytes, vertex_data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, index_data.nbytes, index_data, GL_STATIC_DRAW)
+        glBindVertexArray(0)
+
+    def add(self, key: int, mesh: Mesh) -> None:
+        """Add or replace a mesh.
+
+        Parameters
+        ----------
+        key : int
+            Identifier of the mesh, e.g. its entity type.
+        mesh : Mesh
+            Mesh whose CPU vertex and index data is copied into the arena.
+
+        Returns
+        -------
+        None
+        """
+        self.meshes[key] = mesh
+        self._upload()
+
+    def remove(self, key: int) -> None:
+        self.meshes.pop(key)
+        self._upload()
+
+    def destroy(self) -> None:
+        glDeleteBuffers(2, (self.VBO, self.EBO))
+        glDeleteVertexArrays(1, self.VAO)
+
+
+class IndirectRenderer:
+    """
+    Draws every dynamic entity from a shared mesh arena with one indirect command per entity type.
+
+    Each frame `prepare` writes the model matrices of all entities into a texture buffer and fills a
+    `DrawElementsIndirectCommand` buffer with NumPy, one instanced command per type. Commands whose types share
+    a material are submitted with a single `glMultiDrawElementsIndirect` per eye where the context supports it
+    (GL 4.3), otherwise with a loop of instanced draws. The vertex shader finds its model matrix by draw index:
+    with multi-draw it comes from an instanced attribute offset by the command's base instance, in the loop
+    from a uniform plus the instance ID.
+    """
+
+    def __init__(self, projection: np.ndarray, multi_draw: bool = None) -> None:
+        """Create the renderer.
+
+        Parameters
+        ----------
+        projection : np.ndarray
+            Eye projection matrix, in the engine's upload layout.
+        multi_draw : bool
+            Whether to use `glMultiDrawElementsIndirect`, detected from the context by default.
+
+        Returns
+        -------
+        None
+        """
+        self.multi_draw = supports_multi_draw_indirect() if multi_draw is None else multi_draw
+        self.arena = MeshArena()
+
+        self.shader = Shader(asset_path("shaders/indirect.vert"), asset_path("shaders/fragment.frag"))
+        self.shader.use()
+        program = self.shader.program
+        glUniform1i(glGetUniformLocation(program, "imageTexture"), 0)
+        glUniform1i(glGetUniformLocation(program, "occlusionDepth"), 1)
+        glUniform1i(glGetUniformLocation(program, "drawData"), 2)
+        glUniform4f(glGetUniformLocation(program, "baseColor"), 1.0, 1.0, 1.0, 1.0)
+        glUniformMatrix4fv(glGetUniformLocation(program, "projection"), 1, GL_FALSE, projection)
+        self.locations = {
+            name: glGetUniformLocation(program, name)
+            for name in ("view", "viewport", "occlusionEnabled", "occlusionRect", "drawIndexBase")
+        }
+        glUniform1i(glGetUniformLocation(program, "baseInstance"), int(self.multi_draw))
+
+        # Instanced draw index attribute, 0, 1, 2, ... so instance i of a command reads base instance + i.
+        # Attribute divisors need GL 3.3, so it is only set up for multi-draw.
+        self.draw_index_buffer = glGenBuffers(1)
+        self.draw_capacity = 0
+        # Per-draw model matrices
+        self.draw_data_buffer = glGenBuffers(1)
+        self.draw_data_texture = glGenTextures(1)
+        self.indirect_buffer = glGenBuffers(1) if self.multi_draw else None
+
+        self.commands = np.zeros(0, dtype=dt.draw_elements_indirect_command)
+        # Runs of commands sharing a material: material, first command, command count
+        self.groups: list[tuple[Material, int, int]] = []
+
+    def add_mesh(self, ent_type: int, mesh: Mesh) -> None:
+        self.arena.add(ent_type, mesh)
+
+    def remove_mesh(self, ent_type: int) -> None:
+        self.arena.remove(ent_type)
+
+    def _reserve(self, draw_count: int) -> None:
+        """Grow the draw index attribute buffer to address `draw_count` draws."""
+        if not self.multi_draw or draw_count <= self.draw_capacity:
+            return
+        self.draw_capacity = max(draw_count, 2 * self.draw_capacity, 1024)
+        glBindVertexArray(self.arena.VAO)
+        glBindBuffer(GL_ARRAY_BUFFER, self.draw_index_buffer)
+        glBufferData(GL_ARRAY_BUFFER, self.draw_capacity * 4, np.arange(self.draw_capacity, dtype=np.int32),
+                     GL_STATIC_DRAW)
+        glVertexAttribIPointer(3, 1, GL_INT, 4, ctypes.c_void_p(0))
+        glVertexAttribDivisor(3, 1)
+        glEnableVertexAttribArray(3)
+        glBindVertexArray(0)
+
+    def prepare(self, batches: list[tuple[int, Material, np.ndarray]]) -> None:
+        """Build this frame's draw commands and per-draw data. Call once per frame, before `draw`.
+
+        Parameters
+        ----------
+        batches : list[tuple[int, Material, np.ndarray]]
+            Entity type, its material and the (n, 4, 4) model matrices of its entities. Types sharing a material
+            are drawn together.
+
+        Returns
+        -------
+        None
+        """
+        batches = sorted((batch for batch in batches if len(batch[2]) and batch[0] in self.arena.ranges),
+                         key=lambda batch: id(batch[1]))
+        counts = np.array([len(models) for _, _, models in batches], dtype=np.uint32)
+        draw_count = int(counts.sum())
+        self._reserve(draw_count)
+
+        self.commands = np.zeros(len(batches), dtype=dt.draw_elements_indirect_command)
+        ranges = np.array([self.arena.ranges[ent_type] for ent_type, _, _ in batches], dtype=np.uint32)
+        if len(batches):
+            self.commands['first_index'] = ranges[:, 0]
+            self.commands['count'] = ranges[:, 1]
+            self.commands['instance_count'] = counts
+            self.commands['base_instance'] = np.cumsum(counts) - counts
+
+        models = (np.concatenate([models for _, _, models in batches]).astype(np.float32, copy=False) if batches
+                  else np.empty((0, 4, 4), dtype=np.float32))
+
+        # Orphan and refill, the previous frame's data may still be in use
+        glBindBuffer(GL_TEXTURE_BUFFER, self.draw_data_buffer)
+        glBufferData(GL_TEXTURE_BUFFER, max(models.nbytes, 64), None, GL_STREAM_DRAW)
+        if draw_count:
+            glBufferSubData(GL_TEXTURE_BUFFER, 0, models.nbytes, models)
+        glBindTexture(GL_TEXTURE_BUFFER, self.draw_data_texture)
+        glTexBuffer(GL_TEXTURE_BUFFER, GL_RGBA32F, self.draw_data_buffer)
+
+        if self.multi_draw and len(self.commands):
+            glBindBuffer(GL_DRAW_INDIRECT_BUFFER, self.indirect_buffer)
+            glBufferData(GL_DRAW_INDIRECT_BUFFER, self.commands.nbytes, self.commands, GL_STREAM_DRAW)
+
+        self.groups = []
+        for i, (_, material, _) in enumerate(batches):
+            if self.groups and self.groups[-1][0] is material:
+                self.groups[-1] = (material, self.groups[-1][1], self.groups[-1][2] + 1)
+            else:
+                self.groups.append((material, i, 1))
+
+    def draw(self, view: np.ndarray, viewport: tuple[float, float, float, float], occlusion: bool,
+             occlusion_rect: np.ndarray) -> None:
+        """Draw the prepared commands into the currently bound eye buffer.
+
+        Parameters
+        ----------
+        view : np.ndarray
+            Eye view matrix, in the engine's upload layout.
+        viewport : tuple[float, float, float, float]
+            Eye viewport in pixels.
+        occlusion : bool
+            Whether to occlude with the real-world depth map, which must be bound to texture unit 1.
+        occlusion_rect : np.ndarray
+            Region of the eye covered by the depth map.
+
+        Returns
+        -------
+        None
+        """
+        if not self.groups:
+            return
+        self.shader.use()
+        glUniformMatrix4fv(self.locations["view"], 1, GL_FALSE, view)
+        glUniform4f(self.locations["viewport"], *viewport)
+        glUniform1i(self.locations["occlusionEnabled"], int(occlusion))
+        glUniform4fv(self.locations["occlusionRect"], 1, occlusion_rect)
+        glActiveTexture(GL_TEXTURE2)
+        glBindTexture(GL_TEXTURE_BUFFER, self.draw_data_texture)
+
+        glBindVertexArray(self.arena.VAO)
+        Mesh._armed = None
+        if self.multi_draw:
+            glBindBuffer(GL_DRAW_INDIRECT_BUFFER, self.indirect_buffer)
+            for material, first, count in self.groups:
+                material.use()
+                glMultiDrawElementsIndirect(GL_TRIANGLES, GL_UNSIGNED_INT,
+                                            ctypes.c_void_p(first * dt.draw_elements_indirect_command.itemsize),
+                                            count, 0)
+        else:
+            for material, first, count in self.groups:
+                material.use()
+                for command in self.commands[first:first + count].tolist():
+                    index_count, instance_count, first_index, _, base_instance = command
+                    glUniform1i(self.locations["drawIndexBase"], base_instance)
+                    glDrawElementsInstanced(GL_TRIANGLES, index_count, GL_UNSIGNED_INT,
+                                            ctypes.c_void_p(first_index * 4), instance_count)
+
+    def destroy(self) -> None:
+        buffers = [self.draw_index_buffer, self.draw_data_buffer]
+        if self.indirect_buffer is not None:
+            buffers.append(self.indirect_buffer)
+        glDeleteBuffers(len(buffers), buffers)
+        glDeleteTextures(1, self.draw_data_texture)
+        self.arena.destroy()
+        self.shader.destroy()
@@ -0,0 +1,311 @@
+import numpy as np
+from OpenGL.GL import *
+from evie.core.config import *
+from evie.rendering.shader import Shader
+
+__all__ = ['ClusteredLighting', 'bin_lights']
+
+# Texture units of the light buffers, after the image, occlusion depth and draw data
+CLUSTER_UNIT, INDEX_UNIT, LIGHT_UNIT = 3, 4, 5
+
+
+def bin_lights(positions: np.ndarray, radii: np.ndarray, view: np.ndarray, projection: np.ndarray, near: float,
+               far: float, grid: tuple[int, int, int]) -> tuple[np.ndarray, np.ndarray]:
+    """Assign point lights to the clusters of a view frustum they may reach.
+
+    The frustum is split into screen tiles in x and y and exponentially growing depth slices in z. Each light's
+    sphere is bounded conservatively by a screen and depth range, and the light is listed in every cluster of it.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        (n, 3) world positions.
+    radii : np.ndarray
+        (n,) ranges beyond which the lights contribute nothing.
+    view : np.ndarray
+        View matrix, in the engine's upload layout.
+    projection : np.ndarray
+        Symmetric perspective projection, in the engine's upload layout.
+    near : float
+    far : float
+        Depth range covered by the slices.
+    grid : tuple[int, int, int]
+        Clusters along x, y and depth.
+
+    Returns
+    -------
+    np.ndarray
+        (x * y * z, 2) uint32 offset into the index list and light count per cluster, x fastest.
+    np.ndarray
+        uint32 light indices, grouped by cluster.
+    """
+    grid_x, grid_y, grid_z = grid
+    cluster_count = grid_x * grid_y * grid_z
+
+    # Row vectors multiply on the left, view space looks down -z
+    centers = positions @ view[:3, :3] + view[3, :3]
+    depths = -centers[:, 2]
+    low_depth = np.maximum(depths - radii, near)
+    high_depth = np.minimum(depths + radii, far)
+
+    def ndc_range(coordinate: np.ndarray, scale: float) -> tuple[np.ndarray, np.ndarray]:
+        # coordinate / depth is monotonic in both over the box, so its extremes are at the corners
+        corners = np.stack((
+            (coordinate - radii) / low_depth, (coordinate - radii) / high_depth,
+            (coordinate + radii) / low_depth, (coordinate + radii) / high_depth
+        )) * scale
+        return corners.min(axis=0), corners.max(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_low, x_high = ndc_range(centers[:, 0], projection[0, 0])
+        y_low, y_high = ndc_range(centers[:, 1], projection[1, 1])
+    reached = (low_depth <= high_depth) & (x_high >= -1) & (x_low <= 1) & (y_high >= -1) & (y_low <= 1)
+    lights = np.flatnonzero(reached)
+
+    def tiles(low: np.ndarray, high: np.ndarray, count: int) -> tuple[np.ndarray, np.ndarray]:
+        first = np.clip(np.floor((low[lights] + 1) / 2 * count), 0, count - 1).astype(np.int64)
+        last = np.clip(np.floor((high[lights] + 1) / 2 * count), 0, count - 1).astype(np.int64)
+        return first, last
+
+    def slices(depth: np.ndarray) -> np.ndarray:
+        return np.clip(np.floor(np.log(depth[lights] / near) / np.log(far / near) * grid_z), 0, grid_z - 1).astype(
+            np.int64)
+
+    x_first, x_last = tiles(x_low, x_high, grid_x)
+    y_first, y_last = tiles(y_low, y_high, grid_y)
+    z_first, z_last = slices(low_depth), slices(high_depth)
+
+    # Expand every light into the clusters of its box
+    size_x, size_y, size_z = x_last - x_first + 1, y_last - y_first + 1, z_last - z_first + 1
+    volumes = size_x * size_y * size_z
+    total = int(volumes.sum())
+    local = np.arange(total) - np.repeat(np.cumsum(volumes) - volumes, volumes)
+    repeat_x, repeat_y = np.repeat(size_x, volumes), np.repeat(size_y, volumes)
+    cluster_x = np.repeat(x_first, volumes) + local % repeat_x
+    cluster_y = np.repeat(y_first, volumes) + (local // repeat_x) % repeat_y
+    cluster_z = np.repeat(z_first, volumes) + local // (repeat_x * repeat_y)
+    clusters = (cluster_z * grid_y + cluster_y) * grid_x + cluster_x
+
+    order = np.argsort(clusters, kind='stable')
+    indices = np.repeat(lights, volumes)[order].astype(np.uint32)
+    counts = np.bincount(clusters, minlength=cluster_count)
+    grid_data = np.empty((cluster_count, 2), dtype=np.uint32)
+    grid_data[:, 0] = np.cumsum(counts) - counts
+    grid_data[:, 1] = counts
+    return grid_data, indices
+
+
+class ClusteredLighting:
+    """
+    Point lights shaded per fragment through a clustered light grid.
+
+    Lights live in preallocated arrays and are addressed by integer handles. Every eye, the lights are binned into
+    a 3D grid of view frustum clusters on the CPU. The grid, the light index lists and the light data are texture
+    buffers, so each fragment only evaluates the lights of its own cluster.
+
+    Shaders drawing lit geometry are set up once with `link`. While no light exists, they draw unlit.
+    """
+
+    def __init__(self, projection: np.ndarray, near: float, far: float,
+                 grid: tuple[int, int, int] = LIGHT_CLUSTER_GRID, capacity: int = LIGHT_CAPACITY) -> None:
+        """Create the lighting with no lights.
+
+        Parameters
+        ----------
+        projection : np.ndarray
+            Eye projection matrix, in the engine's upload layout.
+        near : float
+        far : float
+            Depth range of the clusters, that of the projection.
+        grid : tuple[int, int, int]
+            Clusters along x, y and depth.
+        capacity : int
+            Initial number of lights. Grows as needed.
+
+        Returns
+        -------
+        None
+        """
+        self.projection = projection
+        self.near, self.far = near, far
+        self.grid = grid
+
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.colors = np.zeros((capacity, 3), dtype=np.float32)  # Premultiplied by intensity
+        self.radii = np.zeros(capacity, dtype=np.float32)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.free: list[int] = []
+        self.count = 0  # Handles handed out so far
+        self.dirty = True
+
+        # Per frame light data, and per eye cluster grid and index lists
+        self.buffers = glGenBuffers(3)
+        self.textures = glGenTextures(3)
+        self.light_buffer, self.cluster_buffer, self.index_buffer = self.buffers
+        self.light_texture, self.cluster_texture, self.index_texture = self.textures
+        for buffer, texture, texture_format in zip(self.buffers, self.textures, (GL_RGBA32F, GL_RG32UI, GL_R32UI)):
+            glBindBuffer(GL_TEXTURE_BUFFER, buffer)
+            glBufferData(GL_TEXTURE_BUFFER, 16, None, GL_STREAM_DRAW)
+            glBindTexture(GL_TEXTURE_BUFFER, texture)
+            glTexBuffer(GL_TEXTURE_BUFFER, texture_format, buffer)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+
+        self.shaders: dict[int, int] = {}  # program: lightingEnabled location
+        self.light_count = 0
+
+    def link(self, shader: Shader) -> None:
+        """Point a shader's light uniforms at the light buffers.
+
+        Parameters
+        ----------
+        shader : Shader
+            Program built with the lit fragment shader.
+
+        Returns
+        -------
+        None
+        """
+        program = shader.program
+        glUseProgram(program)
+        glUniform1i(glGetUniformLocation(program, "lightClusters"), CLUSTER_UNIT)
+        glUniform1i(glGetUniformLocation(program, "lightIndices"), INDEX_UNIT)
+        glUniform1i(glGetUniformLocation(program, "lightData"), LIGHT_UNIT)
+        glUniform3i(glGetUniformLocation(program, "clusterGrid"), *self.grid)
+        glUniform2f(glGetUniformLocation(program, "clusterDepth"), self.near, self.far)
+        glUniform3f(glGetUniformLocation(program, "ambientLight"), *LIGHT_AMBIENT)
+        self.shaders[program] = glGetUniformLocation(program, "lightingEnabled")
+
+    def add(self, position: tuple[float, float, float], color: tuple[float, float, float] = (1.0, 1.0, 1.0),
+            radius: float = 5.0, intensity: float = 1.0) -> int:
+        """Add a point light.
+
+        Parameters
+        ----------
+        position : tuple[float, float, float]
+            World position.
+        color : tuple[float, float, float]
+            Linear RGB color.
+        radius : float
+            Distance at which the light fades out completely.
+        intensity : float
+            Color multiplier.
+
+        Returns
+        -------
+        int
+            Handle of the light.
+        """
+        if self.free:
+            light = self.free.pop()
+        else:
+            if self.count == len(self.active):
+                self._grow()
+            light = self.count
+            self.count += 1
+        self.active[light] = True
+        self.update(light, position, color, radius, intensity)
+        return light
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self.active)
+        for name in ("positions", "colors", "radii", "active"):
+            array = getattr(self, name)
+            grown = np.zeros((capacity, *array.shape[1:]), dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def update(self, light: int, position: tuple[float, float, float] = None,
+               color: tuple[float, float, float] = None, radius: float = None, intensity: float = 1.0) -> None:
+        """Change a light. Omitted values are kept, except the intensity, which applies to a given color.
+
+        Parameters
+        ----------
+        light : int
+        position : tuple[float, float, float]
+        color : tuple[float, float, float]
+        radius : float
+        intensity : float
+
+        Returns
+        -------
+        None
+        """
+        if position is not None:
+            self.positions[light] = position
+        if color is not None:
+            self.colors[light] = np.asarray(color, dtype=np.float32) * intensity
+        if radius is not None:
+            self.radii[light] = radius
+        self.dirty = True
+
+    def remove(self, light: int) -> None:
+        """Remove a light, freeing its handle for reuse.
+
+        Parameters
+        ----------
+        light : int
+
+        Returns
+        -------
+        None
+        """
+        self.active[light] = False
+        self.free.append(light)
+        self.dirty = True
+
+    def prepare(self) -> None:
+        """Upload the lights if any changed, and switch lit shading on or off. Call once per frame.
+
+        Returns
+        -------
+        None
+        """
+        if self.dirty:
+            self.dirty = False
+            self.lights = np.flatnonzero(self.active[:self.count])
+            self.light_count = len(self.lights)
+            data = np.zeros((max(self.light_count, 1), 2, 4), dtype=np.float32)
+            data[:self.light_count, 0, :3] = self.positions[self.lights]
+            data[:self.light_count, 0, 3] = self.radii[self.lights]
+            data[:self.light_count, 1, :3] = self.colors[self.lights]
+            glBindBuffer(GL_TEXTURE_BUFFER, self.light_buffer)
+            glBufferData(GL_TEXTURE_BUFFER, data.nbytes, data, GL_STREAM_DRAW)
+            glBindBuffer(GL_TEXTURE_BUFFER, 0)
+        for program, location in self.shaders.items():
+            glUseProgram(program)
+            glUniform1i(location, int(LIGHTING and self.light_count > 0))
+
+    def bind(self, view: np.ndarray) -> None:
+        """Bin the lights into the clusters of one eye, and bind the light buffers for drawing it.
+
+        Parameters
+        ----------
+        view : np.ndarray
+            View matrix of the eye, in the engine's upload layout.
+
+        Returns
+        -------
+        None
+        """
+        if not LIGHTING or self.light_count == 0:
+            return
+        lights = self.lights
+        grid, indices = bin_lights(self.positions[lights], self.radii[lights], view, self.projection, self.near,
+                                   self.far, self.grid)
+        if len(indices) == 0:
+            indices = np.zeros(1, dtype=np.uint32)
+        glBindBuffer(GL_TEXTURE_BUFFER, self.cluster_buffer)
+        glBufferData(GL_TEXTURE_BUFFER, grid.nbytes, grid, GL_STREAM_DRAW)
+        glBindBuffer(GL_TEXTURE_BUFFER, self.index_buffer)
+        glBufferData(GL_TEXTURE_BUFFER, indices.nbytes, indices, GL_STREAM_DRAW)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+
+        for unit, texture in ((CLUSTER_UNIT, self.cluster_texture), (INDEX_UNIT, self.index_texture),
+                              (LIGHT_UNIT, self.light_texture)):
+            glActiveTexture(GL_TEXTURE0 + unit)
+            glBindTexture(GL_TEXTURE_BUFFER, texture)
+        glActiveTexture(GL_TEXTURE0)
+
+    def destroy(self) -> None:
+        glDeleteTextures(3, self.textures)
+        glDeleteBuffers(3, self.buffers)
@@ -1,12 +1,40 @@
+import numpy as np
 from PIL import Image
 from OpenGL.GL import *
 
-__all__ = ['Material']
+__all__ = ['Material', 'load_image']
+
+
+def load_image(filepath: str) -> np.ndarray:
+    """Read and decode an image into RGBA texels, bottom row first, without touching OpenGL.
+
+    Safe to call from worker threads and processes.
+
+    Parameters
+    ----------
+    filepath : str
+
+    Returns
+    -------
+    np.ndarray
+        (height, width, 4) uint8 texels.
+    """
+    with Image.open(filepath) as image:
+        return np.asarray(image.convert('RGBA').transpose(Image.FLIP_TOP_BOTTOM))
 
 
 class Material:
 
-    def __init__(self, filepath):
+    def __init__(self, filepath: str = None, image: np.ndarray = None):
+        """Create a texture from an image file, or from already decoded texels.
+
+        Parameters
+        ----------
+        filepath : str
+            Image file, decoded on the calling thread.
+        image : np.ndarray
+            (height, width, 4) uint8 texels from `load_image`, used instead of `filepath`.
+        """
 
         self.texture = glGenTextures(1)
         glBindTexture(GL_TEXTURE_2D, self.texture)
@@ -15,11 +43,14 @@ class Material:
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
 
-        image = Image.open(filepath).convert('RGBA')
-        image_width, image_height = image.size
-        image_data = image.transpose(Image.FLIP_TOP_BOTTOM).tobytes()
+        if image is None:
+            image = load_image(filepath)
+        image_height, image_width = image.shape[:2]
+        image_data = np.ascontiguousarray(image, dtype=np.uint8)
         glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, image_width, image_height, 0, GL_RGBA, GL_UNSIGNED_BYTE, image_data)
         glGenerateMipmap(GL_TEXTURE_2D)
+        # GPU memory used by the texture, a full mipmap chain adds a third
+        self.nbytes = image_width * image_height * 4 * 4 // 3
 
     def use(self):
         # TODO: Use different texture units
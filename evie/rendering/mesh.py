@@ -1,9 +1,52 @@
 import numpy as np
 from OpenGL.GL import *
 import evie.core.datatypes as dt
+from evie.core.config import *
 from evie.utils import load_mesh
 
-__all__ = ['Mesh', 'Quad', 'ObjMesh']
+__all__ = ['Mesh', 'DynamicMesh', 'Quad', 'ObjMesh', 'index_type', 'obj_vertex_data']
+
+
+def index_type(vertex_count: int) -> tuple[type, int]:
+    """Pick the smallest index type able to address a number of vertices.
+
+    Parameters
+    ----------
+    vertex_count : int
+
+    Returns
+    -------
+    type
+        NumPy index dtype.
+    int
+        Matching OpenGL index type.
+    """
+    if vertex_count <= 256:
+        return np.ubyte, GL_UNSIGNED_BYTE
+    elif vertex_count <= 65536:
+        return np.ushort, GL_UNSIGNED_SHORT
+    return np.uint32, GL_UNSIGNED_INT
+
+
+def obj_vertex_data(filepath: str) -> np.ndarray:
+    """Read and parse an .obj file into vertex data, without touching OpenGL.
+
+    Safe to call from worker threads and processes.
+
+    Parameters
+    ----------
+    filepath : str
+
+    Returns
+    -------
+    np.ndarray[dt.vertex]
+    """
+    raw = np.array(load_mesh(filepath), dtype=np.float32).reshape(-1, 8)
+
+    vertex_data = np.zeros(len(raw), dtype=dt.vertex)
+    for i, name in enumerate(('x', 'y', 'z', 's', 't', 'nx', 'ny', 'nz')):
+        vertex_data[name] = raw[:, i]
+    return vertex_data
 
 
 class Mesh:
@@ -20,15 +63,19 @@ class Mesh:
         Element Buffer Object ID.
     """
 
+    # Mesh whose vertex array object is currently bound
+    _armed: 'Mesh | None' = None
+
     def __init__(self, vertex_data: np.ndarray, index_data: np.ndarray = None) -> None:
         """Create a mesh from vertex and index data.
 
         Parameters
         ----------
         vertex_data : np.ndarray[dt.vertex]
-            Array of vertices. Each vertex is represented by a tuple of x, y, z, s, t.
-        index_data : np.ndarray[np.ubyte]
+            Array of vertices. Each vertex is represented by a tuple of x, y, z, s, t, nx, ny, nz.
+        index_data : np.ndarray[np.ubyte | np.ushort | np.uint32]
             Array of indices. Dictates the order in which vertices are drawn. Required for proper triangle rendering.
+            Defaults to drawing the vertices in order, with the smallest index type that fits.
 
         Returns
         -------
@@ -36,13 +83,19 @@ class Mesh:
         """
 
         if index_data is None:
-            index_data = np.arange(len(vertex_data), dtype=np.ubyte)
+            index_data = np.arange(len(vertex_data), dtype=index_type(len(vertex_data))[0])
 
         self.vertex_count = len(index_data)
-        self.is_armed = False
+        self.index_size = index_data.itemsize
+        self.index_type = {1: GL_UNSIGNED_BYTE, 2: GL_UNSIGNED_SHORT, 4: GL_UNSIGNED_INT}[index_data.itemsize]
+        # CPU copies, used to build static batches
+        self.vertex_data = vertex_data
+        self.index_data = index_data
+        # GPU memory used by the buffers
+        self.nbytes = vertex_data.nbytes + index_data.nbytes
 
         # Generate Vertex Array Object
-        # x, y, z, s, t
+        # x, y, z, s, t, nx, ny, nz
         self.VAO = glGenVertexArrays(1)
         glBindVertexArray(self.VAO)
 
@@ -62,7 +115,13 @@ class Mesh:
         attribute_index = 1
         size = 2
         offset += 12  # 3 * 4 bytes
-        glVertexAttribIPointer(attribute_index, size, GL_UNSIGNED_INT, stride, ctypes.c_void_p(offset))
+        glVertexAttribPointer(attribute_index, size, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(offset))
+        glEnableVertexAttribArray(attribute_index)
+        # Normal
+        attribute_index = 2
+        size = 3
+        offset += 8  # 2 * 4 bytes
+        glVertexAttribPointer(attribute_index, size, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(offset))
         glEnableVertexAttribArray(attribute_index)
 
         # Generate Element Buffer Object
@@ -80,7 +139,11 @@ class Mesh:
         None
         """
         glBindVertexArray(self.VAO)
-        self.is_armed = True
+        Mesh._armed = self
+
+    @property
+    def is_armed(self) -> bool:
+        return Mesh._armed is self
 
     def draw(self, mode: int = GL_TRIANGLES) -> None:
         """Draws the mesh.
@@ -99,19 +162,250 @@ class Mesh:
         Warnings
         --------
             To properly draw the mesh, the vertex array object must be armed. Call the `arm` method before drawing.
-            This method does not unbind the vertex array object.
+            This method does not unbind the vertex array object, so the mesh can be drawn repeatedly after arming
+            it once.
 
         """
         if not self.is_armed:
             raise RuntimeError("Vertex Array Object is not armed. Call the `arm` method before drawing.")
-        glDrawElements(mode, self.vertex_count, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
-        self.is_armed = False
+        glDrawElements(mode, self.vertex_count, self.index_type, ctypes.c_void_p(0))
 
     def destroy(self) -> None:
+        if self.is_armed:
+            Mesh._armed = None
         glDeleteBuffers(2, (self.VBO, self.EBO))
         glDeleteVertexArrays(1, self.VAO)
 
 
+class DynamicMesh(Mesh):
+    """
+    Vertex buffer for geometry rewritten every frame, such as HUD text, gauges and debug shapes.
+
+    The buffer is split into `segments` ring segments, one per frame in flight. Each frame the producer writes
+    its vertices into the next segment and draws sub-ranges of it, so nothing is reallocated and the CPU never
+    writes to memory the GPU may still be reading.
+
+    With sync objects available the segment is mapped with `glMapBufferRange` and unsynchronized writes,
+    guarded by a fence per segment, and producers fill the mapped memory in place with NumPy. Otherwise the
+    buffer is orphaned at the start of each frame, and vertices are written to a staging array and uploaded
+    with `glBufferSubData`.
+    """
+
+    def __init__(self, vertex_format: np.dtype, attributes: tuple[int, ...], capacity: int,
+                 segments: int = DYNAMIC_BUFFER_SEGMENTS, mode: str = DYNAMIC_BUFFER_MODE) -> None:
+        """Create a dynamic mesh.
+
+        Parameters
+        ----------
+        vertex_format : np.dtype
+            Vertex structure made of float32 fields, e.g. `dt.hud_vertex`.
+        attributes : tuple[int, ...]
+            Number of floats in each vertex attribute, in attribute index order, e.g. (3, 2, 4).
+        capacity : int
+            Vertices per frame. The buffer grows if a frame writes more.
+        segments : int
+            Frames in flight in map mode.
+        mode : str
+            "map", "orphan", or "auto" to map when sync objects are available.
+
+        Returns
+        -------
+        None
+        """
+        if mode == "auto":
+            mode = "map" if bool(glFenceSync) else "orphan"
+        self.mode = mode
+        self.vertex_format = vertex_format
+        self.segments = segments if mode == "map" else 1
+        self.capacity = capacity
+        self.fences: list = [None] * self.segments
+        self.segment = 0
+        self.used = 0
+        self.vertex_count = 0
+        self.EBO = None
+        # Vertices being written in orphan mode, grown as needed
+        self.staging = np.empty(capacity if mode != "map" else 0, dtype=vertex_format)
+
+        self.VAO = glGenVertexArrays(1)
+        glBindVertexArray(self.VAO)
+        self.VBO = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        glBufferData(GL_ARRAY_BUFFER, self.segments * capacity * vertex_format.itemsize, None, GL_STREAM_DRAW)
+
+        offset = 0
+        for attribute_index, size in enumerate(attributes):
+            glVertexAttribPointer(attribute_index, size, GL_FLOAT, GL_FALSE, vertex_format.itemsize,
+                                  ctypes.c_void_p(offset))
+            glEnableVertexAttribArray(attribute_index)
+            offset += size * 4
+        glBindVertexArray(0)
+
+    @property
+    def base_vertex(self) -> int:
+        """First vertex of the current frame's segment."""
+        return self.segment * self.capacity
+
+    def begin_frame(self) -> None:
+        """Move on to the next segment. Call once per frame, before writing.
+
+        Fences the draws issued from the previous segment, then waits for the GPU to finish with the segment
+        about to be reused. With enough segments that wait returns immediately.
+
+        Returns
+        -------
+        None
+        """
+        if self.mode == "map":
+            if self.used:
+                self.fences[self.segment] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+            self.segment = (self.segment + 1) % self.segments
+            fence = self.fences[self.segment]
+            if fence is not None:
+                while glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT, 1_000_000) == GL_TIMEOUT_EXPIRED:
+                    pass
+                glDeleteSync(fence)
+                self.fences[self.segment] = None
+        elif self.used:
+            # Orphan the storage, the driver hands out fresh memory while the GPU finishes with the old
+            glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+            glBufferData(GL_ARRAY_BUFFER, self.capacity * self.vertex_format.itemsize, None, GL_STREAM_DRAW)
+        self.used = 0
+
+    def _grow(self, count: int) -> None:
+        """Reallocate for at least `count` vertices per frame. Waits for the GPU, so should be rare.
+
+        Vertices already written this frame are read back and moved to the first segment, so the ranges handed
+        out for them stay valid.
+        """
+        glFinish()
+        for i, fence in enumerate(self.fences):
+            if fence is not None:
+                glDeleteSync(fence)
+                self.fences[i] = None
+        itemsize = self.vertex_format.itemsize
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        written = np.empty(self.used, dtype=self.vertex_format)
+        if self.used:
+            glGetBufferSubData(GL_ARRAY_BUFFER, self.base_vertex * itemsize, written.nbytes, written)
+        self.capacity = max(count, 2 * self.capacity)
+        self.segment = 0
+        glBufferData(GL_ARRAY_BUFFER, self.segments * self.capacity * itemsize, None, GL_STREAM_DRAW)
+        if self.used:
+            glBufferSubData(GL_ARRAY_BUFFER, 0, written.nbytes, written)
+
+    def map(self, count: int) -> np.ndarray:
+        """Reserve `count` vertices in the current frame and return them for writing.
+
+        In map mode the array views the mapped buffer memory itself, in orphan mode a reused staging array. Either
+        way it is only valid until `unmap`: mapped memory may be unmapped or moved by the driver, and touching it
+        afterwards can crash. Every call must be followed by `unmap` before drawing, and before the next `map`.
+
+        Parameters
+        ----------
+        count : int
+
+        Returns
+        -------
+        np.ndarray
+            Writable array of `count` vertices.
+        """
+        if self.used + count > self.capacity:
+            self._grow(self.used + count)
+        self._mapped_first = self.used
+        self._mapped_count = count
+        self.used += count
+
+        if self.mode != "map":
+            if count > len(self.staging):
+                self.staging = np.empty(max(count, 2 * len(self.staging)), dtype=self.vertex_format)
+            return self.staging[:count]
+        if not count:
+            return np.empty(0, dtype=self.vertex_format)
+
+        nbytes = count * self.vertex_format.itemsize
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        address = glMapBufferRange(
+            GL_ARRAY_BUFFER, (self.base_vertex + self._mapped_first) * self.vertex_format.itemsize, nbytes,
+            GL_MAP_WRITE_BIT | GL_MAP_UNSYNCHRONIZED_BIT | GL_MAP_INVALIDATE_RANGE_BIT
+        )
+        if not isinstance(address, int):
+            address = ctypes.cast(address, ctypes.c_void_p).value
+        mapped = np.ctypeslib.as_array(ctypes.cast(address, ctypes.POINTER(ctypes.c_ubyte)), shape=(nbytes,))
+        return mapped.view(self.vertex_format)
+
+    def unmap(self) -> int:
+        """Finish writing the vertices returned by `map`.
+
+        Returns
+        -------
+        int
+            First vertex of the written range, to pass to `draw`.
+        """
+        if not self._mapped_count:
+            return self._mapped_first
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        if self.mode == "map":
+            glUnmapBuffer(GL_ARRAY_BUFFER)
+        else:
+            glBufferSubData(GL_ARRAY_BUFFER, self._mapped_first * self.vertex_format.itemsize,
+                            self._mapped_count * self.vertex_format.itemsize, self.staging[:self._mapped_count])
+        return self._mapped_first
+
+    def write(self, vertices: np.ndarray) -> int:
+        """Copy vertices into the current frame.
+
+        Parameters
+        ----------
+        vertices : np.ndarray
+            Vertices in the mesh's vertex format.
+
+        Returns
+        -------
+        int
+            First vertex of the written range, to pass to `draw`.
+        """
+        if len(vertices) == 0:
+            return self.used
+        self.map(len(vertices))[:] = vertices
+        return self.unmap()
+
+    def draw(self, mode: int = GL_TRIANGLES, first: int = 0, count: int = None) -> None:
+        """Draw a range of the vertices written this frame.
+
+        Parameters
+        ----------
+        mode : int
+            Primitive type.
+        first : int
+            First vertex, as returned by `write` or `unmap`.
+        count : int
+            Number of vertices, defaults to everything written this frame from `first`.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        RuntimeError
+            If the vertex array object is not armed.
+        """
+        if not self.is_armed:
+            raise RuntimeError("Vertex Array Object is not armed. Call the `arm` method before drawing.")
+        if count is None:
+            count = self.used - first
+        glDrawArrays(mode, self.base_vertex + first, count)
+
+    def destroy(self) -> None:
+        if self.is_armed:
+            Mesh._armed = None
+        for fence in self.fences:
+            if fence is not None:
+                glDeleteSync(fence)
+        glDeleteBuffers(1, [self.VBO])
+        glDeleteVertexArrays(1, self.VAO)
+
+
 class Quad(Mesh):
     """
     A simple quad mesh with texture coordinates.
@@ -119,30 +413,19 @@ class Quad(Mesh):
     def __init__(self):
 
         vertex_data = np.zeros(4, dtype=dt.vertex)
-        vertex_data[0] = (-0.5, -0.5, 0.0, 0.0, 0.0)
-        vertex_data[1] = (0.5, -0.5, 0.0, 1.0, 0.0)
-        vertex_data[2] = (0.5, 0.5, 0.0, 1.0, 1.0)
-        vertex_data[3] = (-0.5, 0.5, 0.0, 0.0, 1.0)
+        vertex_data[0] = (-0.5, -0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+        vertex_data[1] = (0.5, -0.5, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0)
+        vertex_data[2] = (0.5, 0.5, 0.0, 1.0, 1.0, 0.0, 0.0, 1.0)
+        vertex_data[3] = (-0.5, 0.5, 0.0, 0.0, 1.0, 0.0, 0.0, 1.0)
 
         index_data = np.array((0, 1, 2, 2, 3, 0), dtype=np.ubyte)
 
         super().__init__(vertex_data, index_data)
 
 
-class ObjMesh(Mesh):  # TODO: Uses normals
+class ObjMesh(Mesh):
     """
     A mesh loaded from an .obj file.
     """
     def __init__(self, filepath: str):
-
-        raw = load_mesh(filepath)
-        vertex_count = len(raw)//8
-
-        print(vertex_count)
-
-        vertex_data = np.zeros(vertex_count, dtype=dt.vertex)
-        for i in range(vertex_count):
-            vertex_data[i] = (raw[i*8], raw[i*8+1], raw[i*8+2], raw[i*8+3], raw[i*8+4])
-
-        print(vertex_data)
-        super().__init__(vertex_data)
+        super().__init__(obj_vertex_data(filepath))
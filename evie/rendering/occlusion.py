@@ -0,0 +1,253 @@
+import numpy as np
+from OpenGL.GL import *
+from evie.core.config import *
+import evie.core.datatypes as dt
+from evie.rendering.shader import Shader
+from evie.rendering.mesh import Mesh
+from evie.objects.entity import Entity
+from evie.utils import asset_path
+
+__all__ = ['OcclusionCuller']
+
+# Unit cube corners, and its twelve triangles
+BOX_CORNERS = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float32)
+BOX_POINTS = np.append(BOX_CORNERS, np.ones((8, 1), dtype=np.float32), axis=1)  # Homogeneous, as row vectors
+BOX_TRIANGLES = np.array([
+    0, 1, 3, 0, 3, 2,  # -x
+    4, 6, 7, 4, 7, 5,  # +x
+    0, 4, 5, 0, 5, 1,  # -y
+    2, 3, 7, 2, 7, 6,  # +y
+    0, 2, 6, 0, 6, 4,  # -z
+    1, 5, 7, 1, 7, 3   # +z
+], dtype=np.ubyte)
+
+
+class OcclusionCuller:
+    """
+    Hardware occlusion culling of entities against the depth buffer of the previous frame.
+
+    After the opaque scene of an eye is drawn, the bounding box of every candidate entity is rasterized against its
+    depth with an occlusion query, without writing color or depth. The next frame reads back the results that are
+    available without waiting: entities whose box had no visible samples in either eye are skipped. Results still
+    in flight are handed to conditional rendering, so the GPU skips the draw on its own if the box was hidden.
+
+    Query objects are pooled and reused. A box whose last query has not been read back yet is not tested again
+    until it is, so a GPU running frames behind still delivers results. Only entity types enabled with `enable`
+    are tested.
+    """
+
+    def __init__(self, projection: np.ndarray, near: float = 0.1) -> None:
+        """Create the culler.
+
+        Parameters
+        ----------
+        projection : np.ndarray
+            Eye projection matrix, in the engine's upload layout.
+        near : float
+            Near plane distance. Eyes closer than this to a box always see its entity, as the box is clipped.
+
+        Returns
+        -------
+        None
+        """
+        self.shader = Shader(asset_path("shaders/occlusion.vert"), asset_path("shaders/occlusion.frag"))
+        self.shader.use()
+        glUniformMatrix4fv(glGetUniformLocation(self.shader.program, "projection"), 1, GL_FALSE, projection)
+        self.model_location = glGetUniformLocation(self.shader.program, "model")
+        self.view_location = glGetUniformLocation(self.shader.program, "view")
+        self.near = near
+
+        box = np.zeros(len(BOX_CORNERS), dtype=dt.vertex)
+        box['x'], box['y'], box['z'] = BOX_CORNERS[:, 0], BOX_CORNERS[:, 1], BOX_CORNERS[:, 2]
+        self.box = Mesh(box, BOX_TRIANGLES)
+
+        # Any-samples queries may stop counting at the first passing sample, GL 3.1 only has sample counts
+        version = (glGetIntegerv(GL_MAJOR_VERSION), glGetIntegerv(GL_MINOR_VERSION))
+        self.query_target = GL_ANY_SAMPLES_PASSED if version >= (3, 3) else GL_SAMPLES_PASSED
+        self.conditional = bool(glBeginConditionalRender)
+
+        self.types: set[int] = set()
+        self.free: list[int] = []
+        # Last issued query and last known visibility, per (eye, entity)
+        self.queries: dict[tuple[int, int], int] = {}
+        self.visible: dict[tuple[int, int], bool] = {}
+        # Unit cube to mesh bounds transform, per mesh
+        self.bounds: dict[int, np.ndarray] = {}
+
+        self.tested = 0
+        self.culled = 0
+        self.drawn = 0
+        self.deferred = 0
+
+    def enable(self, ent_type: int, enabled: bool = True) -> None:
+        """Enable or disable occlusion culling of an entity type.
+
+        Worth it for types that are expensive to draw and often hidden, not for small or cheap ones.
+
+        Parameters
+        ----------
+        ent_type : int
+        enabled : bool
+
+        Returns
+        -------
+        None
+        """
+        if enabled:
+            self.types.add(ent_type)
+        else:
+            self.types.discard(ent_type)
+
+    def _acquire(self) -> int:
+        if not self.free:
+            self.free.extend(int(query) for query in np.atleast_1d(glGenQueries(64)))
+        return self.free.pop()
+
+    def _box(self, mesh: Mesh) -> np.ndarray:
+        """Unit cube to mesh bounds transform, in the engine's upload layout."""
+        box = self.bounds.get(id(mesh))
+        if box is None:
+            vertices = mesh.vertex_data
+            low = np.array([vertices[axis].min() for axis in 'xyz'], dtype=np.float32)
+            high = np.array([vertices[axis].max() for axis in 'xyz'], dtype=np.float32)
+            box = np.diag(np.append(np.maximum(high - low, 1e-4), 1.0)).astype(np.float32)
+            box[3, :3] = low
+            self.bounds[id(mesh)] = box
+        return box
+
+    def begin_frame(self) -> None:
+        """Reset the per-frame statistics.
+
+        Returns
+        -------
+        None
+        """
+        self.tested = self.culled = self.drawn = self.deferred = 0
+
+    def filter(self, ent_type: int, entities: list[Entity]) -> np.ndarray | None:
+        """Find the entities whose boxes were hidden in every eye, as far as results are available.
+
+        Parameters
+        ----------
+        ent_type : int
+        entities : list[Entity]
+
+        Returns
+        -------
+        np.ndarray | None
+            Boolean mask of the entities to draw, None if the type is not culled.
+        """
+        if ent_type not in self.types:
+            return None
+        visible = np.zeros(len(entities), dtype=bool)
+        for i, entity in enumerate(entities):
+            for side in (LEFT, RIGHT):
+                key = (side, id(entity))
+                query = self.queries.get(key)
+                if query is not None and glGetQueryObjectuiv(query, GL_QUERY_RESULT_AVAILABLE):
+                    self.visible[key] = glGetQueryObjectuiv(query, GL_QUERY_RESULT) > 0
+                    self.free.append(self.queries.pop(key))
+                visible[i] |= self.visible.get(key, True)
+        drawn = int(visible.sum())
+        self.culled += len(entities) - drawn
+        self.drawn += drawn
+        return visible
+
+    def pending(self, side: int, entity: Entity) -> int | None:
+        """Query in flight for an entity's box in one eye, to draw the entity under conditional rendering.
+
+        Parameters
+        ----------
+        side : int
+        entity : Entity
+
+        Returns
+        -------
+        int | None
+            Query object, or None if the entity should be drawn unconditionally.
+        """
+        if not self.conditional:
+            return None
+        query = self.queries.get((side, id(entity)))
+        if query is not None:
+            self.deferred += 1
+        return query
+
+    def test(self, side: int, view: np.ndarray, meshes: dict[int, Mesh],
+             entities: dict[int, tuple[list[Entity], np.ndarray]]) -> None:
+        """Issue the box queries of one eye, against the depth of the opaque scene drawn into it.
+
+        Parameters
+        ----------
+        side : int
+        view : np.ndarray
+            View matrix of the eye, in the engine's upload layout.
+        meshes : dict[int, Mesh]
+            Mesh per entity type.
+        entities : dict[int, tuple[list[Entity], np.ndarray]]
+            All candidate entities per type, including those culled this frame, with their model matrices.
+
+        Returns
+        -------
+        None
+        """
+        eye = np.linalg.inv(view)[3, :3]
+        queries = {key: query for key, query in self.queries.items() if key[0] != side}
+        visible = {key: seen for key, seen in self.visible.items() if key[0] != side}
+        previous = {key: query for key, query in self.queries.items() if key[0] == side}
+
+        self.shader.use()
+        glUniformMatrix4fv(self.view_location, 1, GL_FALSE, view)
+        self.box.arm()
+        glColorMask(GL_FALSE, GL_FALSE, GL_FALSE, GL_FALSE)
+        glDepthMask(GL_FALSE)
+        for ent_type, (candidates, models) in entities.items():
+            if ent_type not in self.types or ent_type not in meshes:
+                continue
+            boxes = self._box(meshes[ent_type]) @ models
+            # Row vectors multiply on the left, so row 3 is the world-space origin of each box
+            corners = (BOX_POINTS @ boxes)[:, :, :3]
+            low, high = corners.min(axis=1), corners.max(axis=1)
+            # Eyes inside a box would see its clipped faces report it hidden
+            inside = np.all((eye > low - self.near) & (eye < high + self.near), axis=1).tolist()
+            for entity, model, eye_inside in zip(candidates, boxes, inside):
+                key = (side, id(entity))
+                visible[key] = self.visible.get(key, True)
+                if eye_inside:
+                    visible[key] = True
+                    continue
+                query = previous.pop(key, None)
+                if query is not None:
+                    # Still unread by `filter`, restarting it would lose the result, so wait for it
+                    queries[key] = query
+                    continue
+                query = self._acquire()
+                glUniformMatrix4fv(self.model_location, 1, GL_FALSE, model)
+                glBeginQuery(self.query_target, query)
+                self.box.draw()
+                glEndQuery(self.query_target)
+                queries[key] = query
+                self.tested += 1
+        glDepthMask(GL_TRUE)
+        glColorMask(GL_TRUE, GL_TRUE, GL_TRUE, GL_TRUE)
+
+        # Queries of entities that went away go back to the pool
+        self.free.extend(previous.values())
+        self.queries, self.visible = queries, visible
+
+    def stats(self) -> dict[str, int]:
+        """Entities culled and drawn this frame, box queries issued, and draws left to conditional rendering."""
+        return {
+            "tested": self.tested,
+            "culled": self.culled,
+            "drawn": self.drawn,
+            "deferred": self.deferred,
+            "pool": len(self.free) + len(self.queries)
+        }
+
+    def destroy(self) -> None:
+        queries = self.free + list(self.queries.values())
+        if queries:
+            glDeleteQueries(len(queries), queries)
+        self.box.destroy()
+        self.shader.destroy()
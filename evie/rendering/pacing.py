@@ -0,0 +1,220 @@
+import time
+from typing import Callable
+import numpy as np
+from evie.core.config import *
+
+__all__ = ['FrameStats', 'FrameScheduler']
+
+
+class FrameStats:
+    """
+    Rolling per-frame timing statistics.
+
+    All arrays are preallocated ring buffers of `capacity` frames, times are in seconds.
+    """
+
+    def __init__(self, capacity: int = FRAME_STATS_CAPACITY) -> None:
+        self.capacity = capacity
+        self.input_latency = np.zeros(capacity, dtype=np.float64)  # Input poll to swap
+        self.pose_latency = np.zeros(capacity, dtype=np.float64)  # Pose latch to swap
+        self.work_time = np.zeros(capacity, dtype=np.float64)  # Frame start to swap request
+        self.interval = np.zeros(capacity, dtype=np.float64)  # Swap to swap
+        self.frames = 0
+        self.missed_vsyncs = 0
+        self.missed_frames = 0
+        self.reprojected_frames = 0
+
+    def record(self, input_latency: float, pose_latency: float, work_time: float, interval: float,
+               missed: int) -> None:
+        i = self.frames % self.capacity
+        self.input_latency[i] = input_latency
+        self.pose_latency[i] = pose_latency
+        self.work_time[i] = work_time
+        self.interval[i] = interval
+        self.frames += 1
+        self.missed_vsyncs += missed
+        self.missed_frames += missed > 0
+
+    def summary(self) -> dict[str, float]:
+        """Summarise the frames currently in the window.
+
+        Returns
+        -------
+        dict[str, float]
+            Mean and percentiles of each measurement in milliseconds, plus frame and missed vsync counts.
+        """
+        n = min(self.frames, self.capacity)
+        result = {"frames": self.frames, "missed_vsyncs": self.missed_vsyncs, "missed_frames": self.missed_frames,
+                  "reprojected_frames": self.reprojected_frames}
+        if n == 0:
+            return result
+        for name in ("input_latency", "pose_latency", "work_time", "interval"):
+            values = getattr(self, name)[:n] * 1000.0
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            result[f"{name}_mean_ms"] = float(values.mean())
+            result[f"{name}_p50_ms"] = float(p50)
+            result[f"{name}_p95_ms"] = float(p95)
+            result[f"{name}_p99_ms"] = float(p99)
+        return result
+
+
+class FrameScheduler:
+    """
+    Predicts vsync times from swap timestamps and paces the frame loop.
+
+    With pacing enabled the loop sleeps after each swap so the next frame starts as late as possible while
+    still making the following vsync, which shortens the time between sampling input and displaying it.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter,
+                 refresh_rate: float = REFRESH_RATE,
+                 late_start: bool = FRAME_PACING,
+                 safety_margin: float = FRAME_PACING_MARGIN) -> None:
+        """Create a frame scheduler.
+
+        Parameters
+        ----------
+        clock : Callable[[], float]
+            Time source in seconds. Must match the clock used for any other timestamps, e.g. `glfw.get_time`.
+        refresh_rate : float
+            Nominal display refresh rate in Hz.
+        late_start : bool
+            Whether `wait` sleeps to delay the start of the next frame.
+        safety_margin : float
+            Time in seconds kept free before the predicted vsync.
+
+        Returns
+        -------
+        None
+        """
+        self.clock = clock
+        self.period = 1.0 / refresh_rate
+        self.late_start = late_start
+        self.safety_margin = safety_margin
+        self.stats = FrameStats()
+
+        self.last_vsync = clock()
+        self.frame_start = self.last_vsync
+        self.input_time = self.last_vsync
+        self.latch_time = self.last_vsync
+        self.last_missed = 0
+
+        # Smoothed duration of a full render, used to decide whether a frame can still make its vsync
+        self.render_estimate = 0.0
+        self.reprojected = False
+
+    @property
+    def next_vsync(self) -> float:
+        """Predicted time of the next vsync after now."""
+        now = self.clock()
+        periods = max(1, int(np.ceil((now - self.last_vsync) / self.period)))
+        return self.last_vsync + periods * self.period
+
+    @property
+    def predicted_display_time(self) -> float:
+        """Predicted time the frame currently being built reaches the display."""
+        return self.next_vsync
+
+    def _expected_work(self) -> float:
+        n = min(self.stats.frames, self.stats.capacity)
+        if n < 10:
+            return self.period
+        return float(np.percentile(self.stats.work_time[:n], 95))
+
+    def wait(self) -> None:
+        """Sleep until the latest safe start time of the next frame.
+
+        Does nothing unless late starts are enabled.
+
+        Returns
+        -------
+        None
+        """
+        if not self.late_start:
+            return
+        start = self.next_vsync - self._expected_work() - self.safety_margin
+        delay = start - self.clock()
+        if delay > 0.001:
+            time.sleep(delay)
+
+    def record_render(self, duration: float) -> None:
+        """Record how long a full render took.
+
+        Parameters
+        ----------
+        duration : float
+            Render duration in seconds.
+
+        Returns
+        -------
+        None
+        """
+        if self.render_estimate == 0.0:
+            self.render_estimate = duration
+        else:
+            self.render_estimate += 0.1 * (duration - self.render_estimate)
+
+    def should_reproject(self) -> bool:
+        """Decide whether to reproject the last frame instead of rendering a new one.
+
+        True when a full render started now would miss the predicted vsync. Never true twice in a row, so
+        a scene that always overruns still gets new frames.
+
+        Returns
+        -------
+        bool
+        """
+        late = self.clock() + self.render_estimate + self.safety_margin > self.next_vsync
+        self.reprojected = late and not self.reprojected
+        if self.reprojected:
+            self.stats.reprojected_frames += 1
+        return self.reprojected
+
+    def begin_frame(self) -> None:
+        """Mark the start of a frame, right after input was polled.
+
+        Returns
+        -------
+        None
+        """
+        self.frame_start = self.input_time = self.clock()
+
+    def latch(self) -> None:
+        """Mark the moment the pose for this frame was sampled.
+
+        Returns
+        -------
+        None
+        """
+        self.latch_time = self.clock()
+
+    def end_frame(self, work_time: float = None) -> None:
+        """Record the swap of the current frame.
+
+        Call right after the buffer swap returns.
+
+        Parameters
+        ----------
+        work_time : float
+            Time spent producing the frame before the swap was requested. Defaults to the time since
+            `begin_frame`.
+
+        Returns
+        -------
+        None
+        """
+        swap_time = self.clock()
+        if work_time is None:
+            work_time = swap_time - self.frame_start
+        interval = swap_time - self.last_vsync
+
+        # A swap that lands more than half a period late skipped at least one vsync
+        self.last_missed = max(0, int(round(interval / self.period)) - 1)
+
+        # Refine the period from on-time swaps, and re-anchor the vsync phase since swaps return just after it
+        if self.last_missed == 0 and abs(interval - self.period) < 0.1 * self.period:
+            self.period += 0.05 * (interval - self.period)
+        self.last_vsync = swap_time
+
+        self.stats.record(swap_time - self.input_time, swap_time - self.latch_time, work_time, interval,
+                          self.last_missed)
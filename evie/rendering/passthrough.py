@@ -0,0 +1,119 @@
+import numpy as np
+from OpenGL.GL import *
+from evie.core.config import *
+from evie.rendering.shader import Shader
+from evie.utils import asset_path
+
+__all__ = ['PassthroughPass']
+
+
+class PassthroughPass:
+    """
+    Draws the stereo camera feed behind the virtual scene.
+
+    Each eye gets its own texture, streamed from the latest capture and drawn as a full-screen triangle
+    without touching the depth buffer.
+    """
+
+    def __init__(self) -> None:
+        self.shader = Shader(asset_path("shaders/passthrough.vert"), asset_path("shaders/passthrough.frag"))
+        self.shader.use()
+        glUniform1i(glGetUniformLocation(self.shader.program, "cameraTexture"), 0)
+
+        self.textures: dict[int, int] = {}
+        for side in (LEFT, RIGHT):
+            texture = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, texture)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            self.textures[side] = texture
+        self.sizes: dict[int, tuple[int, int]] = {}
+        self.frame_id = -1
+
+        # The full-screen triangle is generated from gl_VertexID, but a VAO must still be bound
+        self.VAO = glGenVertexArrays(1)
+
+    @property
+    def is_ready(self) -> bool:
+        return len(self.sizes) == len(self.textures)
+
+    def update(self, img_l: np.ndarray, img_r: np.ndarray, frame_id: int) -> None:
+        """Upload a new stereo pair.
+
+        Uploads are skipped if `frame_id` was already uploaded.
+
+        Parameters
+        ----------
+        img_l : np.ndarray
+            Left BGR image, first row at the top.
+        img_r : np.ndarray
+            Right BGR image, first row at the top.
+        frame_id : int
+            Identifier of the capture the pair belongs to.
+
+        Returns
+        -------
+        None
+        """
+        if frame_id == self.frame_id:
+            return
+        self.frame_id = frame_id
+
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        for side, image in ((LEFT, img_l), (RIGHT, img_r)):
+            height, width = image.shape[:2]
+            if image.strides[1:] == (3, 1) and image.strides[0] % 3 == 0:
+                # Views with padded rows, e.g. halves or crops of a larger image, are read in place
+                glPixelStorei(GL_UNPACK_ROW_LENGTH, image.strides[0] // 3)
+                data = ctypes.c_void_p(image.ctypes.data)
+            else:
+                data = np.ascontiguousarray(image)
+            glBindTexture(GL_TEXTURE_2D, self.textures[side])
+            if self.sizes.get(side) != (width, height):
+                self.sizes[side] = (width, height)
+                glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB8, width, height, 0, GL_BGR, GL_UNSIGNED_BYTE, data)
+            else:
+                glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, GL_BGR, GL_UNSIGNED_BYTE, data)
+            glPixelStorei(GL_UNPACK_ROW_LENGTH, 0)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+
+    def draw(self, side: int) -> None:
+        """Draw one eye's camera image over the whole bound viewport.
+
+        Parameters
+        ----------
+        side : int
+            LEFT or RIGHT.
+
+        Returns
+        -------
+        None
+        """
+        glDisable(GL_DEPTH_TEST)
+        glDepthMask(GL_FALSE)
+
+        self.shader.use()
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.textures[side])
+        glBindVertexArray(self.VAO)
+        glDrawArrays(GL_TRIANGLES, 0, 3)
+
+        glDepthMask(GL_TRUE)
+        glEnable(GL_DEPTH_TEST)
+
+    def clear(self) -> None:
+        """Stop drawing the feed until the next upload.
+
+        Returns
+        -------
+        None
+        """
+        self.sizes.clear()
+        self.frame_id = -1
+
+    def destroy(self) -> None:
+        glDeleteTextures(len(self.textures), list(self.textures.values()))
+        glDeleteVertexArrays(1, self.VAO)
+        self.shader.destroy()
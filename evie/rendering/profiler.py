@@ -0,0 +1,426 @@
+import time
+import json
+from typing import Callable
+import numpy as np
+from OpenGL.GL import *
+from evie.core.config import *
+from evie.rendering.shader import Shader
+from evie.utils import asset_path
+
+__all__ = ['FrameProfiler', 'ProfilerOverlay', 'supports_timer_queries']
+
+
+def supports_timer_queries() -> bool:
+    """Whether the current context has `GL_TIME_ELAPSED` queries, i.e. GL 3.3 or ARB_timer_query."""
+    version = (glGetIntegerv(GL_MAJOR_VERSION), glGetIntegerv(GL_MINOR_VERSION))
+    if version < (3, 3):
+        extensions = {glGetStringi(GL_EXTENSIONS, i) for i in range(glGetIntegerv(GL_NUM_EXTENSIONS))}
+        if b"GL_ARB_timer_query" not in extensions:
+            return False
+    return bool(glGetQueryObjectui64v)
+
+
+class _Span:
+    """
+    Reusable context manager for one span name, so timing a span does not allocate.
+    """
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler: 'FrameProfiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.profiler.begin(self.name)
+
+    def __exit__(self, *exc) -> None:
+        self.profiler.end()
+
+
+class FrameProfiler:
+    """
+    Records named CPU spans and GPU pass timings per frame.
+
+    Everything goes into ring buffers preallocated for `capacity` frames. GPU passes are timed with
+    `GL_TIME_ELAPSED` queries from a fixed pool, and their results are only read `gpu_latency` frames later,
+    when the GPU has long finished, so the profiler never stalls the pipeline. Contexts without timer queries
+    only get CPU spans. Times are in seconds.
+    """
+
+    def __init__(self, enabled: bool = PROFILER,
+                 capacity: int = PROFILER_FRAMES,
+                 max_spans: int = PROFILER_MAX_SPANS,
+                 gpu_latency: int = PROFILER_GPU_LATENCY,
+                 clock: Callable[[], float] = time.perf_counter) -> None:
+        """Create a frame profiler.
+
+        Parameters
+        ----------
+        enabled : bool
+            When disabled every call returns immediately.
+        capacity : int
+            Number of frames kept.
+        max_spans : int
+            Maximum CPU spans, and separately GPU passes, recorded per frame. Extra ones are dropped.
+        gpu_latency : int
+            Frames to wait before reading GPU query results.
+        clock : Callable[[], float]
+            Time source in seconds.
+
+        Returns
+        -------
+        None
+        """
+        self.enabled = enabled
+        self.capacity = capacity
+        self.max_spans = max_spans
+        self.gpu_latency = max(2, gpu_latency)
+        self.clock = clock
+
+        self.names: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._spans: dict[str, _Span] = {}
+
+        self.frame = -1
+        self.frame_start = np.zeros(capacity, dtype=np.float64)
+        self.frame_time = np.zeros(capacity, dtype=np.float64)
+
+        self.span_count = np.zeros(capacity, dtype=np.int32)
+        self.span_ids = np.zeros((capacity, max_spans), dtype=np.int32)
+        self.span_depth = np.zeros((capacity, max_spans), dtype=np.int32)
+        self.span_start = np.zeros((capacity, max_spans), dtype=np.float64)
+        self.span_duration = np.zeros((capacity, max_spans), dtype=np.float64)
+        self._stack = np.zeros(16, dtype=np.int32)
+        self._stack_size = 0
+
+        # GPU passes: CPU time the pass was issued, and its GPU duration once read back (NaN until then)
+        self.gpu_count = np.zeros(capacity, dtype=np.int32)
+        self.gpu_ids = np.zeros((capacity, max_spans), dtype=np.int32)
+        self.gpu_start = np.zeros((capacity, max_spans), dtype=np.float64)
+        self.gpu_duration = np.full((capacity, max_spans), np.nan, dtype=np.float64)
+        self._queries = None
+        self._gpu_open = False
+        self.gpu_enabled: bool | None = None  # Whether timer queries are supported, checked on the first pass
+
+    def _name_id(self, name: str) -> int:
+        name_id = self._ids.get(name)
+        if name_id is None:
+            name_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def span(self, name: str) -> _Span:
+        """Context manager timing a CPU span.
+
+        Parameters
+        ----------
+        name : str
+
+        Returns
+        -------
+        _Span
+        """
+        span = self._spans.get(name)
+        if span is None:
+            span = self._spans[name] = _Span(self, name)
+        return span
+
+    def begin_frame(self) -> None:
+        """Start recording a new frame.
+
+        Also reads back the GPU timings of the frame whose query slot is about to be reused.
+
+        Returns
+        -------
+        None
+        """
+        if not self.enabled:
+            return
+        now = self.clock()
+        if self.frame >= 0:
+            self.frame_time[self.frame % self.capacity] = now - self.frame_start[self.frame % self.capacity]
+        self.frame += 1
+        i = self.frame % self.capacity
+        self.frame_start[i] = now
+        self.span_count[i] = 0
+        self.gpu_count[i] = 0
+        self.gpu_duration[i] = np.nan
+        self._stack_size = 0
+
+        if self._queries is not None and self.frame >= self.gpu_latency:
+            self._resolve_gpu(self.frame - self.gpu_latency)
+
+    def begin(self, name: str) -> None:
+        """Open a CPU span. Spans nest, and must be closed with `end` in reverse order.
+
+        Parameters
+        ----------
+        name : str
+
+        Returns
+        -------
+        None
+        """
+        if not self.enabled or self.frame < 0:
+            return
+        i = self.frame % self.capacity
+        k = self.span_count[i]
+        if k >= self.max_spans or self._stack_size >= len(self._stack):
+            # Still push so the matching `end` stays balanced
+            self._stack[min(self._stack_size, len(self._stack) - 1)] = -1
+            self._stack_size += 1
+            return
+        self.span_ids[i, k] = self._name_id(name)
+        self.span_depth[i, k] = self._stack_size
+        self.span_start[i, k] = self.clock()
+        self._stack[self._stack_size] = k
+        self._stack_size += 1
+        self.span_count[i] = k + 1
+
+    def end(self) -> None:
+        """Close the innermost open CPU span.
+
+        Returns
+        -------
+        None
+        """
+        if not self.enabled or self._stack_size == 0:
+            return
+        self._stack_size -= 1
+        k = self._stack[min(self._stack_size, len(self._stack) - 1)]
+        if k >= 0:
+            i = self.frame % self.capacity
+            self.span_duration[i, k] = self.clock() - self.span_start[i, k]
+
+    def gpu_begin(self, name: str) -> None:
+        """Start timing a GPU pass. GPU passes cannot nest.
+
+        Parameters
+        ----------
+        name : str
+
+        Returns
+        -------
+        None
+        """
+        if not self.enabled or self.frame < 0 or self._gpu_open:
+            return
+        i = self.frame % self.capacity
+        k = self.gpu_count[i]
+        if k >= self.max_spans:
+            return
+        if self.gpu_enabled is None:
+            self.gpu_enabled = supports_timer_queries()
+        if not self.gpu_enabled:
+            return
+        if self._queries is None:
+            self._queries = np.array(glGenQueries(self.gpu_latency * self.max_spans), dtype=np.uint32)
+        self.gpu_ids[i, k] = self._name_id(name)
+        self.gpu_start[i, k] = self.clock()
+        glBeginQuery(GL_TIME_ELAPSED, int(self._queries[self._query_index(self.frame, k)]))
+        self._gpu_open = True
+
+    def gpu_end(self) -> None:
+        """Stop timing the current GPU pass.
+
+        Returns
+        -------
+        None
+        """
+        if not self._gpu_open:
+            return
+        glEndQuery(GL_TIME_ELAPSED)
+        self._gpu_open = False
+        self.gpu_count[self.frame % self.capacity] += 1
+
+    def _query_index(self, frame: int, k: int) -> int:
+        return (frame % self.gpu_latency) * self.max_spans + k
+
+    def _resolve_gpu(self, frame: int) -> None:
+        """Read back the GPU timings of a past frame, skipping queries that are not ready."""
+        i = frame % self.capacity
+        for k in range(self.gpu_count[i]):
+            query = int(self._queries[self._query_index(frame, k)])
+            if glGetQueryObjectuiv(query, GL_QUERY_RESULT_AVAILABLE):
+                self.gpu_duration[i, k] = glGetQueryObjectui64v(query, GL_QUERY_RESULT) * 1e-9
+
+    def _recent_frames(self, count: int) -> np.ndarray:
+        """Ring indices of the last `count` completed frames, oldest first."""
+        count = min(count, self.frame, self.capacity - 1)
+        return np.arange(self.frame - count, self.frame) % self.capacity
+
+    def average_frame_time(self, frames: int = 10) -> float:
+        """Mean frame time over the last completed frames.
+
+        Parameters
+        ----------
+        frames : int
+
+        Returns
+        -------
+        float
+            Seconds, 0 if no frame completed yet.
+        """
+        indices = self._recent_frames(frames)
+        return float(self.frame_time[indices].mean()) if len(indices) else 0.0
+
+    def average(self, name: str, frames: int = 60, gpu: bool = False) -> float:
+        """Mean total time per frame spent in a span or GPU pass.
+
+        Parameters
+        ----------
+        name : str
+        frames : int
+            Number of recent frames to average over.
+        gpu : bool
+            Whether to look at GPU passes instead of CPU spans.
+
+        Returns
+        -------
+        float
+            Seconds, NaN if the name was never recorded.
+        """
+        name_id = self._ids.get(name)
+        indices = self._recent_frames(frames)
+        if name_id is None or len(indices) == 0:
+            return float("nan")
+        ids, durations = (self.gpu_ids, self.gpu_duration) if gpu else (self.span_ids, self.span_duration)
+        counts = (self.gpu_count if gpu else self.span_count)[indices]
+        valid = np.arange(self.max_spans)[None, :] < counts[:, None]
+        totals = np.where(valid & (ids[indices] == name_id), durations[indices], 0.0)
+        return float(np.nanmean(np.nansum(totals, axis=1)))
+
+    def export_chrome_trace(self, path: str) -> None:
+        """Write the recorded frames in Chrome's trace event format.
+
+        Open the file in chrome://tracing or Perfetto. GPU passes have no absolute timestamps, so they are
+        placed at the time they were issued on the CPU.
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+        None
+        """
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "CPU"}},
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": 2, "args": {"name": "GPU"}}
+        ]
+        for i in self._recent_frames(self.capacity):
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": self.frame_start[i] * 1e6, "dur": self.frame_time[i] * 1e6})
+            for k in range(self.span_count[i]):
+                events.append({"name": self.names[self.span_ids[i, k]], "ph": "X", "pid": 1, "tid": 1,
+                               "ts": self.span_start[i, k] * 1e6, "dur": self.span_duration[i, k] * 1e6})
+            for k in range(self.gpu_count[i]):
+                if not np.isnan(self.gpu_duration[i, k]):
+                    events.append({"name": self.names[self.gpu_ids[i, k]], "ph": "X", "pid": 1, "tid": 2,
+                                   "ts": self.gpu_start[i, k] * 1e6, "dur": self.gpu_duration[i, k] * 1e6})
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    def destroy(self) -> None:
+        if self._queries is not None:
+            glDeleteQueries(len(self._queries), self._queries)
+            self._queries = None
+
+
+class ProfilerOverlay:
+    """
+    Rolling frame time graph drawn into the corner of each eye.
+
+    Shows the CPU frame time and GPU time of recent frames against the vsync budget.
+    """
+
+    def __init__(self, profiler: FrameProfiler, frames: int = 120, budget: float = 1.0 / REFRESH_RATE) -> None:
+        """Create the overlay.
+
+        Parameters
+        ----------
+        profiler : FrameProfiler
+        frames : int
+            Number of frames shown.
+        budget : float
+            Frame time budget in seconds. The graph's top is twice the budget.
+
+        Returns
+        -------
+        None
+        """
+        self.profiler = profiler
+        self.frames = frames
+        self.budget = budget
+
+        self.shader = Shader(asset_path("shaders/overlay.vert"), asset_path("shaders/overlay.frag"))
+        self.color_location = glGetUniformLocation(self.shader.program, "color")
+
+        # Graph area in eye NDC
+        self.left, self.bottom, self.width, self.height = -0.8, -0.8, 0.6, 0.3
+
+        # Budget line, CPU graph and GPU graph, rewritten in place each frame
+        self.vertices = np.zeros((2 + 2 * frames, 2), dtype=np.float32)
+        self.vertices[0] = (self.left, self._y(budget))
+        self.vertices[1] = (self.left + self.width, self._y(budget))
+        x = np.linspace(self.left, self.left + self.width, frames, dtype=np.float32)
+        self.vertices[2:2 + frames, 0] = x
+        self.vertices[2 + frames:, 0] = x
+
+        self.VAO = glGenVertexArrays(1)
+        glBindVertexArray(self.VAO)
+        self.VBO = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, GL_DYNAMIC_DRAW)
+        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+        glBindVertexArray(0)
+
+    def _y(self, seconds):
+        return self.bottom + np.clip(seconds / (2 * self.budget), 0.0, 1.0) * self.height
+
+    def update(self) -> None:
+        """Refresh the graph from the profiler. Call once per frame.
+
+        Returns
+        -------
+        None
+        """
+        profiler = self.profiler
+        indices = profiler._recent_frames(self.frames)
+        n = len(indices)
+        if n == 0:
+            return
+        gpu = np.where(np.arange(profiler.max_spans)[None, :] < profiler.gpu_count[indices][:, None],
+                       profiler.gpu_duration[indices], 0.0)
+        self.vertices[2 + self.frames - n:2 + self.frames, 1] = self._y(profiler.frame_time[indices])
+        self.vertices[2 + 2 * self.frames - n:, 1] = self._y(np.nansum(gpu, axis=1))
+        # Not yet filled history sits on the baseline
+        self.vertices[2:2 + self.frames - n, 1] = self.bottom
+        self.vertices[2 + self.frames:2 + 2 * self.frames - n, 1] = self.bottom
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, self.vertices.nbytes, self.vertices)
+
+    def draw(self) -> None:
+        """Draw the graph into the currently bound eye buffer.
+
+        Returns
+        -------
+        None
+        """
+        glDisable(GL_DEPTH_TEST)
+        self.shader.use()
+        glBindVertexArray(self.VAO)
+        glUniform4f(self.color_location, 1.0, 0.2, 0.2, 1.0)
+        glDrawArrays(GL_LINES, 0, 2)
+        glUniform4f(self.color_location, 0.2, 1.0, 0.2, 1.0)
+        glDrawArrays(GL_LINE_STRIP, 2, self.frames)
+        glUniform4f(self.color_location, 0.3, 0.6, 1.0, 1.0)
+        glDrawArrays(GL_LINE_STRIP, 2 + self.frames, self.frames)
+        glEnable(GL_DEPTH_TEST)
+
+    def destroy(self) -> None:
+        glDeleteBuffers(1, [self.VBO])
+        glDeleteVertexArrays(1, self.VAO)
+        self.shader.destroy()
@@ -0,0 +1,264 @@
+import numpy as np
+from evie.core.config import *
+
+__all__ = ['RenderQueue', 'StateTracker', 'radix_argsort', 'pack_keys', 'quantize_depth']
+
+# Bit widths of the sort key fields, 64 bits in total
+PASS_BITS, SHADER_BITS, MATERIAL_BITS, MESH_BITS, DEPTH_BITS = 4, 12, 16, 16, 16
+KEY_DEPTH_MAX = (1 << DEPTH_BITS) - 1
+
+
+def radix_argsort(keys: np.ndarray) -> np.ndarray:
+    """Stable argsort of 64-bit keys, as a least significant digit radix sort on 16-bit digits.
+
+    Each digit is ordered with NumPy's stable sort, which is itself a counting radix sort for 16-bit integers.
+    Digits that are equal across all keys, e.g. the pass in a frame with only opaque draws, are skipped.
+
+    Parameters
+    ----------
+    keys : np.ndarray
+        uint64 keys.
+
+    Returns
+    -------
+    np.ndarray
+        Indices ordering the keys ascending, ties in input order.
+    """
+    order = np.arange(len(keys))
+    if len(keys) < 2:
+        return order
+    varying = int(np.bitwise_or.reduce(keys ^ keys[0]))
+    for shift in range(0, 64, 16):
+        if not (varying >> shift) & 0xFFFF:
+            continue
+        digits = ((keys[order] >> np.uint64(shift)) & np.uint64(0xFFFF)).astype(np.uint16)
+        order = order[np.argsort(digits, kind='stable')]
+    return order
+
+
+def quantize_depth(depths: np.ndarray, far: float) -> np.ndarray:
+    """Map view depths in [0, far] onto the key's depth field, clamping outside values.
+
+    Parameters
+    ----------
+    depths : np.ndarray
+    far : float
+
+    Returns
+    -------
+    np.ndarray
+        uint64 depths in [0, 2**16 - 1].
+    """
+    return (np.clip(np.asarray(depths, dtype=np.float64) / far, 0.0, 1.0) * KEY_DEPTH_MAX).astype(np.uint64)
+
+
+def _field(values: 'int | np.ndarray', bits: int) -> np.ndarray:
+    """Truncate state slots to a key field width."""
+    return np.asarray(values, dtype=np.uint64) & np.uint64((1 << bits) - 1)
+
+
+def pack_keys(render_pass: int, shader: 'int | np.ndarray', material: 'int | np.ndarray', mesh: 'int | np.ndarray',
+              depths: np.ndarray) -> np.ndarray:
+    """Pack draw state and quantized depths into sort keys.
+
+    Opaque and overlay keys are pass | shader | material | mesh | depth, so state changes are minimized and draws
+    sharing all state go front-to-back for early depth rejection. Transparent keys are
+    pass | inverted depth | shader | material | mesh, so they go back-to-front as blending requires.
+
+    Parameters
+    ----------
+    render_pass : int
+        One of `RENDER_PASS`.
+    shader : int | np.ndarray
+    material : int | np.ndarray
+    mesh : int | np.ndarray
+        State slots, per draw or shared, truncated to their field widths.
+    depths : np.ndarray
+        Quantized depths from `quantize_depth`.
+
+    Returns
+    -------
+    np.ndarray
+        uint64 keys, one per depth.
+    """
+    depths = np.asarray(depths, dtype=np.uint64)
+    state = (_field(shader, SHADER_BITS) << np.uint64(MATERIAL_BITS + MESH_BITS)
+             | _field(material, MATERIAL_BITS) << np.uint64(MESH_BITS)
+             | _field(mesh, MESH_BITS))
+    high = np.uint64(render_pass << (64 - PASS_BITS))
+    if render_pass == RENDER_PASS["TRANSPARENT"]:
+        state_bits = np.uint64(SHADER_BITS + MATERIAL_BITS + MESH_BITS)
+        return high | ((np.uint64(KEY_DEPTH_MAX) - depths) << state_bits) | state
+    return high | (state << np.uint64(DEPTH_BITS)) | depths
+
+
+class RenderQueue:
+    """
+    Draws of one view, collected unordered and sorted by packed 64-bit keys before submission.
+
+    Items are opaque to the queue, typically tuples of the state and data needed to issue the draw.
+    """
+
+    def __init__(self, far: float = FAR_PLANE, capacity: int = 1024) -> None:
+        """Create an empty queue.
+
+        Parameters
+        ----------
+        far : float
+            Far plane distance, the depth quantization range.
+        capacity : int
+            Initial number of draws. Grows as needed.
+
+        Returns
+        -------
+        None
+        """
+        self.far = far
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.items: list[object] = []
+        self.slots: dict[int, int] = {}  # id(state object): slot, for the draws queued since the last clear
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def slot(self, resource: object) -> int:
+        """Small integer identifying a shader, material or mesh in sort keys.
+
+        Slots are handed out in first-use order and forgotten by `clear`, so they stay small and ids of destroyed
+        resources are never looked up again.
+
+        Parameters
+        ----------
+        resource : object
+
+        Returns
+        -------
+        int
+        """
+        return self.slots.setdefault(id(resource), len(self.slots))
+
+    def clear(self) -> None:
+        """Remove all draws and forget their slots.
+
+        Returns
+        -------
+        None
+        """
+        self.items.clear()
+        self.slots.clear()
+
+    def submit(self, render_pass: int, shader: object, material: object, mesh: object, depths: np.ndarray,
+               items: list[object]) -> None:
+        """Queue draws sharing a pass, shader, material and mesh.
+
+        Parameters
+        ----------
+        render_pass : int
+            One of `RENDER_PASS`.
+        shader : object
+        material : object
+        mesh : object
+            Draw state, only compared by identity.
+        depths : np.ndarray
+            View depth of each draw, positive in front of the eye.
+        items : list[object]
+            One item per depth, returned by `sorted`.
+
+        Returns
+        -------
+        None
+        """
+        start, count = len(self.items), len(items)
+        if start + count > len(self.keys):
+            grown = np.zeros(max(2 * len(self.keys), start + count), dtype=np.uint64)
+            grown[:start] = self.keys[:start]
+            self.keys = grown
+        self.keys[start:start + count] = pack_keys(
+            render_pass, self.slot(shader), self.slot(material), self.slot(mesh), quantize_depth(depths, self.far)
+        )
+        self.items.extend(items)
+
+    def sorted(self) -> list[object]:
+        """Queued items in key order.
+
+        Returns
+        -------
+        list[object]
+        """
+        order = radix_argsort(self.keys[:len(self.items)])
+        items = self.items
+        return [items[i] for i in order.tolist()]
+
+    @staticmethod
+    def view_depths(positions: np.ndarray, view: np.ndarray) -> np.ndarray:
+        """Distances in front of the eye of world positions.
+
+        Parameters
+        ----------
+        positions : np.ndarray
+            (n, 3) positions.
+        view : np.ndarray
+            View matrix, in the engine's upload layout.
+
+        Returns
+        -------
+        np.ndarray
+            (n,) depths, negative behind the eye.
+        """
+        # Row vectors multiply on the left, view space looks down -z
+        return -(positions @ view[:3, 2] + view[3, 2])
+
+
+class StateTracker:
+    """
+    Binds shaders, materials and meshes only when they differ from the bound ones, counting the binds made.
+
+    Call `reset` whenever other code may have changed the bindings.
+    """
+
+    def __init__(self) -> None:
+        self.shader = None
+        self.material = None
+        self.mesh = None
+        self.binds = 0
+        self.skipped = 0
+
+    def reset(self) -> None:
+        """Forget the bound state.
+
+        Returns
+        -------
+        None
+        """
+        self.shader = self.material = self.mesh = None
+
+    def use_shader(self, shader: object) -> None:
+        if shader is self.shader:
+            self.skipped += 1
+            return
+        shader.use()
+        self.shader = shader
+        self.binds += 1
+
+    def use_material(self, material: object) -> None:
+        if material is self.material:
+            self.skipped += 1
+            return
+        material.use()
+        self.material = material
+        self.binds += 1
+
+    def use_mesh(self, mesh: object) -> None:
+        if mesh is self.mesh:
+            self.skipped += 1
+            return
+        mesh.arm()
+        self.mesh = mesh
+        self.binds += 1
+
+    def stats(self) -> dict[str, int]:
+        """Binds made and skipped since the last `reset_stats`."""
+        return {"binds": self.binds, "skipped": self.skipped}
+
+    def reset_stats(self) -> None:
+        self.binds = self.skipped = 0
@@ -0,0 +1,129 @@
+import numpy as np
+from OpenGL.GL import *
+from evie.rendering.shader import Shader
+from evie.rendering.framebuffer import RenderTarget
+from evie.utils import asset_path
+
+__all__ = ['ReprojectionPass']
+
+
+class ReprojectionPass:
+    """
+    Full-screen pass warping the last rendered eye images to a newer pose.
+
+    Used when a new frame would miss its vsync, so the display shows the old image seen from the current
+    head orientation instead of a stale frame. Rotation-only reprojection is a single homography per eye.
+    Positional reprojection additionally reads the eye depth buffer to correct for head translation.
+
+    Matrices follow the engine's convention: numpy arrays in the layout uploaded with `GL_FALSE`, i.e. the
+    transpose of the mathematical matrix.
+    """
+
+    def __init__(self, projection: np.ndarray, positional: bool = False) -> None:
+        """Create the reprojection pass.
+
+        Parameters
+        ----------
+        projection : np.ndarray
+            4x4 projection matrix used to render the eyes.
+        positional : bool
+            Whether to correct for head translation using the depth buffer.
+
+        Returns
+        -------
+        None
+        """
+        self.positional = positional
+        self.projection = projection.T.astype(np.float64)
+        self.inverse_projection = np.linalg.inv(self.projection)
+
+        self.shader = Shader(asset_path("shaders/reprojection.vert"), asset_path("shaders/reprojection.frag"))
+        self.shader.use()
+        program = self.shader.program
+        glUniform1i(glGetUniformLocation(program, "eyeTexture"), 0)
+        glUniform1i(glGetUniformLocation(program, "eyeDepth"), 1)
+        glUniformMatrix4fv(glGetUniformLocation(program, "projection"), 1, GL_FALSE,
+                           self.projection.T.astype(np.float32))
+        glUniformMatrix4fv(glGetUniformLocation(program, "inverseProjection"), 1, GL_FALSE,
+                           self.inverse_projection.T.astype(np.float32))
+        self.locations = {
+            name: glGetUniformLocation(program, name)
+            for name in ("rotationReprojection", "newToOld", "positional", "uvScale")
+        }
+
+        # The full-screen triangle is generated from gl_VertexID, but a VAO must still be bound
+        self.VAO = glGenVertexArrays(1)
+
+    def _reprojection_matrices(self, rendered_view: np.ndarray, current_view: np.ndarray
+                               ) -> tuple[np.ndarray, np.ndarray]:
+        """Compute the clip space rotation warp and the full view space delta.
+
+        Parameters
+        ----------
+        rendered_view : np.ndarray
+            View matrix the eye image was rendered with.
+        current_view : np.ndarray
+            Latest view matrix.
+
+        Returns
+        -------
+        np.ndarray
+            New clip space to old clip space, ignoring translation.
+        np.ndarray
+            New view space to old view space.
+        """
+        old = rendered_view.T.astype(np.float64)
+        new = current_view.T.astype(np.float64)
+
+        old_rotation = np.identity(4)
+        old_rotation[:3, :3] = old[:3, :3]
+        new_rotation = np.identity(4)
+        new_rotation[:3, :3] = new[:3, :3]
+
+        # Rotations are orthonormal, so the inverse is the transpose
+        rotation_warp = self.projection @ old_rotation @ new_rotation.T @ self.inverse_projection
+        new_to_old = old @ np.linalg.inv(new)
+        return rotation_warp, new_to_old
+
+    def draw(self, source: RenderTarget, destination: RenderTarget, source_uv_scale: tuple[float, float],
+             rendered_view: np.ndarray, current_view: np.ndarray) -> None:
+        """Reproject one eye.
+
+        Parameters
+        ----------
+        source : RenderTarget
+            Eye buffer holding the last rendered image and depth.
+        destination : RenderTarget
+            Eye buffer to write the reprojected image to.
+        source_uv_scale : tuple[float, float]
+            Rendered region of the source when it was rendered.
+        rendered_view : np.ndarray
+            View matrix the source was rendered with.
+        current_view : np.ndarray
+            Latest view matrix.
+
+        Returns
+        -------
+        None
+        """
+        rotation_warp, new_to_old = self._reprojection_matrices(rendered_view, current_view)
+
+        destination.bind()
+        glClear(GL_COLOR_BUFFER_BIT)
+        self.shader.use()
+        glUniformMatrix4fv(self.locations["rotationReprojection"], 1, GL_FALSE, rotation_warp.T.astype(np.float32))
+        glUniformMatrix4fv(self.locations["newToOld"], 1, GL_FALSE, new_to_old.T.astype(np.float32))
+        glUniform1i(self.locations["positional"], int(self.positional))
+        glUniform2f(self.locations["uvScale"], *source_uv_scale)
+
+        glActiveTexture(GL_TEXTURE1)
+        glBindTexture(GL_TEXTURE_2D, source.depth)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, source.color)
+
+        glBindVertexArray(self.VAO)
+        glDrawArrays(GL_TRIANGLES, 0, 3)
+
+    def destroy(self) -> None:
+        glDeleteVertexArrays(1, self.VAO)
+        self.shader.destroy()
@@ -0,0 +1,115 @@
+from collections import deque
+import numpy as np
+from evie.core.config import *
+
+__all__ = ['ResolutionController']
+
+
+class ResolutionController:
+    """
+    Picks the eye buffer resolution scale from measured frame times.
+
+    Frame times are collected over a rolling window and compared against the vsync budget. The scale steps down
+    when the window's 90th percentile gets close to the budget, or when several vsyncs were missed within the
+    window, so a single hitch such as a shader compile only costs one step. After any change the cooldown has
+    to pass before missed vsyncs step down again or the window may step back up, so it does not oscillate.
+    Reprojected frames are left out of the window, as their work time is not that of a render.
+    """
+
+    def __init__(self, budget: float = 1.0 / REFRESH_RATE,
+                 scales: tuple[float, ...] = RESOLUTION_SCALES,
+                 window: int = RESOLUTION_WINDOW,
+                 lower_threshold: float = RESOLUTION_LOWER_THRESHOLD,
+                 raise_threshold: float = RESOLUTION_RAISE_THRESHOLD,
+                 cooldown: int = RESOLUTION_COOLDOWN,
+                 misses: int = RESOLUTION_MISSES) -> None:
+        """Create a resolution controller.
+
+        Parameters
+        ----------
+        budget : float
+            Frame time budget in seconds.
+        scales : tuple[float, ...]
+            Available resolution scales, ascending. The controller starts at the highest.
+        window : int
+            Number of frames in the rolling window.
+        lower_threshold : float
+            Fraction of the budget above which the scale steps down.
+        raise_threshold : float
+            Fraction of the budget below which the scale steps up.
+        cooldown : int
+            Frames to wait after any change before stepping up, or down on missed vsyncs.
+        misses : int
+            Missed vsyncs within the window that step the scale down.
+
+        Returns
+        -------
+        None
+        """
+        self.budget = budget
+        self.scales = tuple(sorted(scales))
+        self.lower_threshold = lower_threshold
+        self.raise_threshold = raise_threshold
+        self.cooldown = cooldown
+        self.misses = max(1, misses)
+
+        self.frame_times = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self.level = len(self.scales) - 1
+        self.cooldown_left = 0
+        self.frame = 0  # Frames recorded, reprojected ones included
+        self.missed_frames: deque[int] = deque()  # Frames that missed their vsync, within the window
+
+    @property
+    def scale(self) -> float:
+        return self.scales[self.level]
+
+    def _change_level(self, step: int) -> None:
+        self.level = min(max(self.level + step, 0), len(self.scales) - 1)
+        self.count = 0
+        self.cooldown_left = self.cooldown
+        self.missed_frames.clear()
+
+    def record(self, frame_time: float, missed: bool = False, reprojected: bool = False) -> float:
+        """Record the frame time of the last frame and update the scale.
+
+        Parameters
+        ----------
+        frame_time : float
+            Time spent producing the frame, in seconds. Should exclude time blocked on vsync.
+        missed : bool
+            Whether the frame missed its vsync.
+        reprojected : bool
+            Whether the frame was reprojected instead of rendered, its time is then not recorded.
+
+        Returns
+        -------
+        float
+            Resolution scale to use for the next frame.
+        """
+        window = len(self.frame_times)
+        self.frame += 1
+        if self.cooldown_left > 0:
+            self.cooldown_left -= 1
+        if missed and self.cooldown_left == 0:
+            # Misses right after a change are still the previous scale's, or the same hitch
+            self.missed_frames.append(self.frame)
+        while self.missed_frames and self.missed_frames[0] <= self.frame - window:
+            self.missed_frames.popleft()
+
+        if len(self.missed_frames) >= self.misses and self.level > 0:
+            self._change_level(-1)
+            return self.scale
+        if reprojected:
+            return self.scale
+
+        self.frame_times[self.count % window] = frame_time
+        self.count += 1
+        if self.count >= window:
+            load = np.percentile(self.frame_times, 90) / self.budget
+            if load > self.lower_threshold and self.level > 0:
+                self._change_level(-1)
+            elif load < self.raise_threshold and self.cooldown_left == 0 and self.level < len(self.scales) - 1:
+                self._change_level(1)
+
+        return self.scale
@@ -1,3 +1,4 @@
+from typing import Callable
 import numpy as np
 from evie.core.config import *
 from evie.objects.entity import Entity, Cube
@@ -10,38 +11,76 @@ class Scene:
     """
     Manages all objects and coordinates their interactions.
     """
-    __slots__ = ("entities", "cameras", "midpoint")
+    __slots__ = ("entities", "cameras", "midpoint", "ipd", "pose_source")
 
-    def __init__(self):
+    def __init__(self, entities: dict[int, list[Entity]] = None):
         """
         Initialize the scene.
+
+        Parameters
+        ----------
+        entities : dict[int, list[Entity]]
+            Entities keyed by entity type. Defaults to a single spinning cube.
         """
 
-        self.entities: dict[int, list[Entity]] = {
-            ENTITY_TYPE["CUBE"]: [
-                Cube(position=[0, 0, 0], eulers=[0, 0, 0]),
-            ]
-        }
+        if entities is None:
+            entities = {
+                ENTITY_TYPE["CUBE"]: [
+                    Cube(position=[0, 0, 0], eulers=[0, 0, 0]),
+                ]
+            }
+        self.entities: dict[int, list[Entity]] = entities
 
         self.cameras = {
             LEFT: Camera(),
             RIGHT: Camera()
         }
-        ipd = 0.06  # Interpupillary distance, in meters
-        self.cameras[LEFT].position = np.array([-ipd / 2, 0, 10])
-        self.cameras[RIGHT].position = np.array([ipd / 2, 0, 10])
+        self.ipd = 0.06  # Interpupillary distance, in meters
+        self.cameras[LEFT].position = np.array([-self.ipd / 2, 0, 10])
+        self.cameras[RIGHT].position = np.array([self.ipd / 2, 0, 10])
         # Track the midpoint of the two cameras
         self.midpoint = (self.cameras[LEFT].position + self.cameras[RIGHT].position) / 2
 
+        # Head pose provider, called with the predicted display time and returning (position, rotation)
+        self.pose_source: Callable[[float], tuple[np.ndarray, np.ndarray]] | None = None
+
+    def latch_pose(self, display_time: float) -> None:
+        """Sample the head pose and move the eye cameras to it.
+
+        Meant to be called as late as possible, right before the view matrices are uploaded, so the rendered
+        pose is as fresh as possible. Does nothing without a pose source.
+
+        Parameters
+        ----------
+        display_time : float
+            Predicted time the frame reaches the display.
+
+        Returns
+        -------
+        None
+        """
+        if self.pose_source is None:
+            return
+
+        position, rotation = self.pose_source(display_time)
+        # Rows of the camera rotation are its right, up and forward vectors
+        half_ipd = rotation[0] * (self.ipd / 2)
+        for side, sign in ((LEFT, -1), (RIGHT, 1)):
+            camera = self.cameras[side]
+            camera.rotation = rotation
+            camera.position = position + sign * half_ipd
+        self.midpoint = np.asarray(position, dtype=np.float32)
+
     def update(self, dt: float) -> None:
         """
             Update all objects in the scene.
 
             Parameters:
 
-                dt: framerate correction factor
+                dt: fixed simulation timestep, in seconds
         """
 
         for entities in self.entities.values():
             for entity in entities:
-                entity.update(dt, self.midpoint)
+                if not entity.static:
+                    entity.update(dt, self.midpoint)
@@ -0,0 +1,333 @@
+import time
+import threading
+from typing import Callable
+import numpy as np
+from scipy.spatial.transform import Rotation
+from evie.core.config import *
+from evie.objects.entity import Entity
+from evie.rendering.scene import Scene
+
+__all__ = ['TransformSnapshot', 'SnapshotBuffer', 'Simulation', 'SimulationThread', 'compose_models']
+
+
+def compose_models(positions: np.ndarray, rotations: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Build model matrices from transform components.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        (n, 3) translations.
+    rotations : np.ndarray
+        (n, 4) unit quaternions, x, y, z, w.
+    scales : np.ndarray
+        (n, 3) scale factors.
+
+    Returns
+    -------
+    np.ndarray
+        (n, 4, 4) float32 matrices, transposed for OpenGL like `Entity.model_matrix`.
+    """
+    models = np.zeros((len(positions), 4, 4), dtype=np.float32)
+    if len(positions):
+        # Columns of the rotation are scaled, then everything is transposed so row 3 holds the translation
+        models[:, :3, :3] = (Rotation.from_quat(rotations).as_matrix() * scales[:, None, :]).transpose(0, 2, 1)
+    models[:, 3, :3] = positions
+    models[:, 3, 3] = 1.0
+    return models
+
+
+class TransformSnapshot:
+    """
+    Immutable transforms of every entity after one simulation step.
+
+    The renderer draws from snapshots instead of the live entities, so the simulation can keep updating them
+    meanwhile. Entity tuples are shared with the previous snapshot while a type's members do not change, so
+    caches keyed on them, such as static batches, survive across steps and snapshots can be interpolated.
+    """
+    __slots__ = ("step", "time", "entities", "positions", "rotations", "scales", "models")
+
+    def __init__(self, step: int, time: float, entities: dict[int, tuple[Entity, ...]],
+                 positions: dict[int, np.ndarray], rotations: dict[int, np.ndarray], scales: dict[int, np.ndarray]):
+        self.step = step
+        self.time = time
+        self.entities = entities
+        self.positions = positions
+        self.rotations = rotations
+        self.scales = scales
+        self.models = {
+            ent_type: compose_models(positions[ent_type], rotations[ent_type], scales[ent_type])
+            for ent_type in entities
+        }
+        for arrays in (positions, rotations, scales, self.models):
+            for array in arrays.values():
+                array.flags.writeable = False
+
+    @classmethod
+    def capture(cls, entities: dict[int, list[Entity]], step: int, time: float,
+                previous: 'TransformSnapshot' = None) -> 'TransformSnapshot':
+        """Snapshot the current transforms of entities.
+
+        Parameters
+        ----------
+        entities : dict[int, list[Entity]]
+            Entities per type.
+        step : int
+            Simulation step the transforms result from.
+        time : float
+            Simulation time of the step.
+        previous : TransformSnapshot
+            Last snapshot, whose entity tuples are reused where unchanged.
+
+        Returns
+        -------
+        TransformSnapshot
+        """
+        members, positions, rotations, scales = {}, {}, {}, {}
+        for ent_type, type_entities in entities.items():
+            current = tuple(type_entities)
+            if previous is not None and previous.entities.get(ent_type) == current:
+                current = previous.entities[ent_type]
+            members[ent_type] = current
+            positions[ent_type] = np.array([entity.position for entity in current], dtype=np.float32).reshape(-1, 3)
+            scales[ent_type] = np.array([entity.scale for entity in current], dtype=np.float32).reshape(-1, 3)
+            if current:
+                matrices = np.stack([entity.rotation for entity in current])
+                rotations[ent_type] = Rotation.from_matrix(matrices).as_quat().astype(np.float32)
+            else:
+                rotations[ent_type] = np.zeros((0, 4), dtype=np.float32)
+        return cls(step, time, members, positions, rotations, scales)
+
+    def interpolate(self, latest: 'TransformSnapshot', alpha: float) -> dict[int, np.ndarray]:
+        """Model matrices between this snapshot and a later one.
+
+        Positions and scales are interpolated linearly, rotations by normalized quaternion interpolation along
+        the shorter arc, all entities of a type at once. Types whose members changed in between are taken from
+        the later snapshot.
+
+        Parameters
+        ----------
+        latest : TransformSnapshot
+            Later snapshot.
+        alpha : float
+            0 for this snapshot, 1 for the later one.
+
+        Returns
+        -------
+        dict[int, np.ndarray]
+            (n, 4, 4) model matrices per type, as in `models`.
+        """
+        if latest is self or alpha >= 1.0:
+            return latest.models
+        models = {}
+        for ent_type, entities in latest.entities.items():
+            if self.entities.get(ent_type) is not entities or not entities:
+                models[ent_type] = latest.models[ent_type]
+                continue
+            start, end = self.rotations[ent_type], latest.rotations[ent_type]
+            # q and -q are the same rotation, flip to interpolate the short way round
+            sign = np.where(np.einsum('ij,ij->i', start, end) < 0, -1.0, 1.0).astype(np.float32)
+            rotations = (1 - alpha) * start + alpha * sign[:, None] * end
+            rotations /= np.linalg.norm(rotations, axis=1, keepdims=True)
+            positions = (1 - alpha) * self.positions[ent_type] + alpha * latest.positions[ent_type]
+            scales = (1 - alpha) * self.scales[ent_type] + alpha * latest.scales[ent_type]
+            models[ent_type] = compose_models(positions, rotations, scales)
+        return models
+
+
+class SnapshotBuffer:
+    """
+    The latest few snapshots, published by one thread and read by others without locks.
+
+    Publishing swaps a single tuple reference, which is atomic, so readers always see a consistent set of
+    snapshots. Snapshots are immutable and never written after publishing, so nothing is copied on either side.
+    """
+
+    def __init__(self, depth: int = 3) -> None:
+        """Create an empty buffer.
+
+        Parameters
+        ----------
+        depth : int
+            Number of snapshots kept, at least the two interpolated between plus one being published.
+
+        Returns
+        -------
+        None
+        """
+        self.depth = depth
+        self._snapshots: tuple[TransformSnapshot, ...] = ()
+
+    def publish(self, snapshot: TransformSnapshot) -> None:
+        self._snapshots = (self._snapshots + (snapshot,))[-self.depth:]
+
+    @property
+    def latest(self) -> TransformSnapshot | None:
+        """The newest snapshot, or None before the first one is published."""
+        snapshots = self._snapshots
+        return snapshots[-1] if snapshots else None
+
+    def pair(self) -> tuple[TransformSnapshot | None, TransformSnapshot | None]:
+        """The two newest snapshots, oldest first. Both are the same while only one was published."""
+        snapshots = self._snapshots
+        if not snapshots:
+            return None, None
+        return snapshots[-2 if len(snapshots) > 1 else -1], snapshots[-1]
+
+
+class Simulation:
+    """
+    Fixed-timestep stepping of a scene, decoupled from the display rate.
+
+    `advance` runs as many steps of exactly `dt` as the elapsed time calls for, none if called again too soon,
+    capped at `max_steps` so a slow simulation drops time instead of spiralling. Every step publishes a
+    `TransformSnapshot`, and `interpolate` blends the last two for the render time, so motion stays smooth
+    whatever the ratio of simulation and display rates.
+    """
+
+    def __init__(self, scene: Scene, rate: float = SIMULATION_RATE, max_steps: int = SIMULATION_MAX_STEPS,
+                 clock: Callable[[], float] = time.perf_counter, buffer: SnapshotBuffer = None) -> None:
+        """Create a simulation.
+
+        Parameters
+        ----------
+        scene : Scene
+            Scene to step.
+        rate : float
+            Steps per second.
+        max_steps : int
+            Most steps run by one `advance`.
+        clock : Callable[[], float]
+            Time source in seconds, shared with the render loop.
+        buffer : SnapshotBuffer
+            Where snapshots are published. A new one is made if omitted.
+
+        Returns
+        -------
+        None
+        """
+        self.scene = scene
+        self.dt = 1.0 / rate
+        self.max_steps = max_steps
+        self.clock = clock
+        self.buffer = buffer if buffer is not None else SnapshotBuffer()
+        self.step = 0
+        self.time = 0.0  # Simulation time of the latest step
+        self.accumulator = 0.0
+        self.last_time = None
+        self.step_time = 0.0  # Duration of the last step's update, in seconds
+        self.dropped = 0  # Steps dropped for falling behind
+
+    def start(self) -> None:
+        """Publish the initial state, so there is always a snapshot to render.
+
+        Returns
+        -------
+        None
+        """
+        self.last_time = self.time = self.clock()
+        self.buffer.publish(TransformSnapshot.capture(self.scene.entities, self.step, self.time))
+
+    def advance(self) -> int:
+        """Run the steps due since the last call.
+
+        Returns
+        -------
+        int
+            Number of steps run, possibly 0.
+        """
+        now = self.clock()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+        if self.accumulator > self.max_steps * self.dt:
+            dropped = int(self.accumulator / self.dt) - self.max_steps
+            self.dropped += dropped
+            self.accumulator -= dropped * self.dt
+            # Skipped time is not simulated, keep step times close to the clock for interpolation
+            self.time += dropped * self.dt
+
+        steps = 0
+        while self.accumulator >= self.dt:
+            self.run_step()
+            self.accumulator -= self.dt
+            steps += 1
+        return steps
+
+    def run_step(self) -> None:
+        """Run one step and publish its snapshot, regardless of the clock.
+
+        `advance` calls this as time passes. Calling it directly steps the scene deterministically, e.g. in
+        benchmarks.
+
+        Returns
+        -------
+        None
+        """
+        start = time.perf_counter()
+        self.scene.update(self.dt)
+        self.step += 1
+        self.time += self.dt
+        self.buffer.publish(TransformSnapshot.capture(self.scene.entities, self.step, self.time, self.buffer.latest))
+        self.step_time = time.perf_counter() - start
+
+    def interpolate(self, render_time: float) -> tuple[dict[int, tuple[Entity, ...]], dict[int, np.ndarray]]:
+        """Entities and their model matrices at a render time, one step behind the simulation.
+
+        Parameters
+        ----------
+        render_time : float
+            Clock time of the frame.
+
+        Returns
+        -------
+        dict[int, tuple[Entity, ...]]
+            Entities per type.
+        dict[int, np.ndarray]
+            (n, 4, 4) model matrices per type.
+        """
+        previous, latest = self.buffer.pair()
+        span = latest.time - previous.time
+        alpha = 1.0 if span <= 0 else float(np.clip((render_time - self.dt - previous.time) / span, 0.0, 1.0))
+        return latest.entities, previous.interpolate(latest, alpha)
+
+
+class SimulationThread(threading.Thread):
+    """
+    Advances a simulation on its own thread, waking up once per step.
+
+    Update spikes then delay the simulation instead of frames, and NumPy work in entity updates, which releases
+    the GIL, overlaps with GL submission on the render thread. The render thread must not touch entity transforms,
+    only the published snapshots, and entities should be added or removed from the simulation thread, e.g. inside
+    an entity's update.
+    """
+
+    def __init__(self, simulation: Simulation) -> None:
+        """Create a simulation thread.
+
+        Parameters
+        ----------
+        simulation : Simulation
+            Started simulation to advance.
+
+        Returns
+        -------
+        None
+        """
+        super().__init__(name="evie-simulation", daemon=True)
+        self.simulation = simulation
+        self._running = threading.Event()
+
+    def start(self) -> None:
+        self._running.set()
+        super().start()
+
+    def run(self) -> None:
+        simulation = self.simulation
+        while self._running.is_set():
+            delay = simulation.dt - simulation.accumulator - (simulation.clock() - simulation.last_time)
+            if delay > 0:
+                time.sleep(delay)
+            simulation.advance()
+
+    def stop(self) -> None:
+        self._running.clear()
+        self.join()
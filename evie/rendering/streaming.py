@@ -0,0 +1,141 @@
+import time
+import queue
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable
+import numpy as np
+from evie.core.config import *
+from evie.rendering.mesh import obj_vertex_data, index_type
+from evie.rendering.material import load_image
+
+__all__ = ['AssetStreamer', 'decode_mesh', 'decode_material']
+
+
+def decode_mesh(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """Read and parse an .obj file into ready-to-upload vertex and index data.
+
+    Parameters
+    ----------
+    path : str
+
+    Returns
+    -------
+    np.ndarray[dt.vertex]
+        Vertex data.
+    np.ndarray
+        Index data, in the smallest index type that fits.
+    """
+    vertex_data = obj_vertex_data(path)
+    return vertex_data, np.arange(len(vertex_data), dtype=index_type(len(vertex_data))[0])
+
+
+def decode_material(path: str) -> np.ndarray:
+    """Read and decode an image into ready-to-upload RGBA texels.
+
+    Parameters
+    ----------
+    path : str
+
+    Returns
+    -------
+    np.ndarray
+        (height, width, 4) uint8 texels, bottom row first.
+    """
+    return load_image(path)
+
+
+class AssetStreamer:
+    """
+    Decodes assets on a worker pool, and hands the results back to the render thread for upload.
+
+    File I/O, parsing and decoding run on worker threads, or processes to sidestep the GIL for heavy parsing.
+    Finished decodes wait in a queue until `upload` turns them into GPU resources on the render thread, as many
+    per frame as fit in a time budget.
+    """
+
+    def __init__(self, workers: int = ASSET_STREAM_WORKERS, processes: bool = ASSET_STREAM_PROCESSES) -> None:
+        """Start the worker pool.
+
+        Parameters
+        ----------
+        workers : int
+            Number of worker threads or processes.
+        processes : bool
+            Decode in worker processes instead of threads.
+
+        Returns
+        -------
+        None
+        """
+        self.executor: Executor = (ProcessPoolExecutor if processes else ThreadPoolExecutor)(max_workers=workers)
+        # Filled from worker callbacks, drained on the render thread
+        self.ready: queue.SimpleQueue[tuple[tuple, Future]] = queue.SimpleQueue()
+        self.pending: set[tuple] = set()
+        self.failed: dict[tuple, BaseException] = {}
+
+    def submit(self, key: tuple, decode: Callable, *args) -> None:
+        """Queue a decode, unless the same key is already in flight.
+
+        Parameters
+        ----------
+        key : tuple
+            Identifies the asset in `upload`.
+        decode : Callable
+            Module-level function, picklable for worker processes.
+        args
+            Arguments of the decode function.
+
+        Returns
+        -------
+        None
+        """
+        if key in self.pending:
+            return
+        self.pending.add(key)
+        future = self.executor.submit(decode, *args)
+        future.add_done_callback(lambda done: self.ready.put((key, done)))
+
+    def upload(self, create: Callable[[tuple, object], None], budget_ms: float = ASSET_UPLOAD_BUDGET_MS) -> int:
+        """Upload finished decodes until the time budget is spent.
+
+        At least one decode is uploaded per call when any is ready, so a single upload larger than the budget
+        still makes progress. Failed decodes are kept in `failed`.
+
+        Parameters
+        ----------
+        create : Callable[[tuple, object], None]
+            Makes the GPU resource from a key and its decoded data.
+        budget_ms : float
+            Render thread milliseconds to spend.
+
+        Returns
+        -------
+        int
+            Number of assets uploaded.
+        """
+        start = time.perf_counter()
+        uploaded = 0
+        while not uploaded or (time.perf_counter() - start) * 1000 < budget_ms:
+            try:
+                key, future = self.ready.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(key)
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is not None:
+                self.failed[key] = error
+                continue
+            create(key, future.result())
+            uploaded += 1
+        return uploaded
+
+    def destroy(self) -> None:
+        """Stop the worker pool, dropping queued decodes.
+
+        Returns
+        -------
+        None
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pending.clear()
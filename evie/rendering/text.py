@@ -0,0 +1,388 @@
+import os
+import ctypes
+import string
+import hashlib
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from OpenGL.GL import *
+from evie.core.config import *
+import evie.core.datatypes as dt
+from evie.rendering.shader import Shader
+from evie.rendering.mesh import Mesh
+from evie.utils import asset_path
+
+__all__ = ['GlyphAtlas', 'TextLabel', 'TextRenderer']
+
+# Glyph metric columns, in atlas pixels
+U0, V0, U1, V1, OFFSET_X, OFFSET_Y, WIDTH, HEIGHT, ADVANCE = range(9)
+
+# Two triangles per glyph quad, as (x, y) corner indices into (left, right) and (top, bottom)
+QUAD_CORNERS = np.array([[0, 0], [0, 1], [1, 1], [0, 0], [1, 1], [1, 0]])
+
+
+class GlyphAtlas:
+    """
+    Single channel texture holding every glyph of a font, rasterised once.
+
+    The rasterised atlas and its metrics are cached on disk, keyed by font, size and character set, so later
+    runs only load an array.
+    """
+
+    def __init__(self, font: str = TEXT_FONT, size: int = TEXT_FONT_SIZE,
+                 characters: str = string.printable[:95], cache_dir: str = TEXT_CACHE_DIR) -> None:
+        """Load or rasterise a glyph atlas.
+
+        Parameters
+        ----------
+        font : str
+            TrueType font file or name. PIL's built-in font is used if it cannot be found.
+        size : int
+            Font size in pixels.
+        characters : str
+            Characters to rasterise. Others are drawn as "?" if present, otherwise skipped.
+        cache_dir : str
+            Directory of cached atlases, None to disable caching.
+
+        Returns
+        -------
+        None
+        """
+        self.characters = characters
+        key = f"{font}|{os.path.getmtime(font) if os.path.isfile(font) else 0}|{size}|{characters}"
+        cache_path = None if cache_dir is None else \
+            os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".npz")
+
+        if cache_path is not None and os.path.isfile(cache_path):
+            with np.load(cache_path) as cached:
+                self.image, self.metrics = cached["image"], cached["metrics"]
+                self.line_height = float(cached["line_height"])
+        else:
+            self.image, self.metrics, self.line_height = self._rasterise(font, size, characters)
+            if cache_path is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                np.savez(cache_path, image=self.image, metrics=self.metrics, line_height=self.line_height)
+
+        # Byte value to glyph index, -1 for characters without a glyph
+        self.lookup = np.full(256, characters.find("?"), dtype=np.int32)
+        for i, character in enumerate(characters):
+            if ord(character) < 256:
+                self.lookup[ord(character)] = i
+
+        self.height, self.width = self.image.shape
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_R8, self.width, self.height, 0, GL_RED, GL_UNSIGNED_BYTE, self.image)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+
+    @staticmethod
+    def _rasterise(font_name: str, size: int, characters: str) -> tuple[np.ndarray, np.ndarray, float]:
+        """Rasterise glyphs into a row-packed atlas.
+
+        Returns
+        -------
+        np.ndarray
+            Atlas image, first row at the top.
+        np.ndarray
+            Per-glyph metrics, see the column constants.
+        float
+            Line height in pixels.
+        """
+        try:
+            font = ImageFont.truetype(font_name, size)
+        except OSError:
+            font = ImageFont.load_default()
+        ascent, descent = font.getmetrics()
+
+        boxes = [font.getbbox(character) for character in characters]
+        padding = 2
+        width = 512
+        while True:
+            # Shelf packing, growing the atlas width until it is roughly square
+            positions, x, y, row_height = [], padding, padding, 0
+            for left, top, right, bottom in boxes:
+                w, h = right - left, bottom - top
+                if x + w + padding > width:
+                    x, y, row_height = padding, y + row_height + padding, 0
+                positions.append((x, y))
+                x += w + padding
+                row_height = max(row_height, h)
+            height = y + row_height + padding
+            if height <= width:
+                break
+            width *= 2
+
+        atlas = Image.new("L", (width, height), 0)
+        draw = ImageDraw.Draw(atlas)
+        metrics = np.zeros((len(characters), 9), dtype=np.float32)
+        for i, (character, (left, top, right, bottom), (x, y)) in enumerate(zip(characters, boxes, positions)):
+            draw.text((x - left, y - top), character, font=font, fill=255)
+            metrics[i] = (x, y, x + right - left, y + bottom - top, left, top, right - left, bottom - top,
+                          font.getlength(character))
+        metrics[:, [U0, U1]] /= width
+        metrics[:, [V0, V1]] /= height
+        return np.asarray(atlas, dtype=np.uint8), metrics, float(ascent + descent)
+
+    def layout(self, text: str) -> np.ndarray:
+        """Lay out a string as glyph quads.
+
+        Parameters
+        ----------
+        text : str
+            Text, lines separated by newlines.
+
+        Returns
+        -------
+        np.ndarray
+            (n, 6, 4) array of x, y, s, t per quad vertex, in pixels from the top left of the first line with
+            y pointing up. Empty glyphs such as spaces are omitted.
+        """
+        quads = []
+        for line_number, line in enumerate(text.split("\n")):
+            glyphs = self.lookup[np.frombuffer(line.encode("latin-1", "replace"), dtype=np.uint8)]
+            glyphs = glyphs[glyphs >= 0]
+            if len(glyphs) == 0:
+                continue
+            metrics = self.metrics[glyphs]
+            pen = np.cumsum(metrics[:, ADVANCE]) - metrics[:, ADVANCE]
+            visible = metrics[:, WIDTH] > 0
+            metrics, pen = metrics[visible], pen[visible]
+
+            left = pen + metrics[:, OFFSET_X]
+            top = -(line_number * self.line_height + metrics[:, OFFSET_Y])
+            xs = np.stack((left, left + metrics[:, WIDTH]), axis=1)
+            ys = np.stack((top, top - metrics[:, HEIGHT]), axis=1)
+            ss = metrics[:, [U0, U1]]
+            ts = metrics[:, [V0, V1]]
+
+            quad = np.empty((len(metrics), 6, 4), dtype=np.float32)
+            quad[..., 0] = xs[:, QUAD_CORNERS[:, 0]]
+            quad[..., 1] = ys[:, QUAD_CORNERS[:, 1]]
+            quad[..., 2] = ss[:, QUAD_CORNERS[:, 0]]
+            quad[..., 3] = ts[:, QUAD_CORNERS[:, 1]]
+            quads.append(quad)
+        return np.concatenate(quads) if quads else np.zeros((0, 6, 4), dtype=np.float32)
+
+    def use(self, unit: int = 0) -> None:
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+
+    def destroy(self) -> None:
+        glDeleteTextures(1, self.texture)
+
+
+class TextLabel:
+    """
+    A string placed in head space, in meters with x right, y up and -z forward.
+
+    Changing the text marks the label for re-layout, moving or recolouring it only for a vertex rebuild.
+    """
+    __slots__ = ("_text", "_position", "_scale", "_color", "_visible", "quads", "layout_dirty", "dirty")
+
+    def __init__(self, text: str, position: tuple[float, float, float], scale: float,
+                 color: tuple[float, float, float, float]) -> None:
+        self._text = text
+        self._position = np.asarray(position, dtype=np.float32)
+        self._scale = scale
+        self._color = np.asarray(color, dtype=np.float32)
+        self._visible = True
+        self.quads = None
+        self.layout_dirty = True
+        self.dirty = True
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, text: str) -> None:
+        if text != self._text:
+            self._text = text
+            self.layout_dirty = True
+            self.dirty = True
+
+    @property
+    def position(self) -> np.ndarray:
+        return self._position
+
+    @position.setter
+    def position(self, position: tuple[float, float, float]) -> None:
+        self._position = np.asarray(position, dtype=np.float32)
+        self.dirty = True
+
+    @property
+    def scale(self) -> float:
+        return self._scale
+
+    @scale.setter
+    def scale(self, scale: float) -> None:
+        self._scale = scale
+        self.dirty = True
+
+    @property
+    def color(self) -> np.ndarray:
+        return self._color
+
+    @color.setter
+    def color(self, color: tuple[float, float, float, float]) -> None:
+        self._color = np.asarray(color, dtype=np.float32)
+        self.dirty = True
+
+    @property
+    def visible(self) -> bool:
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible: bool) -> None:
+        if visible != self._visible:
+            self._visible = visible
+            self.dirty = True
+
+
+class TextRenderer:
+    """
+    Draws all HUD text from one glyph atlas in a single draw call per eye.
+
+    The vertices of every visible label live in one vertex buffer, rebuilt and uploaded only when a label
+    changed, and only labels whose text changed are laid out again. Unchanged text costs no upload.
+    """
+
+    def __init__(self, atlas: GlyphAtlas, projection: np.ndarray) -> None:
+        """Create the text renderer.
+
+        Parameters
+        ----------
+        atlas : GlyphAtlas
+        projection : np.ndarray
+            Eye projection matrix, in the engine's upload layout.
+
+        Returns
+        -------
+        None
+        """
+        self.atlas = atlas
+        self.labels: list[TextLabel] = []
+        self.vertex_count = 0
+        self._dirty = False
+
+        self.shader = Shader(asset_path("shaders/text.vert"), asset_path("shaders/text.frag"))
+        self.shader.use()
+        glUniform1i(glGetUniformLocation(self.shader.program, "glyphAtlas"), 0)
+        glUniformMatrix4fv(glGetUniformLocation(self.shader.program, "projection"), 1, GL_FALSE, projection)
+        self.view_location = glGetUniformLocation(self.shader.program, "view")
+
+        self.VAO = glGenVertexArrays(1)
+        glBindVertexArray(self.VAO)
+        self.VBO = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        self.capacity = 0
+        # Position, texture coordinate and color
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, dt.hud_vertex.itemsize, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, dt.hud_vertex.itemsize, ctypes.c_void_p(12))
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(2, 4, GL_FLOAT, GL_FALSE, dt.hud_vertex.itemsize, ctypes.c_void_p(20))
+        glEnableVertexAttribArray(2)
+        glBindVertexArray(0)
+
+    def add(self, text: str, position: tuple[float, float, float], scale: float = 0.001,
+            color: tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0)) -> TextLabel:
+        """Add a label.
+
+        Parameters
+        ----------
+        text : str
+        position : tuple[float, float, float]
+            Top left of the first line, in head space meters.
+        scale : float
+            Meters per font pixel.
+        color : tuple[float, float, float, float]
+            RGBA color.
+
+        Returns
+        -------
+        TextLabel
+            Handle used to update or remove the label.
+        """
+        label = TextLabel(text, position, scale, color)
+        self.labels.append(label)
+        self._dirty = True
+        return label
+
+    def remove(self, label: TextLabel) -> None:
+        self.labels.remove(label)
+        self._dirty = True
+
+    def _build(self) -> np.ndarray:
+        """Lay out changed labels and gather the vertices of all visible ones."""
+        chunks = []
+        for label in self.labels:
+            if label.layout_dirty:
+                label.quads = self.atlas.layout(label.text).reshape(-1, 4)
+                label.layout_dirty = False
+            label.dirty = False
+            if not label.visible or len(label.quads) == 0:
+                continue
+            chunk = np.empty(len(label.quads), dtype=dt.hud_vertex)
+            chunk['x'] = label.position[0] + label.quads[:, 0] * label.scale
+            chunk['y'] = label.position[1] + label.quads[:, 1] * label.scale
+            chunk['z'] = label.position[2]
+            chunk['s'] = label.quads[:, 2]
+            chunk['t'] = label.quads[:, 3]
+            for channel, value in zip("rgba", label.color):
+                chunk[channel] = value
+            chunks.append(chunk)
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=dt.hud_vertex)
+
+    def update(self) -> None:
+        """Rebuild and upload the vertex buffer if any label changed. Call once per frame.
+
+        Returns
+        -------
+        None
+        """
+        if not (self._dirty or any(label.dirty for label in self.labels)):
+            return
+        self._dirty = False
+        vertices = self._build()
+        self.vertex_count = len(vertices)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        if vertices.nbytes > self.capacity:
+            self.capacity = max(vertices.nbytes, 2 * self.capacity)
+            glBufferData(GL_ARRAY_BUFFER, self.capacity, None, GL_DYNAMIC_DRAW)
+        if self.vertex_count:
+            glBufferSubData(GL_ARRAY_BUFFER, 0, vertices.nbytes, vertices)
+
+    def draw(self, view: np.ndarray) -> None:
+        """Draw all labels into the currently bound eye buffer.
+
+        Parameters
+        ----------
+        view : np.ndarray
+            Head space to eye space matrix, in the engine's upload layout.
+
+        Returns
+        -------
+        None
+        """
+        if self.vertex_count == 0:
+            return
+        glDisable(GL_DEPTH_TEST)
+        self.shader.use()
+        glUniformMatrix4fv(self.view_location, 1, GL_FALSE, view)
+        self.atlas.use(0)
+        glBindVertexArray(self.VAO)
+        Mesh._armed = None
+        glDrawArrays(GL_TRIANGLES, 0, self.vertex_count)
+        glEnable(GL_DEPTH_TEST)
+
+    def destroy(self) -> None:
+        glDeleteBuffers(1, [self.VBO])
+        glDeleteVertexArrays(1, self.VAO)
+        self.shader.destroy()
+        self.atlas.destroy()
@@ -0,0 +1,65 @@
+import numpy as np
+from OpenGL.GL import *
+
+__all__ = ['DepthTexture']
+
+
+class DepthTexture:
+    """
+    Single channel float texture holding a real-world depth map, used to occlude virtual objects.
+    """
+
+    def __init__(self):
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        # Nearest filtering so depth edges are not blended into invalid (0) texels
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+
+        self.width, self.height = 0, 0
+        self.frame_id = -1
+
+    def update(self, depth: np.ndarray, frame_id: int) -> None:
+        """Upload a new depth map.
+
+        Uploads are skipped if `frame_id` was already uploaded. The storage is only reallocated when the
+        depth map changes size.
+
+        Parameters
+        ----------
+        depth : np.ndarray
+            2D float32 depth map, first row at the top of the image.
+        frame_id : int
+            Identifier of the capture the depth map belongs to.
+
+        Returns
+        -------
+        None
+        """
+        if frame_id == self.frame_id:
+            return
+        self.frame_id = frame_id
+
+        height, width = depth.shape
+        data = np.ascontiguousarray(depth, dtype=np.float32)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+        if (width, height) != (self.width, self.height):
+            self.width, self.height = width, height
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_R32F, width, height, 0, GL_RED, GL_FLOAT, data)
+        else:
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, GL_RED, GL_FLOAT, data)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.width > 0
+
+    def use(self, unit: int = 1) -> None:
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glActiveTexture(GL_TEXTURE0)
+
+    def destroy(self) -> None:
+        glDeleteTextures(1, self.texture)
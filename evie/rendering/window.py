@@ -0,0 +1,370 @@
+import time
+from abc import ABC, abstractmethod
+import numpy as np
+import OpenGL.platform
+from OpenGL.GL import *
+from evie.core.config import *
+from evie.rendering.framebuffer import RenderTarget
+
+__all__ = ['Window', 'GLFWWindow', 'HeadlessWindow', 'create_window', 'compare_frames']
+
+EGL_PLATFORM_SURFACELESS_MESA = 0x31DD
+
+
+class Window(ABC):
+    """
+    Interface of the windowing backends.
+
+    A backend owns the OpenGL context and the display surface. The engine draws its final pass into
+    `framebuffer`, which is 0 for an on-screen window.
+    """
+
+    framebuffer = 0
+
+    @abstractmethod
+    def get_time(self) -> float:
+        """Seconds since the backend was created."""
+
+    def poll_events(self) -> None:
+        pass
+
+    def should_close(self) -> bool:
+        return False
+
+    @abstractmethod
+    def swap_buffers(self) -> None:
+        """Present the frame drawn into `framebuffer`."""
+
+    @abstractmethod
+    def read_frame(self) -> np.ndarray:
+        """Read back the displayed frame.
+
+        Returns
+        -------
+        np.ndarray
+            (height, width, 3) uint8 RGB image, first row at the top.
+        """
+
+    def destroy(self) -> None:
+        pass
+
+
+class GLFWWindow(Window):
+    """
+    Fullscreen GLFW window on the primary monitor.
+
+    Pressing Escape closes it.
+    """
+
+    def __init__(self, width: int = SCREEN_WIDTH, height: int = SCREEN_HEIGHT, vsync: bool = VSYNC) -> None:
+        """Initialise the windowing system with GLFW
+
+        Parameters
+        ----------
+        width : int
+        height : int
+        vsync : bool
+
+        Returns
+        -------
+        None
+        """
+        # Imported here so headless machines without a GLFW library can still use the other backends
+        import glfw
+        from glfw.GLFW import GLFW_CONTEXT_VERSION_MAJOR, GLFW_CONTEXT_VERSION_MINOR, GLFW_OPENGL_FORWARD_COMPAT, \
+            GLFW_TRUE, GLFW_CURSOR, GLFW_CURSOR_HIDDEN, GLFW_PRESS, GLFW_KEY_ESCAPE
+        self._glfw = glfw
+        self._press = GLFW_PRESS
+        self._escape = GLFW_KEY_ESCAPE
+        self.width, self.height = width, height
+        self.keys: dict[int, bool] = {}
+
+        # Set the error callback
+        glfw.set_error_callback(glfw_error_callback)
+
+        # Initialise GLFW
+        if not glfw.init():
+            raise Exception("Failed to initialise GLFW")
+        glfw.window_hint(GLFW_CONTEXT_VERSION_MAJOR, 3)
+        glfw.window_hint(GLFW_CONTEXT_VERSION_MINOR, 1)
+        glfw.window_hint(GLFW_OPENGL_FORWARD_COMPAT, GLFW_TRUE)
+
+        self.handle = glfw.create_window(width, height, "EVIE", glfw.get_primary_monitor(), None)
+        if not self.handle:
+            glfw.terminate()
+            raise Exception("Failed to create window")
+
+        glfw.make_context_current(self.handle)
+        # Enable VSYNC
+        if vsync:
+            glfw.swap_interval(1)
+        else:
+            glfw.swap_interval(0)
+
+        # Mouse/cursor input
+        glfw.set_input_mode(self.handle, GLFW_CURSOR, GLFW_CURSOR_HIDDEN)
+        # Keyboard input
+        glfw.set_key_callback(self.handle, self._key_callback)
+
+    def _key_callback(self, window, key, scancode, action, mods):
+        """
+        Handle a key event
+        Parameters
+        ----------
+        window :
+            The window the event occurred in.
+        key :
+            The key that was pressed or released.
+        scancode :
+            The system-specific scancode of the key.
+        action :
+            The action that was taken (press, release, etc.).
+        mods :
+            Any modifier keys that were pressed.
+
+        Returns
+        -------
+        None
+        """
+        key_state = (action == self._press)
+        self.keys[key] = key_state
+
+    def get_time(self) -> float:
+        return self._glfw.get_time()
+
+    def poll_events(self) -> None:
+        self._glfw.poll_events()
+
+    def should_close(self) -> bool:
+        return self._glfw.window_should_close(self.handle) or self.keys.get(self._escape, False)
+
+    def swap_buffers(self) -> None:
+        self._glfw.swap_buffers(self.handle)
+
+    def read_frame(self) -> np.ndarray:
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, 0)
+        glReadBuffer(GL_FRONT)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        data = glReadPixels(0, 0, self.width, self.height, GL_RGB, GL_UNSIGNED_BYTE)
+        return np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 3)[::-1]
+
+    def destroy(self) -> None:
+        self._glfw.destroy_window(self.handle)
+        self._glfw.terminate()
+
+
+class HeadlessWindow(Window):
+    """
+    Offscreen OpenGL context rendering into a framebuffer object, for machines without a display.
+
+    Uses EGL with a surfaceless context, or OSMesa, which runs on Mesa's llvmpipe without a GPU. PyOpenGL picks
+    its platform when it is first imported, so `PYOPENGL_PLATFORM` must match the backend; `evie.core.config`
+    sets it from `WINDOW_BACKEND` before OpenGL is imported, and `create_window` checks it. The EGL and OSMesa
+    bindings are imported on demand since each is only available on its own platform.
+    """
+
+    def __init__(self, backend: str = WINDOW_BACKEND, width: int = SCREEN_WIDTH, height: int = SCREEN_HEIGHT,
+                 readback: bool = HEADLESS_READBACK) -> None:
+        """Create the offscreen context and display framebuffer.
+
+        Parameters
+        ----------
+        backend : str
+            "egl" or "osmesa".
+        width : int
+            Width of the virtual display.
+        height : int
+            Height of the virtual display.
+        readback : bool
+            Whether every swapped frame is read back into `last_frame`.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        RuntimeError
+            If no context could be created.
+        """
+        self.backend = backend
+        self.width, self.height = width, height
+        self.readback = readback
+        self.last_frame: np.ndarray | None = None
+        self._start = time.perf_counter()
+
+        if backend == "egl":
+            self._init_egl()
+        elif backend == "osmesa":
+            self._init_osmesa()
+        else:
+            raise ValueError(f"Unknown headless backend '{backend}'.")
+
+        # The virtual display, the engine's final pass draws into it
+        self.display = RenderTarget(width, height)
+        self.framebuffer = self.display.FBO
+
+    def _init_egl(self) -> None:
+        from OpenGL import EGL
+
+        display = EGL.EGL_NO_DISPLAY
+        # Prefer the Mesa surfaceless platform, it needs neither a GPU nor a display server
+        try:
+            from OpenGL.EGL.EXT.platform_base import eglGetPlatformDisplayEXT
+            display = eglGetPlatformDisplayEXT(EGL_PLATFORM_SURFACELESS_MESA, EGL.EGL_DEFAULT_DISPLAY, None)
+        except (ImportError, AttributeError, EGL.EGLError):
+            display = EGL.EGL_NO_DISPLAY
+        if not display or display == EGL.EGL_NO_DISPLAY:
+            display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        if not EGL.eglInitialize(display, major, minor):
+            raise RuntimeError("Failed to initialise EGL")
+
+        config_attributes = (EGL.EGLint * 5)(
+            EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+            EGL.EGL_NONE
+        )
+        config = EGL.EGLConfig()
+        num_configs = EGL.EGLint()
+        if not EGL.eglChooseConfig(display, config_attributes, config, 1, num_configs) or num_configs.value < 1:
+            raise RuntimeError("No suitable EGL config")
+
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        context_attributes = (EGL.EGLint * 7)(
+            EGL.EGL_CONTEXT_MAJOR_VERSION, 3,
+            EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+            EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+            EGL.EGL_NONE
+        )
+        context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, context_attributes)
+        if context == EGL.EGL_NO_CONTEXT:
+            raise RuntimeError("Failed to create EGL context")
+        # Surfaceless: all drawing goes to framebuffer objects
+        if not EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context):
+            raise RuntimeError("Failed to make the EGL context current")
+
+        self._egl = EGL
+        self._egl_display = display
+        self._egl_context = context
+
+    def _init_osmesa(self) -> None:
+        from OpenGL import arrays, osmesa
+
+        attributes = arrays.GLintArray.asArray([
+            osmesa.OSMESA_FORMAT, osmesa.OSMESA_RGBA,
+            osmesa.OSMESA_DEPTH_BITS, 24,
+            osmesa.OSMESA_PROFILE, osmesa.OSMESA_CORE_PROFILE,
+            osmesa.OSMESA_CONTEXT_MAJOR_VERSION, 3,
+            osmesa.OSMESA_CONTEXT_MINOR_VERSION, 3,
+            0
+        ])
+        context = osmesa.OSMesaCreateContextAttribs(attributes, None)
+        if not context:
+            raise RuntimeError("Failed to create OSMesa context")
+        # OSMesa needs a backing buffer even though drawing goes to framebuffer objects
+        self._osmesa_buffer = arrays.GLubyteArray.zeros((self.height, self.width, 4))
+        if not osmesa.OSMesaMakeCurrent(context, self._osmesa_buffer, GL_UNSIGNED_BYTE, self.width, self.height):
+            raise RuntimeError("Failed to make the OSMesa context current")
+
+        self._osmesa = osmesa
+        self._osmesa_context = context
+
+    def get_time(self) -> float:
+        return time.perf_counter() - self._start
+
+    def swap_buffers(self) -> None:
+        # No display to wait on, just let the GPU finish the frame so timings stay honest
+        glFinish()
+        if self.readback:
+            self.last_frame = self.read_frame()
+
+    def read_frame(self) -> np.ndarray:
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.framebuffer)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        data = glReadPixels(0, 0, self.width, self.height, GL_RGB, GL_UNSIGNED_BYTE)
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, 0)
+        return np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 3)[::-1].copy()
+
+    def destroy(self) -> None:
+        self.display.destroy()
+        if self.backend == "egl":
+            EGL = self._egl
+            EGL.eglMakeCurrent(self._egl_display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            EGL.eglDestroyContext(self._egl_display, self._egl_context)
+            EGL.eglTerminate(self._egl_display)
+        else:
+            self._osmesa.OSMesaDestroyContext(self._osmesa_context)
+
+
+def create_window(backend: str = WINDOW_BACKEND) -> Window:
+    """Create the window backend selected in config.
+
+    Parameters
+    ----------
+    backend : str
+        "glfw" for an on-screen window, "egl" or "osmesa" for headless rendering.
+
+    Returns
+    -------
+    Window
+
+    Raises
+    ------
+    RuntimeError
+        If PyOpenGL was loaded for another platform than the backend needs.
+    """
+    _check_platform(backend)
+    if backend == "glfw":
+        return GLFWWindow()
+    return HeadlessWindow(backend)
+
+
+def _check_platform(backend: str) -> None:
+    """Make sure the platform PyOpenGL bound to on import suits the backend.
+
+    The platform cannot change once OpenGL is imported, and a mismatched one fails in obscure ways on the
+    first GL call, so a backend other than the configured one is rejected with a clear error instead.
+    """
+    # Module of the platform class, e.g. "OpenGL.platform.egl"
+    platform = type(OpenGL.platform.PLATFORM).__module__.rsplit(".", 1)[-1]
+    # GLFW windows work with the platform PyOpenGL picks by default, EGL included on Wayland
+    if backend in ("egl", "osmesa") and platform != backend:
+        raise RuntimeError(
+            f"PyOpenGL was loaded for the '{platform}' platform, which does not suit the '{backend}' window "
+            f"backend. Select the backend before evie is imported, with EVIE_BACKEND={backend}."
+        )
+
+
+def compare_frames(frame: np.ndarray, reference: np.ndarray, tolerance: int = 2) -> dict[str, float]:
+    """Compare a rendered frame against a reference image.
+
+    Parameters
+    ----------
+    frame : np.ndarray
+        Rendered image, e.g. from `Window.read_frame`.
+    reference : np.ndarray
+        Expected image of the same shape.
+    tolerance : int
+        Per-channel difference below which pixels are considered equal, absorbing rasteriser differences.
+
+    Returns
+    -------
+    dict[str, float]
+        Maximum and mean absolute difference, and the fraction of pixels differing by more than `tolerance`.
+
+    Raises
+    ------
+    ValueError
+        If the images have different shapes.
+    """
+    if frame.shape != reference.shape:
+        raise ValueError(f"Frame shape {frame.shape} does not match reference shape {reference.shape}.")
+    difference = np.abs(frame.astype(np.int16) - reference.astype(np.int16))
+    differing = (difference > tolerance).any(axis=-1)
+    return {
+        "max": float(difference.max()),
+        "mean": float(difference.mean()),
+        "fraction": float(differing.mean())
+    }
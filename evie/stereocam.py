@@ -1,37 +1,50 @@
 import numpy as np
 import glob
 import cv2
+from evie.capture import CaptureBackend, VideoCaptureBackend
+from evie.core.config import GRAB_BUFFERS
 
 # TODO: add logging, warnings
 
 
 class StereoCam:
 
-    def __init__(self, cam_id):
+    def __init__(self, cam_id=0, backend: CaptureBackend = None, buffers: int = GRAB_BUFFERS):
 
-        self.cap = cv2.VideoCapture(cam_id)
-
-        # Check if the cameras are opened correctly
-        if not self.cap.isOpened():
-            raise IOError('Cannot access stereo cameras.')
+        # Frames come from a capture backend, a side-by-side cv2 camera unless given
+        self.backend = backend if backend is not None else VideoCaptureBackend(cam_id)
+        self.timestamp = None  # Timestamp of the last pair grabbed
 
         # Resolution and rate of the camera frames (both L and R views stitched side by side)
-        self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_width = self.backend.frame_width
+        self.frame_height = self.backend.frame_height
+        self.fps = self.backend.fps
 
         # Map init for undistorting
         self.undistort = False
         self.map1x, self.map1y = None, None
         self.map2x, self.map2y = None, None
 
+        # Rectification results, kept for depth estimation
+        self.q = None
+        self.p1, self.p2 = None, None
+        self.roi1, self.roi2 = None, None
+
+        # Rotating output pairs of grab, so a pair stays valid for `buffers - 1` more grabs
+        w, h = self.frame_width // 2, self.frame_height
+        self.buffers = [(np.empty((h, w, 3), np.uint8), np.empty((h, w, 3), np.uint8)) for _ in range(buffers)]
+        self.buffer_index = 0
+
     def calibration_wizard(self, output_path, chessboard_size=(9, 6), square_size_mm=20):
         w, h = self.frame_width // 2, self.frame_height
 
         # Take snapshots
         num = 0
-        while self.cap.isOpened():
-            ret, frame = self.cap.read()
+        while True:
+            pair = self.backend.read()
+            if pair is None:
+                continue
+            frame = np.hstack(pair[:2])
             key = cv2.waitKey(1)
 
             if key == 27:
@@ -118,15 +131,22 @@ class StereoCam:
         w, h = self.frame_width // 2, self.frame_height
 
         r1, r2, p1, p2, q, roi1, roi2 = cv2.stereoRectify(mtx1, dist1, mtx2, dist2, (w, h), r, t)
+        self.q = q
+        self.p1, self.p2 = p1, p2
+        self.roi1, self.roi2 = roi1, roi2
 
         self.map1x, self.map1y = cv2.initUndistortRectifyMap(mtx1, dist1, r1, p1, (w, h), 5)
         self.map2x, self.map2y = cv2.initUndistortRectifyMap(mtx2, dist2, r2, p2, (w, h), 5)
+        # Fixed-point maps remap faster and read less memory than float ones
+        self.map1x, self.map1y = cv2.convertMaps(self.map1x, self.map1y, cv2.CV_16SC2)
+        self.map2x, self.map2y = cv2.convertMaps(self.map2x, self.map2y, cv2.CV_16SC2)
 
     def __del__(self):
-        self.cap.release()
+        if getattr(self, 'backend', None) is not None:
+            self.backend.close()
 
     def close(self):
-        self.cap.release()
+        self.backend.close()
 
     def cut(self, full_frame):
         """
@@ -139,15 +159,62 @@ class StereoCam:
 
         return img_l, img_r
 
-    def grab(self):
-        ret, frame = self.cap.read()
+    def crop_region(self, size):
+        """
+        Centered region of a view, as in passthrough where the camera views are larger than the eye buffers.
+        :param size: (width, height) wanted, clamped to the view size
+        :return: (x, y, width, height)
+        """
+        view_w, view_h = self.frame_width // 2, self.frame_height
+        w, h = min(size[0], view_w), min(size[1], view_h)
+        return (view_w - w) // 2, (view_h - h) // 2, w, h
 
-        if ret:  # if a frame is captured
-            # Split both right and left images
-            img_l, img_r = self.cut(frame)
+    def grab(self, dst=None, crop=None):
+        """
+        Grab the next stereo pair, rectified if `undistort` is set, without allocating.
+
+        The backend reads into its own reused buffers, and the views are remapped, or copied, straight into
+        the output arrays. These may be views themselves, e.g. the halves of a side-by-side image from `compose`.
+        Cropping remaps only the cropped region, through views of the maps.
+        :param dst: (left, right) arrays of the view, or crop, shape to write into, or None to use the camera's
+                    rotating buffers, valid for `buffers - 1` more grabs
+        :param crop: (x, y, width, height) region of each view to keep, e.g. from `crop_region`, None for all
+        :return: img_l, img_r, or None if no pair was captured
+        """
+        pair = self.backend.read()
+        if pair is None:
+            return None
+        src_l, src_r, self.timestamp = pair
+
+        x, y, w, h = crop if crop is not None else (0, 0, src_l.shape[1], src_l.shape[0])
+        if dst is None:
+            dst = tuple(buffer[:h, :w] for buffer in self.buffers[self.buffer_index])
+            self.buffer_index = (self.buffer_index + 1) % len(self.buffers)
+        img_l, img_r = dst
+
+        if self.undistort:  # TODO: see if cv2.fisheye rectification works better
+            region = (slice(y, y + h), slice(x, x + w))
+            for src, out, map_x, map_y in ((src_l, img_l, self.map1x, self.map1y),
+                                           (src_r, img_r, self.map2x, self.map2y)):
+                result = cv2.remap(src, map_x[region], map_y[region], cv2.INTER_LINEAR, dst=out)
+                if result is not out:
+                    # OpenCV builds without strided output support write to a new array
+                    np.copyto(out, result)
+        else:
+            # The backend reuses its buffers on the next read
+            np.copyto(img_l, src_l[y:y + h, x:x + w])
+            np.copyto(img_r, src_r[y:y + h, x:x + w])
 
-            if self.undistort:  # TODO: see if cv2.fisheye rectification works better
-                img_l = cv2.remap(img_l, self.map1x, self.map1y, cv2.INTER_LINEAR)
-                img_r = cv2.remap(img_r, self.map2x, self.map2y, cv2.INTER_LINEAR)
+        return img_l, img_r
 
-            return img_l, img_r
+    def compose(self, dst, crop=None):
+        """
+        Grab the next stereo pair straight into the halves of a side-by-side image, without intermediate copies.
+        :param dst: (height, 2 * width, 3) array, width and height being those of the crop or of a view
+        :param crop: (x, y, width, height) region of each view to keep, None for the whole views
+        :return: dst, or None if no pair was captured
+        """
+        mid = dst.shape[1] // 2
+        if self.grab((dst[:, :mid], dst[:, mid:]), crop) is None:
+            return None
+        return dst
@@ -0,0 +1,3 @@
+from .imu import ImuSource, ImuReplay, load_imu_log, save_imu_log
+from .fusion import MadgwickFilter
+from .tracker import HeadPose, ImuTracker
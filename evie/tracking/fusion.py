@@ -0,0 +1,187 @@
+import numpy as np
+from evie.core.config import *
+
+__all__ = ['MadgwickFilter', 'quaternion_multiply', 'quaternion_matrix', 'integrate_rate']
+
+
+def quaternion_multiply(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Hamilton product of quaternions stored w, x, y, z.
+
+    Parameters
+    ----------
+    a : np.ndarray
+    b : np.ndarray
+
+    Returns
+    -------
+    np.ndarray
+    """
+    aw, ax, ay, az = a
+    bw, bx, by, bz = b
+    return np.array([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw
+    ])
+
+
+def quaternion_matrix(q: np.ndarray) -> np.ndarray:
+    """Rotation matrix of a unit quaternion stored w, x, y, z, acting on column vectors.
+
+    Parameters
+    ----------
+    q : np.ndarray
+
+    Returns
+    -------
+    np.ndarray
+        3x3 rotation matrix.
+    """
+    w, x, y, z = q
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+        [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+        [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)]
+    ])
+
+
+def integrate_rate(q: np.ndarray, rate: np.ndarray, dt: float) -> np.ndarray:
+    """Rotate an orientation by a constant body-frame angular velocity.
+
+    Parameters
+    ----------
+    q : np.ndarray
+        Sensor to earth orientation, w, x, y, z.
+    rate : np.ndarray
+        Angular velocity in sensor axes, rad/s.
+    dt : float
+        Seconds to integrate over.
+
+    Returns
+    -------
+    np.ndarray
+        Orientation after dt.
+    """
+    angle = float(np.linalg.norm(rate)) * dt
+    if angle < 1e-12:
+        return q
+    axis = rate / np.linalg.norm(rate)
+    delta = np.concatenate(([np.cos(angle / 2)], axis * np.sin(angle / 2)))
+    return quaternion_multiply(q, delta)
+
+
+class MadgwickFilter:
+    """
+    Madgwick's gradient descent orientation filter, for gyroscope and accelerometer samples.
+
+    The gyroscope is integrated every sample, while a step of size `beta` along the gradient of the gravity
+    error pulls roll and pitch towards the measured acceleration. Heading is unobserved without a magnetometer,
+    and drifts with the remaining gyroscope bias.
+
+    The filter is a recurrence, one sample depending on the last, so batches are prepared with NumPy, timesteps,
+    bias removal and accelerometer normalization at once, and only the update itself loops, on Python floats,
+    which beats NumPy's per-call overhead on four-element vectors.
+
+    References
+    ----------
+    https://x-io.co.uk/open-source-imu-and-ahrs-algorithms/
+    """
+
+    def __init__(self, beta: float = IMU_FILTER_BETA, gyro_bias: np.ndarray = (0.0, 0.0, 0.0)) -> None:
+        """Create a filter, initialized from the first samples' gravity.
+
+        Parameters
+        ----------
+        beta : float
+            Gradient step gain. Higher corrects tilt faster but lets linear acceleration through.
+        gyro_bias : np.ndarray
+            Gyroscope offset at rest in rad/s, subtracted from every sample.
+
+        Returns
+        -------
+        None
+        """
+        self.beta = beta
+        self.gyro_bias = np.asarray(gyro_bias, dtype=np.float64)
+        self.q = np.array([1.0, 0.0, 0.0, 0.0])  # Sensor to earth orientation, earth z up
+        self.time = None  # Timestamp of the last sample
+        self.rate = np.zeros(3)  # Last bias-corrected angular velocity, in sensor axes
+        self.samples = 0
+
+    def _align(self, gravity: np.ndarray) -> None:
+        """Start from the orientation turning the measured gravity onto earth z, with an arbitrary heading."""
+        cos = gravity[2]
+        if cos < -1 + 1e-9:
+            self.q = np.array([0.0, 1.0, 0.0, 0.0])
+            return
+        # Shortest arc from gravity to z: axis gravity x z, half the angle
+        q = np.array([1 + cos, gravity[1], -gravity[0], 0.0])
+        self.q = q / np.linalg.norm(q)
+
+    def update(self, samples: np.ndarray) -> None:
+        """Fuse a batch of samples, oldest first.
+
+        Parameters
+        ----------
+        samples : np.ndarray[dt.imu_sample]
+
+        Returns
+        -------
+        None
+        """
+        if not len(samples):
+            return
+        times = samples['t']
+        gyro = np.column_stack((samples['gx'], samples['gy'], samples['gz'])).astype(np.float64) - self.gyro_bias
+        accel = np.column_stack((samples['ax'], samples['ay'], samples['az'])).astype(np.float64)
+        norms = np.linalg.norm(accel, axis=1)
+        valid = norms > 0
+        accel[valid] /= norms[valid, None]
+
+        if self.time is None:
+            if valid.any():
+                gravity = accel[valid].mean(axis=0)
+                self._align(gravity / np.linalg.norm(gravity))
+            self.time = float(times[0])
+        # Gaps longer than a few samples, e.g. dropped packets, are not integrated across
+        dts = np.clip(np.diff(times, prepend=self.time), 0.0, 10.0 / IMU_RATE)
+
+        beta = self.beta
+        q0, q1, q2, q3 = self.q.tolist()
+        for dt, (gx, gy, gz), (ax, ay, az), has_accel in zip(dts.tolist(), gyro.tolist(), accel.tolist(),
+                                                             valid.tolist()):
+            # Rate of change of the orientation from the gyroscope
+            d0 = 0.5 * (-q1 * gx - q2 * gy - q3 * gz)
+            d1 = 0.5 * (q0 * gx + q2 * gz - q3 * gy)
+            d2 = 0.5 * (q0 * gy - q1 * gz + q3 * gx)
+            d3 = 0.5 * (q0 * gz + q1 * gy - q2 * gx)
+
+            if has_accel:
+                # Gradient of the error between measured gravity and gravity rotated into the sensor frame
+                q0q0, q1q1, q2q2, q3q3 = q0 * q0, q1 * q1, q2 * q2, q3 * q3
+                s0 = 4 * q0 * q2q2 + 2 * q2 * ax + 4 * q0 * q1q1 - 2 * q1 * ay
+                s1 = (4 * q1 * q3q3 - 2 * q3 * ax + 4 * q0q0 * q1 - 2 * q0 * ay - 4 * q1 + 8 * q1 * q1q1
+                      + 8 * q1 * q2q2 + 4 * q1 * az)
+                s2 = (4 * q0q0 * q2 + 2 * q0 * ax + 4 * q2 * q3q3 - 2 * q3 * ay - 4 * q2 + 8 * q2 * q1q1
+                      + 8 * q2 * q2q2 + 4 * q2 * az)
+                s3 = 4 * q1q1 * q3 - 2 * q1 * ax + 4 * q2q2 * q3 - 2 * q2 * ay
+                norm = (s0 * s0 + s1 * s1 + s2 * s2 + s3 * s3) ** 0.5
+                if norm > 0:
+                    step = beta / norm
+                    d0 -= step * s0
+                    d1 -= step * s1
+                    d2 -= step * s2
+                    d3 -= step * s3
+
+            q0 += d0 * dt
+            q1 += d1 * dt
+            q2 += d2 * dt
+            q3 += d3 * dt
+            norm = (q0 * q0 + q1 * q1 + q2 * q2 + q3 * q3) ** -0.5
+            q0, q1, q2, q3 = q0 * norm, q1 * norm, q2 * norm, q3 * norm
+
+        self.q = np.array([q0, q1, q2, q3])
+        self.time = float(times[-1])
+        self.rate = gyro[-1]
+        self.samples += len(samples)
@@ -0,0 +1,176 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Callable
+import numpy as np
+from evie.core.config import *
+import evie.core.datatypes as dt
+
+__all__ = ['ImuSource', 'ImuReplay', 'load_imu_log', 'save_imu_log']
+
+IMU_LOG_COLUMNS = dt.imu_sample.names
+
+
+def load_imu_log(path: str) -> np.ndarray:
+    """Read a recorded IMU log.
+
+    CSV logs hold one sample per line with the columns t, gx, gy, gz, ax, ay, az, optionally under a header line.
+    .npy logs hold an array of `dt.imu_sample`, any other extension the raw bytes of one.
+
+    Parameters
+    ----------
+    path : str
+
+    Returns
+    -------
+    np.ndarray[dt.imu_sample]
+        Samples ordered by timestamp.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path) as file:
+            first = file.readline().strip()
+        header = bool(first) and not (first[0].isdigit() or first[0] in "+-.")
+        columns = np.loadtxt(path, delimiter=",", skiprows=int(header), ndmin=2)
+        samples = np.zeros(len(columns), dtype=dt.imu_sample)
+        for i, name in enumerate(IMU_LOG_COLUMNS):
+            samples[name] = columns[:, i]
+    elif extension == ".npy":
+        samples = np.load(path).astype(dt.imu_sample, copy=False)
+    else:
+        samples = np.fromfile(path, dtype=dt.imu_sample)
+    return samples[np.argsort(samples['t'], kind='stable')]
+
+
+def save_imu_log(path: str, samples: np.ndarray) -> None:
+    """Write samples in the log format given by the extension of path, as read by `load_imu_log`.
+
+    Parameters
+    ----------
+    path : str
+    samples : np.ndarray[dt.imu_sample]
+
+    Returns
+    -------
+    None
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        columns = np.column_stack([samples[name] for name in IMU_LOG_COLUMNS])
+        np.savetxt(path, columns, delimiter=",", header=",".join(IMU_LOG_COLUMNS), comments="",
+                   fmt=["%.6f"] + ["%.7g"] * 6)
+    elif extension == ".npy":
+        np.save(path, samples)
+    else:
+        np.ascontiguousarray(samples, dtype=dt.imu_sample).tofile(path)
+
+
+class ImuSource(ABC):
+    """
+    Interface of IMU sample sources.
+
+    A source hands out batches of `dt.imu_sample`, timestamped on the clock the renderer predicts poses with, so
+    predicted display times and sample times can be compared directly.
+    """
+
+    rate = IMU_RATE  # Nominal samples per second
+    clock = staticmethod(time.perf_counter)  # Clock the timestamps are on
+
+    @abstractmethod
+    def read(self, timeout: float) -> np.ndarray:
+        """Wait for samples.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds to wait at most.
+
+        Returns
+        -------
+        np.ndarray[dt.imu_sample]
+            Samples since the last read, oldest first, empty on timeout. Valid until the next read.
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class ImuReplay(ImuSource):
+    """
+    Replays a recorded IMU log in place of the sensor.
+
+    Samples are released when their recorded time has passed on the clock, so the tracker sees the original
+    rates and batch sizes, or in fixed-size batches as fast as they are read, for benchmarks. Timestamps are
+    shifted onto the clock, the first sample being released when reading starts.
+    """
+
+    def __init__(self, log: 'str | np.ndarray', clock: Callable[[], float] = time.perf_counter,
+                 realtime: bool = True, loop: bool = False, batch_size: int = IMU_BATCH_SIZE) -> None:
+        """Load a log for replay.
+
+        Parameters
+        ----------
+        log : str | np.ndarray[dt.imu_sample]
+            Log path, see `load_imu_log`, or samples.
+        clock : Callable[[], float]
+            Time source in seconds, shared with the renderer.
+        realtime : bool
+            Release samples at their recorded times, otherwise `batch_size` samples per read without waiting.
+        loop : bool
+            Start over at the end of the log, otherwise reads return no samples once it is exhausted.
+        batch_size : int
+            Samples per read when not replaying in real time.
+
+        Returns
+        -------
+        None
+        """
+        recorded = load_imu_log(log) if isinstance(log, str) else np.asarray(log, dtype=dt.imu_sample)
+        if not len(recorded):
+            raise ValueError("IMU log holds no samples.")
+        self.recorded = recorded
+        self.samples = recorded.copy()
+        self.clock = clock
+        self.realtime = realtime
+        self.loop = loop
+        self.batch_size = batch_size
+        # A loop lasts the log plus one mean sample interval, so the first and last sample do not coincide
+        span = float(recorded['t'][-1] - recorded['t'][0])
+        self.duration = span + (span / (len(recorded) - 1) if len(recorded) > 1 else 1.0 / self.rate)
+        if len(recorded) > 1:
+            self.rate = (len(recorded) - 1) / span if span > 0 else self.rate
+        self.position = 0
+        self.start = None
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether every sample was read and the replay does not loop."""
+        return not self.loop and self.start is not None and self.position == len(self.samples)
+
+    def _rebase(self, start: float) -> None:
+        self.start = start
+        self.samples['t'] = self.recorded['t'] - self.recorded['t'][0] + start
+        self.position = 0
+
+    def read(self, timeout: float) -> np.ndarray:
+        if self.start is None:
+            self._rebase(self.clock())
+        if self.position == len(self.samples):
+            if not self.loop:
+                time.sleep(timeout)
+                return self.samples[:0]
+            self._rebase(self.start + self.duration)
+
+        if not self.realtime:
+            end = min(self.position + self.batch_size, len(self.samples))
+        else:
+            times = self.samples['t']
+            now = self.clock()
+            wait = times[self.position] - now
+            if wait > 0:
+                time.sleep(min(wait, timeout))
+                now = self.clock()
+            end = int(np.searchsorted(times, now, side='right'))
+        batch = self.samples[self.position:end]
+        self.position = max(end, self.position)
+        return batch
@@ -0,0 +1,190 @@
+import time
+import threading
+import numpy as np
+from evie.core.config import *
+from evie.tracking.imu import ImuSource
+from evie.tracking.fusion import MadgwickFilter, quaternion_matrix, integrate_rate
+
+__all__ = ['HeadPose', 'ImuTracker']
+
+# Filter earth axes (x north, y west, z up) in scene axes (y up)
+EARTH_TO_SCENE = np.array([
+    [0, -1, 0],
+    [0, 0, 1],
+    [-1, 0, 0]
+], dtype=np.float64)
+
+
+class HeadPose:
+    """
+    Immutable head orientation estimate, at the time of the last fused sample.
+    """
+    __slots__ = ("time", "orientation", "rate")
+
+    def __init__(self, time: float, orientation: np.ndarray, rate: np.ndarray):
+        self.time = time
+        self.orientation = orientation  # Sensor to earth quaternion, w, x, y, z
+        self.rate = rate  # Angular velocity in sensor axes, rad/s
+
+    def predict(self, time: float, horizon: float = IMU_PREDICTION_MAX) -> np.ndarray:
+        """Orientation at a later time, assuming the angular velocity stays constant.
+
+        Parameters
+        ----------
+        time : float
+            Time to predict for, on the sample clock.
+        horizon : float
+            Longest extrapolation in seconds, further predictions are held at it.
+
+        Returns
+        -------
+        np.ndarray
+            Sensor to earth quaternion, w, x, y, z.
+        """
+        return integrate_rate(self.orientation, self.rate, min(max(time - self.time, 0.0), horizon))
+
+
+class ImuTracker(threading.Thread):
+    """
+    Fuses IMU samples into head orientation on its own thread, and predicts it for display times.
+
+    Samples are read and filtered in batches, as many as arrived since the last read, so the thread wakes up
+    far less often than the sensor rate. The latest `HeadPose` is published by swapping a single reference,
+    so the render loop reads it without taking a lock, and `predict` fits `Scene.pose_source`.
+
+    Heading is relative: the first pose faces the scene's forward direction, until `recenter`.
+    """
+
+    def __init__(self, source: ImuSource, fusion: MadgwickFilter = None, position: np.ndarray = (0.0, 0.0, 0.0),
+                 mount: np.ndarray = None, horizon: float = IMU_PREDICTION_MAX,
+                 interval: float = IMU_BATCH_INTERVAL) -> None:
+        """Create a tracker.
+
+        Parameters
+        ----------
+        source : ImuSource
+            Sample source, the sensor or a replay.
+        fusion : MadgwickFilter
+            Orientation filter. A default one is made if omitted.
+        position : np.ndarray
+            Head position reported with every pose, as the IMU only measures orientation.
+        mount : np.ndarray
+            3x3 rotation whose columns are the head's right, up and forward axes in sensor axes. Identity if
+            omitted, for a sensor mounted with x right, y up and z forward.
+        horizon : float
+            Longest prediction, in seconds.
+        interval : float
+            Shortest time between batches, in seconds. Longer batches wake the thread less often, at the cost of
+            older poses.
+
+        Returns
+        -------
+        None
+        """
+        super().__init__(name="evie-imu", daemon=True)
+        self.source = source
+        self.fusion = fusion if fusion is not None else MadgwickFilter()
+        self.position = np.asarray(position, dtype=np.float32)
+        self.mount = np.eye(3) if mount is None else np.asarray(mount, dtype=np.float64)
+        self.horizon = horizon
+        self.interval = interval
+        self._latest: HeadPose | None = None
+        self._heading: np.ndarray | None = None  # Rotation undoing the heading of the reference pose
+        self._running = threading.Event()
+
+        self.batches = 0
+        self.filter_time = 0.0  # Seconds spent filtering the last batch
+        self.batch_size = 0
+        self.latency = 0.0  # Seconds from the newest sample of the last batch to its pose being published
+
+    @property
+    def latest(self) -> HeadPose | None:
+        """The most recent pose estimate, or None before the first samples."""
+        return self._latest
+
+    def start(self) -> None:
+        self._running.set()
+        super().start()
+
+    def run(self) -> None:
+        timeout = 10.0 / self.source.rate
+        while self._running.is_set():
+            samples = self.source.read(timeout)
+            if not len(samples):
+                continue
+            start = time.perf_counter()
+            next_batch = start + self.interval
+            self.fusion.update(samples)
+            self._latest = HeadPose(self.fusion.time, self.fusion.q, self.fusion.rate)
+            self.filter_time = time.perf_counter() - start
+            self.batch_size = len(samples)
+            self.batches += 1
+            self.latency = self.source.clock() - self.fusion.time
+            delay = next_batch - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def stop(self) -> None:
+        """Stop the tracker and close its source.
+
+        Returns
+        -------
+        None
+        """
+        self._running.clear()
+        if self.is_alive():
+            self.join()
+        self.source.close()
+
+    def _head_rotation(self, orientation: np.ndarray) -> np.ndarray:
+        """Head axes as the columns of a scene rotation."""
+        return EARTH_TO_SCENE @ quaternion_matrix(orientation) @ self.mount
+
+    def recenter(self) -> None:
+        """Make the current heading the scene's forward direction, keeping the tilt.
+
+        Returns
+        -------
+        None
+        """
+        pose = self._latest
+        if pose is None:
+            self._heading = None
+            return
+        forward = self._head_rotation(pose.orientation)[:, 2]
+        yaw = np.arctan2(forward[0], forward[2])
+        c, s = np.cos(-yaw), np.sin(-yaw)
+        self._heading = np.array([[c, 0, s], [0, 1, 0], [-s, 0, c]])
+
+    def predict(self, display_time: float) -> tuple[np.ndarray, np.ndarray]:
+        """Head pose expected at a display time.
+
+        Parameters
+        ----------
+        display_time : float
+            Time on the source's clock.
+
+        Returns
+        -------
+        np.ndarray
+            Head position.
+        np.ndarray
+            Camera rotation, whose rows are the right, up and forward vectors.
+        """
+        pose = self._latest
+        if pose is None:
+            return self.position, np.eye(3, dtype=np.float32)
+        if self._heading is None:
+            self.recenter()
+        head = self._heading @ self._head_rotation(pose.predict(display_time, self.horizon))
+        return self.position, head.T.astype(np.float32)
+
+    def stats(self) -> dict[str, float]:
+        """Fused samples and batches, and the last batch's size, filter time and latency."""
+        return {
+            "samples": self.fusion.samples,
+            "batches": self.batches,
+            "batch_size": self.batch_size,
+            "filter_ms": self.filter_time * 1000,
+            "latency_ms": self.latency * 1000
+        }
@@ -1,6 +1,23 @@
+import os
 import numpy as np
+from evie.core.config import ASSET_ROOT
 
-__all__ = ['normalize', 'perspective_projection_matrix', 'load_mesh']
+__all__ = ['asset_path', 'normalize', 'perspective_projection_matrix', 'frustum_planes', 'aabb_in_frustum', 'load_mesh']
+
+
+def asset_path(path: str) -> str:
+    """Resolve an asset path relative to `ASSET_ROOT`.
+
+    Parameters
+    ----------
+    path : str
+        Path such as "shaders/vertex.vert". Absolute paths are returned unchanged.
+
+    Returns
+    -------
+    str
+    """
+    return os.path.normpath(os.path.join(ASSET_ROOT, path))
 
 
 def normalize(vec: np.ndarray) -> np.ndarray:
@@ -56,6 +73,60 @@ def perspective_projection_matrix(fov: float, aspect: float, near: float, far: f
     ], dtype=np.float32)
 
 
+def frustum_planes(projection: np.ndarray, view: np.ndarray) -> np.ndarray:
+    """Extract the world space frustum planes of a camera.
+
+    Parameters
+    ----------
+    projection : np.ndarray
+        4x4 projection matrix, in the layout uploaded to OpenGL.
+    view : np.ndarray
+        4x4 view matrix, in the layout uploaded to OpenGL.
+
+    Returns
+    -------
+    np.ndarray
+        (6, 4) planes (a, b, c, d) with unit normals pointing inwards, so a point is inside a plane when
+        a*x + b*y + c*z + d >= 0. Ordered left, right, bottom, top, near, far.
+
+    References
+    ----------
+    Gribb, Hartmann. Fast Extraction of Viewing Frustum Planes from the World-View-Projection Matrix.
+    """
+    # Both matrices are stored transposed, so the row vector form needs no transpose
+    m = (view.astype(np.float64) @ projection.astype(np.float64)).T
+    planes = np.array([
+        m[3] + m[0], m[3] - m[0],
+        m[3] + m[1], m[3] - m[1],
+        m[3] + m[2], m[3] - m[2]
+    ])
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def aabb_in_frustum(planes: np.ndarray, mins: np.ndarray, maxs: np.ndarray) -> np.ndarray:
+    """Conservatively test axis aligned bounding boxes against a frustum.
+
+    Parameters
+    ----------
+    planes : np.ndarray
+        (6, 4) planes from `frustum_planes`.
+    mins : np.ndarray
+        (n, 3) box minimum corners.
+    maxs : np.ndarray
+        (n, 3) box maximum corners.
+
+    Returns
+    -------
+    np.ndarray
+        (n,) bool, False only for boxes entirely outside one of the planes.
+    """
+    # Corner of each box furthest along each plane normal
+    normals = planes[:, :3]
+    corners = np.where(normals[None, :, :] >= 0, maxs[:, None, :], mins[:, None, :])
+    distances = np.einsum('npk,pk->np', corners, normals) + planes[:, 3]
+    return np.all(distances >= 0, axis=1)
+
+
 def load_mesh(filename: str) -> list[float]:
     """
         Load a mesh from an obj file.
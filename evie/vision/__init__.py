@@ -0,0 +1,4 @@
+from .depth import StereoDepth
+from .worker import CaptureWorker, CaptureResult
+from .recording import StereoRecorder, StereoRecording, RecordingReplay
+from .odometry import StereoOdometry, OdometryPose
@@ -0,0 +1,188 @@
+import time
+import numpy as np
+import cv2
+from evie.core.config import *
+
+__all__ = ['StereoDepth']
+
+
+class StereoDepth:
+    """
+    Metric depth from rectified stereo pairs.
+
+    Disparity is computed on a downscaled region of interest of the left view, blended with the previous
+    disparity map and reprojected to depth with the `Q` matrix from `cv2.stereoRectify`.
+    """
+
+    def __init__(self, q: np.ndarray,
+                 matcher: str = DEPTH_MATCHER,
+                 scale: float = DEPTH_SCALE,
+                 roi: tuple[int, int, int, int] = DEPTH_ROI,
+                 num_disparities: int = DEPTH_NUM_DISPARITIES,
+                 block_size: int = DEPTH_BLOCK_SIZE,
+                 reuse_interval: int = DEPTH_REUSE_INTERVAL,
+                 temporal_alpha: float = DEPTH_TEMPORAL_ALPHA,
+                 unit_scale: float = DEPTH_UNIT_SCALE,
+                 max_depth: float = DEPTH_MAX) -> None:
+        """Create a stereo depth estimator.
+
+        Parameters
+        ----------
+        q : np.ndarray
+            4x4 disparity-to-depth matrix returned by `cv2.stereoRectify`.
+        matcher : str
+            "sgbm" for semi-global block matching, "bm" for plain block matching.
+        scale : float
+            Downscale factor applied to the ROI before matching.
+        roi : tuple[int, int, int, int]
+            (x, y, w, h) of the region to match, in rectified pixels. None for the full frame.
+        num_disparities : int
+            Disparity search range at full resolution.
+        block_size : int
+            Matching block size, in downscaled pixels. Must be odd.
+        reuse_interval : int
+            Disparity is recomputed every `reuse_interval` frames and reused in between.
+        temporal_alpha : float
+            Weight of the new disparity when blending with the previous one. 1 disables blending.
+        unit_scale : float
+            Conversion factor from calibration units to scene units.
+        max_depth : float
+            Depths beyond this, in scene units, are marked invalid.
+
+        Returns
+        -------
+        None
+        """
+        self.q = np.asarray(q, dtype=np.float64)
+        self.scale = scale
+        self.roi = roi
+        self.reuse_interval = max(1, reuse_interval)
+        self.temporal_alpha = temporal_alpha
+        self.unit_scale = unit_scale
+        self.max_depth = max_depth
+
+        # The search range shrinks with the image, and OpenCV wants a multiple of 16
+        scaled_disparities = int(np.ceil(num_disparities * scale / 16)) * 16
+        self.matcher = self._create_matcher(matcher, max(16, scaled_disparities), block_size | 1)
+
+        self.frame_count = 0
+        self.disparity = None  # Float disparity in full resolution pixels
+        self.depth = None  # Float depth in scene units, 0 where invalid
+        self.roi_uv = (0.0, 0.0, 1.0, 1.0)  # Normalised (u0, v0, u1, v1) of the ROI, v measured from the top
+        self.reused = False
+
+        # Per-stage timings of the last computed frame, in seconds
+        self.timings = {"prepare": 0.0, "match": 0.0, "filter": 0.0, "reproject": 0.0}
+
+    @staticmethod
+    def _create_matcher(kind: str, num_disparities: int, block_size: int):
+        """Create the OpenCV stereo matcher.
+
+        Parameters
+        ----------
+        kind : str
+        num_disparities : int
+        block_size : int
+
+        Returns
+        -------
+        cv2.StereoMatcher
+
+        Raises
+        ------
+        ValueError
+            If the matcher kind is unknown.
+        """
+        if kind == "sgbm":
+            return cv2.StereoSGBM_create(
+                minDisparity=0,
+                numDisparities=num_disparities,
+                blockSize=block_size,
+                P1=8 * block_size ** 2,
+                P2=32 * block_size ** 2,
+                uniquenessRatio=10,
+                speckleWindowSize=50,
+                speckleRange=2,
+                mode=cv2.STEREO_SGBM_MODE_SGBM_3WAY
+            )
+        elif kind == "bm":
+            return cv2.StereoBM_create(numDisparities=num_disparities, blockSize=max(5, block_size))
+        raise ValueError(f"Unknown stereo matcher '{kind}'.")
+
+    def _prepare(self, img: np.ndarray) -> np.ndarray:
+        """Crop, convert to grayscale and downscale an image for matching."""
+        if self.roi is not None:
+            x, y, w, h = self.roi
+            img = img[y:y+h, x:x+w]
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if self.scale != 1.0:
+            img = cv2.resize(img, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return img
+
+    def compute(self, img_l: np.ndarray, img_r: np.ndarray) -> np.ndarray:
+        """Compute the depth map of a rectified stereo pair.
+
+        Every `reuse_interval` frames the disparity is recomputed, otherwise the last depth map is returned.
+        The returned array is never modified afterwards, so it can be handed to another thread.
+
+        Parameters
+        ----------
+        img_l : np.ndarray
+            Rectified left view.
+        img_r : np.ndarray
+            Rectified right view.
+
+        Returns
+        -------
+        np.ndarray
+            Depth map of the downscaled ROI in scene units, 0 where invalid.
+        """
+        self.frame_count += 1
+        self.reused = self.depth is not None and (self.frame_count - 1) % self.reuse_interval != 0
+        if self.reused:
+            return self.depth
+
+        t0 = time.perf_counter()
+        gray_l = self._prepare(img_l)
+        gray_r = self._prepare(img_r)
+        if self.roi is not None:
+            x, y, w, h = self.roi
+            height, width = img_l.shape[:2]
+            self.roi_uv = (x / width, y / height, (x + w) / width, (y + h) / height)
+
+        t1 = time.perf_counter()
+        # Disparities come out as 16-bit fixed point with 4 fractional bits
+        disparity = self.matcher.compute(gray_l, gray_r).astype(np.float32)
+        disparity *= 1.0 / (16.0 * self.scale)
+
+        t2 = time.perf_counter()
+        valid = disparity > 0
+        previous = self.disparity
+        if previous is not None and previous.shape == disparity.shape and self.temporal_alpha < 1.0:
+            previous_valid = previous > 0
+            both = valid & previous_valid
+            disparity[both] = self.temporal_alpha * disparity[both] + (1.0 - self.temporal_alpha) * previous[both]
+            self.disparity = disparity.copy()
+            # Fill holes with the previous estimate, for one frame only so stale surfaces do not linger
+            holes = ~valid & previous_valid
+            disparity[holes] = previous[holes]
+            valid |= holes
+        else:
+            self.disparity = disparity.copy()
+
+        t3 = time.perf_counter()
+        # Z = Q[2, 3] / (Q[3, 2] * d + Q[3, 3]), independent of the pixel position
+        w = self.q[3, 2] * disparity + self.q[3, 3]
+        depth = np.zeros_like(disparity)
+        np.divide(self.q[2, 3] * self.unit_scale, w, out=depth, where=valid & (w != 0))
+        depth[(depth <= 0) | (depth > self.max_depth)] = 0.0
+        self.depth = depth
+
+        t4 = time.perf_counter()
+        self.timings["prepare"] = t1 - t0
+        self.timings["match"] = t2 - t1
+        self.timings["filter"] = t3 - t2
+        self.timings["reproject"] = t4 - t3
+
+        return depth
@@ -0,0 +1,385 @@
+import time
+import numpy as np
+import cv2
+from evie.core.config import *
+
+__all__ = ['OdometryPose', 'StereoOdometry']
+
+# OpenCV camera axes (x right, y down, z viewing direction) in head axes (x right, y up, z backward)
+CV_TO_HEAD = np.diag([1.0, -1.0, -1.0])
+
+
+class OdometryPose:
+    """
+    Immutable head pose estimated from one stereo pair, in scene axes.
+    """
+    __slots__ = ("frame", "position", "rotation", "valid", "keyframe", "tracked", "inliers")
+
+    def __init__(self, frame: int, position: np.ndarray, rotation: np.ndarray, valid: bool, keyframe: bool,
+                 tracked: int, inliers: int):
+        self.frame = frame
+        self.position = position  # Head position, in scene units
+        self.rotation = rotation  # Camera rotation, whose rows are the right, up and forward vectors
+        self.valid = valid  # False if tracking was lost on this frame and the last pose is held
+        self.keyframe = keyframe  # Whether features were detected on this frame
+        self.tracked = tracked  # Landmarks followed from the previous frame
+        self.inliers = inliers  # Tracked landmarks consistent with the estimated pose
+
+
+class StereoOdometry:
+    """
+    Head pose from rectified stereo pairs, relative to the first frame.
+
+    Landmarks are features of the left view triangulated from their stereo disparity, in the coordinates of the
+    first frame. Every frame they are followed with pyramidal Lucas-Kanade optical flow, and the camera pose is
+    found from the 3D landmarks and their new image positions with PnP inside RANSAC, which also rejects
+    mistracked features. Detection and triangulation only run on keyframes, when too few landmarks are left or
+    after `keyframe_interval` frames, and only add features away from the tracked ones, so landmarks keep the
+    coordinates they were triangulated with and drift only accumulates from keyframe to keyframe.
+
+    Triangulation uses the `Q` matrix from `cv2.stereoRectify`, which a recording keeps too, so recorded
+    sequences replay through the same code as the camera.
+    """
+
+    def __init__(self, q: np.ndarray,
+                 origin: np.ndarray = (0.0, 0.0, 0.0),
+                 scale: float = ODOMETRY_SCALE,
+                 detector: str = ODOMETRY_DETECTOR,
+                 max_features: int = ODOMETRY_MAX_FEATURES,
+                 min_distance: int = ODOMETRY_MIN_DISTANCE,
+                 keyframe_tracks: int = ODOMETRY_KEYFRAME_TRACKS,
+                 keyframe_interval: int = ODOMETRY_KEYFRAME_INTERVAL,
+                 flow_window: int = ODOMETRY_FLOW_WINDOW,
+                 flow_levels: int = ODOMETRY_FLOW_LEVELS,
+                 ransac_error: float = ODOMETRY_RANSAC_ERROR,
+                 min_inliers: int = ODOMETRY_MIN_INLIERS,
+                 unit_scale: float = DEPTH_UNIT_SCALE,
+                 max_depth: float = ODOMETRY_MAX_DEPTH) -> None:
+        """Create a stereo odometry tracker.
+
+        Parameters
+        ----------
+        q : np.ndarray
+            4x4 disparity-to-depth matrix returned by `cv2.stereoRectify`.
+        origin : np.ndarray
+            Scene position of the first frame's head pose.
+        scale : float
+            Downscale factor applied to the views before tracking.
+        detector : str
+            "fast" for FAST corners, "orb" for the corners of the ORB detector, which are slower to find but
+            better spread across scales.
+        max_features : int
+            Most landmarks tracked at once.
+        min_distance : int
+            Side of the grid cells features are spread over, one per cell, in downscaled pixels.
+        keyframe_tracks : int
+            Features are detected again when fewer landmarks than this are left.
+        keyframe_interval : int
+            Features are detected again after this many frames, at the latest.
+        flow_window : int
+            Optical flow window size, in downscaled pixels.
+        flow_levels : int
+            Optical flow pyramid levels above the base image.
+        ransac_error : float
+            Largest reprojection error of a PnP inlier, in downscaled pixels.
+        min_inliers : int
+            Fewest inliers of a pose, tracking is lost below.
+        unit_scale : float
+            Conversion factor from calibration units to scene units.
+        max_depth : float
+            Farther features, in scene units, are not used as their depth is too uncertain.
+
+        Returns
+        -------
+        None
+        """
+        self.q = np.asarray(q, dtype=np.float64)
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.scale = scale
+        self.detector = self._create_detector(detector, max_features)
+        self.max_features = max_features
+        self.min_distance = max(1, min_distance)
+        self.keyframe_tracks = keyframe_tracks
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.flow_window = (flow_window, flow_window)
+        self.flow_levels = flow_levels
+        self.flow_criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+        self.ransac_error = ransac_error
+        self.min_inliers = max(4, min_inliers)
+        self.unit_scale = unit_scale
+        self.max_depth = max_depth
+
+        # Rectified intrinsics of the left view, in downscaled pixels
+        f, cx, cy = self.q[2, 3], -self.q[0, 3], -self.q[1, 3]
+        self.camera_matrix = np.array([[f, 0, cx], [0, f, cy], [0, 0, 1]], dtype=np.float64) * scale
+        self.camera_matrix[2, 2] = 1.0
+
+        self.landmarks = np.zeros((0, 3), dtype=np.float32)  # World positions, first camera axes, calibration units
+        self.keypoints = np.zeros((0, 1, 2), dtype=np.float32)  # Landmark positions in the previous left view
+        self.gray = None  # Downscaled grayscale left views of this and the previous frame, and right view
+        self.resized = None  # Downscaled color view, converted to grayscale
+        self.current = LEFT  # Slot of self.gray holding the current left view, the other holds the previous one
+        self.rvec = np.zeros((3, 1), dtype=np.float64)  # World to camera rotation, Rodrigues vector
+        self.tvec = np.zeros((3, 1), dtype=np.float64)  # World to camera translation
+        self.since_keyframe = 0
+        self._latest: OdometryPose | None = None
+
+        self.frame_count = 0
+        self.keyframes = 0
+        self.lost = 0
+
+        # Per-stage timings of the last frame, in seconds, 0 for stages that did not run
+        self.timings = {"prepare": 0.0, "track": 0.0, "pose": 0.0, "detect": 0.0, "triangulate": 0.0}
+
+    @staticmethod
+    def _create_detector(kind: str, max_features: int):
+        """Create the OpenCV feature detector.
+
+        Parameters
+        ----------
+        kind : str
+        max_features : int
+
+        Returns
+        -------
+        cv2.Feature2D
+
+        Raises
+        ------
+        ValueError
+            If the detector kind is unknown.
+        """
+        if kind == "fast":
+            return cv2.FastFeatureDetector_create(threshold=ODOMETRY_FAST_THRESHOLD, nonmaxSuppression=True)
+        elif kind == "orb":
+            return cv2.ORB_create(nfeatures=4 * max_features, fastThreshold=ODOMETRY_FAST_THRESHOLD)
+        raise ValueError(f"Unknown feature detector '{kind}'.")
+
+    @property
+    def latest(self) -> OdometryPose | None:
+        """The most recent pose estimate, or None before the first frame."""
+        return self._latest
+
+    def _prepare(self, img: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Downscale a view and convert it to grayscale, into a reused buffer.
+
+        The views may be camera buffers that are overwritten later, so the result is always a copy.
+        """
+        if self.scale != 1.0:
+            if img.ndim == 2:
+                return cv2.resize(img, out.shape[::-1], dst=out, interpolation=cv2.INTER_AREA)
+            # Downscale first, so fewer pixels are converted
+            img = cv2.resize(img, out.shape[::-1], dst=self.resized, interpolation=cv2.INTER_AREA)
+        if img.ndim == 3:
+            return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=out)
+        np.copyto(out, img)
+        return out
+
+    def _allocate(self, img: np.ndarray) -> None:
+        """Allocate the grayscale buffers for the size of the views."""
+        height, width = int(round(img.shape[0] * self.scale)), int(round(img.shape[1] * self.scale))
+        if self.gray is not None and self.gray.shape[1:] == (height, width):
+            return
+        self.gray = np.empty((3, height, width), dtype=np.uint8)
+        self.resized = np.empty((height, width, 3), dtype=np.uint8)
+        # Positions in the previous views no longer apply
+        self.landmarks, self.keypoints = self.landmarks[:0], self.keypoints[:0]
+
+    def compute(self, img_l: np.ndarray, img_r: np.ndarray) -> OdometryPose:
+        """Estimate the head pose of a rectified stereo pair.
+
+        Parameters
+        ----------
+        img_l : np.ndarray
+            Rectified left view.
+        img_r : np.ndarray
+            Rectified right view, only read on keyframes.
+
+        Returns
+        -------
+        OdometryPose
+            Pose in scene axes, never modified afterwards so it can be handed to another thread.
+        """
+        self.frame_count += 1
+        for stage in self.timings:
+            self.timings[stage] = 0.0
+
+        t0 = time.perf_counter()
+        self._allocate(img_l)
+        previous, self.current = self.gray[self.current], 1 - self.current
+        gray_l = self._prepare(img_l, self.gray[self.current])
+
+        t1 = time.perf_counter()
+        tracked, inliers, valid = 0, 0, True
+        if len(self.keypoints):
+            keypoints, status, _ = cv2.calcOpticalFlowPyrLK(previous, gray_l, self.keypoints, None,
+                                                            winSize=self.flow_window, maxLevel=self.flow_levels,
+                                                            criteria=self.flow_criteria)
+            keep = status.ravel() == 1
+            self.landmarks, self.keypoints = self.landmarks[keep], keypoints[keep]
+            tracked = len(self.keypoints)
+
+            t2 = time.perf_counter()
+            self.timings["track"] = t2 - t1
+            valid = self._estimate_pose()
+            inliers = len(self.keypoints) if valid else 0
+            self.timings["pose"] = time.perf_counter() - t2
+            if not valid:
+                # Start over from the last pose, the remaining landmarks can no longer be trusted
+                self.lost += 1
+                self.landmarks, self.keypoints = self.landmarks[:0], self.keypoints[:0]
+
+        self.since_keyframe += 1
+        keyframe = len(self.keypoints) < self.keyframe_tracks or self.since_keyframe >= self.keyframe_interval
+        if keyframe:
+            t3 = time.perf_counter()
+            candidates = self._detect(gray_l)
+            t4 = time.perf_counter()
+            self.timings["detect"] = t4 - t3
+            if len(candidates):
+                self._triangulate(candidates, gray_l, self._prepare(img_r, self.gray[2]))
+            self.timings["triangulate"] = time.perf_counter() - t4
+            self.since_keyframe = 0
+            self.keyframes += 1
+        self.timings["prepare"] = t1 - t0
+
+        position, rotation = self._head_pose()
+        self._latest = OdometryPose(self.frame_count, position, rotation, valid, keyframe, tracked, inliers)
+        return self._latest
+
+    def _estimate_pose(self) -> bool:
+        """Find the camera pose from the tracked landmarks, keeping only the inliers.
+
+        Returns
+        -------
+        bool
+            Whether a pose with enough inliers was found. The last pose is kept otherwise.
+        """
+        if len(self.keypoints) < self.min_inliers:
+            return False
+        # Start from the last pose, the head only moves a little between frames
+        ok, rvec, tvec, inliers = cv2.solvePnPRansac(
+            self.landmarks, self.keypoints, self.camera_matrix, None, self.rvec.copy(), self.tvec.copy(),
+            useExtrinsicGuess=True, iterationsCount=ODOMETRY_RANSAC_ITERATIONS,
+            reprojectionError=self.ransac_error, confidence=0.99, flags=cv2.SOLVEPNP_ITERATIVE
+        )
+        # Few inliers among many tracks means the views changed too much, e.g. the camera was covered
+        enough = max(self.min_inliers, ODOMETRY_MIN_INLIER_RATIO * len(self.keypoints))
+        if not ok or inliers is None or len(inliers) < enough:
+            return False
+        self.rvec, self.tvec = rvec, tvec
+        keep = inliers.ravel()
+        self.landmarks, self.keypoints = self.landmarks[keep], self.keypoints[keep]
+        return True
+
+    def _detect(self, gray: np.ndarray) -> np.ndarray:
+        """Detect features away from the tracked ones, at most one per grid cell.
+
+        Parameters
+        ----------
+        gray : np.ndarray
+            Downscaled left view.
+
+        Returns
+        -------
+        np.ndarray
+            (n, 1, 2) positions of the new features, strongest first.
+        """
+        wanted = self.max_features - len(self.keypoints)
+        if wanted <= 0:
+            return np.zeros((0, 1, 2), dtype=np.float32)
+        keypoints = self.detector.detect(gray, None)
+        if not keypoints:
+            return np.zeros((0, 1, 2), dtype=np.float32)
+        points = np.array([keypoint.pt for keypoint in keypoints], dtype=np.float32)
+        response = np.array([keypoint.response for keypoint in keypoints], dtype=np.float32)
+
+        # Grid cells, and the cells of tracked landmarks are taken already
+        columns = gray.shape[1] // self.min_distance + 1
+        cells = (points // self.min_distance).astype(np.int64) @ np.array([1, columns])
+        order = np.argsort(-response, kind="stable")
+        _, first = np.unique(cells[order], return_index=True)
+        best = order[first]
+        if len(self.keypoints):
+            taken = (self.keypoints[:, 0] // self.min_distance).astype(np.int64) @ np.array([1, columns])
+            best = best[~np.isin(cells[best], taken)]
+        best = best[np.argsort(-response[best], kind="stable")][:wanted]
+        return points[best].reshape(-1, 1, 2)
+
+    def _triangulate(self, points: np.ndarray, gray_l: np.ndarray, gray_r: np.ndarray) -> None:
+        """Find features in the right view and add those with a reliable depth as landmarks.
+
+        Parameters
+        ----------
+        points : np.ndarray
+            (n, 1, 2) feature positions in the downscaled left view.
+        gray_l : np.ndarray
+            Downscaled left view.
+        gray_r : np.ndarray
+            Downscaled right view.
+
+        Returns
+        -------
+        None
+        """
+        # Rectified views share rows, so the match is searched along the row the feature is on
+        matches, status, _ = cv2.calcOpticalFlowPyrLK(gray_l, gray_r, points, None,
+                                                      winSize=self.flow_window, maxLevel=self.flow_levels,
+                                                      criteria=self.flow_criteria)
+        left, right = points[:, 0], matches[:, 0]
+        disparity = (left[:, 0] - right[:, 0]) / self.scale
+        good = (status.ravel() == 1) & (np.abs(left[:, 1] - right[:, 1]) <= ODOMETRY_ROW_TOLERANCE) & (disparity > 0)
+        if not good.any():
+            return
+
+        # [X, Y, Z, W] = Q [u, v, d, 1], in full resolution pixels and calibration units
+        u, v = left[good, 0] / self.scale, left[good, 1] / self.scale
+        homogeneous = self.q @ np.stack((u, v, disparity[good], np.ones_like(u)))
+        camera = (homogeneous[:3] / homogeneous[3]).T
+        depth = camera[:, 2] * self.unit_scale
+        near = (depth > 0) & (depth <= self.max_depth)
+        if not near.any():
+            return
+
+        # Landmarks are stored in world coordinates, camera = R world + t
+        rotation = cv2.Rodrigues(self.rvec)[0]
+        world = (camera[near] - self.tvec.ravel()) @ rotation
+        self.landmarks = np.concatenate((self.landmarks, world.astype(np.float32)))
+        self.keypoints = np.concatenate((self.keypoints, points[good][near]))
+
+    def _head_pose(self) -> tuple[np.ndarray, np.ndarray]:
+        """Current camera pose in scene axes, relative to the first frame.
+
+        Returns
+        -------
+        np.ndarray
+            Head position, in scene units.
+        np.ndarray
+            Camera rotation, whose rows are the right, up and forward vectors.
+        """
+        rotation = cv2.Rodrigues(self.rvec)[0]  # World to camera, in OpenCV axes
+        position = -rotation.T @ self.tvec.ravel() * self.unit_scale
+        head = CV_TO_HEAD @ rotation.T @ CV_TO_HEAD  # Head axes as columns, in the first frame's head axes
+        return (self.origin + CV_TO_HEAD @ position).astype(np.float32), head.T.astype(np.float32)
+
+    def predict(self, display_time: float) -> tuple[np.ndarray, np.ndarray]:
+        """Latest head pose, in the form of `Scene.pose_source`.
+
+        The pose is that of the last processed pair, without extrapolation to the display time.
+
+        Parameters
+        ----------
+        display_time : float
+            Unused.
+
+        Returns
+        -------
+        np.ndarray
+            Head position.
+        np.ndarray
+            Camera rotation, whose rows are the right, up and forward vectors.
+        """
+        pose = self._latest
+        if pose is None:
+            return self.origin.astype(np.float32), np.eye(3, dtype=np.float32)
+        return pose.position, pose.rotation
@@ -0,0 +1,359 @@
+import json
+import time
+import zlib
+import queue
+import struct
+import threading
+from typing import Callable
+import numpy as np
+from evie.core.config import *
+import evie.core.datatypes as dt
+
+__all__ = ['StereoRecorder', 'StereoRecording', 'RecordingReplay']
+
+FILE_MAGIC = b"EVIEREC1"
+CHUNK_MAGIC = b"EVCHUNK1"
+FILE_HEADER = struct.Struct("<8sI")  # Magic, metadata size
+CHUNK_HEADER = struct.Struct("<8sIIQ")  # Magic, frames, capacity, chunk size in bytes
+ALIGNMENT = 64  # Payload alignment, so raw frames map to aligned arrays
+PADDING = bytes(ALIGNMENT)
+
+COMPRESSION = ("raw", "zlib")
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class StereoRecorder(threading.Thread):
+    """
+    Writes stereo frames, their timestamps and head poses into a recording, on its own thread.
+
+    The file is a header with JSON metadata followed by chunks. A chunk starts with the index of its frames,
+    capture time, payload offset and sizes, and pose, followed by the frame payloads, each aligned so raw frames
+    can be memory-mapped in place. The index is filled in when a chunk is complete, so a recording that was cut
+    short still reads up to its last complete chunk.
+
+    `write` only copies the frames into one of a few preallocated buffers and returns. Compression and file I/O
+    happen on the writer thread, and when it falls behind, frames are dropped rather than stalling the caller.
+    """
+
+    def __init__(self, path: str, compression: str = RECORDING_COMPRESSION,
+                 chunk_frames: int = RECORDING_CHUNK_FRAMES, buffers: int = RECORDING_BUFFERS,
+                 metadata: dict = None) -> None:
+        """Create the recording file.
+
+        Parameters
+        ----------
+        path : str
+        compression : str
+            "raw" for frames that replay without decoding, "zlib" for lossless compression.
+        chunk_frames : int
+            Frames per chunk.
+        buffers : int
+            Frames that may wait for the writer before new ones are dropped.
+        metadata : dict
+            JSON-serializable data stored with the recording, e.g. the calibration's "q" matrix as a list.
+
+        Returns
+        -------
+        None
+        """
+        if compression not in COMPRESSION:
+            raise ValueError(f"Unknown recording compression '{compression}', expected one of {COMPRESSION}.")
+        super().__init__(name="evie-recorder", daemon=True)
+        self.file = open(path, "wb")
+        self.compression = compression
+        self.chunk_frames = chunk_frames
+        self.buffer_count = buffers
+        self.metadata = metadata if metadata is not None else {}
+
+        self.buffers: list[tuple[np.ndarray, np.ndarray]] | None = None  # Allocated for the first frame's shape
+        self.free: queue.SimpleQueue[int] = queue.SimpleQueue()
+        self.queue: queue.SimpleQueue[tuple | None] = queue.SimpleQueue()
+
+        self.frames = 0
+        self.dropped = 0
+        self.bytes = 0
+        self.write_time = 0.0  # Writer thread seconds spent on the last frame
+
+    def write(self, img_l: np.ndarray, img_r: np.ndarray, timestamp: float,
+              pose: tuple[np.ndarray, np.ndarray] = None) -> bool:
+        """Queue a stereo pair for writing.
+
+        Parameters
+        ----------
+        img_l : np.ndarray
+        img_r : np.ndarray
+            Views of the pair, of the same shape and dtype as the first pair written. Copied, so the caller may
+            reuse them right away.
+        timestamp : float
+            Capture time, in seconds.
+        pose : tuple[np.ndarray, np.ndarray]
+            Head position and rotation at capture, if known.
+
+        Returns
+        -------
+        bool
+            Whether the pair was queued, False if it was dropped because the writer is behind.
+        """
+        if self.buffers is None:
+            self.buffers = [(np.empty_like(img_l), np.empty_like(img_r)) for _ in range(self.buffer_count)]
+            for i in range(self.buffer_count):
+                self.free.put(i)
+            self._write_header(img_l)
+            self.start()
+        try:
+            slot = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        left, right = self.buffers[slot]
+        np.copyto(left, img_l)
+        np.copyto(right, img_r)
+        self.queue.put((slot, timestamp, pose))
+        return True
+
+    def _write_header(self, img: np.ndarray) -> None:
+        meta = json.dumps({
+            "shape": list(img.shape),
+            "dtype": img.dtype.str,
+            "compression": self.compression,
+            "metadata": self.metadata
+        }).encode()
+        header = FILE_HEADER.pack(FILE_MAGIC, len(meta)) + meta
+        self.file.write(header + bytes(_aligned(len(header)) - len(header)))
+
+    def run(self) -> None:
+        index_size = _aligned(CHUNK_HEADER.size + self.chunk_frames * dt.recording_entry.itemsize)
+        entries = np.zeros(self.chunk_frames, dtype=dt.recording_entry)
+        count, chunk_start = 0, 0
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            start = time.perf_counter()
+            if count == 0:
+                # Reserve the chunk index, filled in once the chunk is complete
+                chunk_start = self.file.tell()
+                self.file.write(bytes(index_size))
+
+            slot, timestamp, pose = item
+            entry = entries[count]
+            entry['t'] = timestamp
+            entry['offset'] = self.file.tell()
+            for view, size_field in zip(self.buffers[slot], ('size_l', 'size_r')):
+                payload = zlib.compress(view, RECORDING_ZLIB_LEVEL) if self.compression == "zlib" else view.data
+                self.file.write(payload)
+                entry[size_field] = len(payload) if self.compression == "zlib" else view.nbytes
+                self.file.write(PADDING[:_aligned(int(entry[size_field])) - int(entry[size_field])])
+            self.free.put(slot)
+            if pose is None:
+                entry['position'], entry['rotation'] = np.nan, np.nan
+            else:
+                entry['position'], entry['rotation'] = pose
+
+            count += 1
+            self.frames += 1
+            if count == self.chunk_frames:
+                self._close_chunk(chunk_start, entries[:count])
+                count = 0
+            self.write_time = time.perf_counter() - start
+        if count:
+            self._close_chunk(chunk_start, entries[:count])
+        self.file.close()
+
+    def _close_chunk(self, chunk_start: int, entries: np.ndarray) -> None:
+        end = self.file.tell()
+        self.file.seek(chunk_start)
+        self.file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, len(entries), self.chunk_frames, end - chunk_start))
+        self.file.write(entries.tobytes())
+        self.file.seek(end)
+        self.file.flush()
+        self.bytes = end
+
+    def stop(self) -> None:
+        """Write the frames still queued and close the file.
+
+        Returns
+        -------
+        None
+        """
+        if self.is_alive():
+            self.queue.put(None)
+            self.join()
+        elif not self.file.closed:
+            self.file.close()
+
+
+class StereoRecording:
+    """
+    Random access to the frames of a recording.
+
+    Raw frames are views into a memory map of the file, so reading one copies nothing and only touches the pages
+    it covers. Compressed frames are decompressed on access.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open a recording and read its index.
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+        None
+        """
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, meta_size = FILE_HEADER.unpack_from(self.data, 0)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"'{path}' is not a recording.")
+        meta = json.loads(bytes(self.data[FILE_HEADER.size:FILE_HEADER.size + meta_size]))
+        self.shape = tuple(meta["shape"])
+        self.dtype = np.dtype(meta["dtype"])
+        self.compression = meta["compression"]
+        self.metadata = meta["metadata"]
+
+        # Chunks up to the first incomplete one, which a recording cut short ends with
+        chunks = []
+        position = _aligned(FILE_HEADER.size + meta_size)
+        while position + CHUNK_HEADER.size <= len(self.data):
+            magic, count, _, size = CHUNK_HEADER.unpack_from(self.data, position)
+            if magic != CHUNK_MAGIC or count == 0 or position + size > len(self.data):
+                break
+            chunks.append(np.frombuffer(self.data, dtype=dt.recording_entry, count=count,
+                                        offset=position + CHUNK_HEADER.size))
+            position += size
+        self.index = np.concatenate(chunks) if chunks else np.zeros(0, dtype=dt.recording_entry)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Capture time of every frame, in seconds."""
+        return self.index['t']
+
+    def pose(self, i: int) -> tuple[np.ndarray, np.ndarray] | None:
+        """Head position and rotation recorded with frame i, or None if it was recorded without one."""
+        entry = self.index[i]
+        if np.isnan(entry['position']).any():
+            return None
+        return entry['position'], entry['rotation']
+
+    def _view(self, offset: int, size: int) -> np.ndarray:
+        if self.compression == "zlib":
+            data = np.frombuffer(zlib.decompress(self.data[offset:offset + size]), dtype=self.dtype)
+        else:
+            data = self.data[offset:offset + size].view(self.dtype)
+        return data.reshape(self.shape)
+
+    def frame(self, i: int) -> tuple[np.ndarray, np.ndarray]:
+        """Stereo pair i.
+
+        Parameters
+        ----------
+        i : int
+
+        Returns
+        -------
+        np.ndarray
+        np.ndarray
+            Read-only left and right views.
+        """
+        entry = self.index[i]
+        offset, size_l, size_r = int(entry['offset']), int(entry['size_l']), int(entry['size_r'])
+        return self._view(offset, size_l), self._view(offset + _aligned(size_l), size_r)
+
+    def close(self) -> None:
+        self.index = self.index.copy()
+        self.data = None
+
+
+class RecordingReplay:
+    """
+    Plays a recording back in place of a `StereoCam`, for reproducible measurements without cameras.
+
+    In real time, frames are released at their recorded intervals and, like a live camera, frames a slow consumer
+    missed are skipped. Otherwise every frame is returned as fast as `grab` is called.
+    """
+
+    def __init__(self, recording: 'str | StereoRecording', clock: Callable[[], float] = time.perf_counter,
+                 realtime: bool = True, loop: bool = False) -> None:
+        """Prepare a replay.
+
+        Parameters
+        ----------
+        recording : str | StereoRecording
+            Recording or its path.
+        clock : Callable[[], float]
+            Time source in seconds.
+        realtime : bool
+            Release frames at their recorded times, otherwise as fast as they are grabbed.
+        loop : bool
+            Start over at the end, otherwise `grab` returns None once every frame was played.
+
+        Returns
+        -------
+        None
+        """
+        self.recording = recording if isinstance(recording, StereoRecording) else StereoRecording(recording)
+        if not len(self.recording):
+            raise ValueError(f"Recording '{self.recording.path}' holds no complete frames.")
+        self.clock = clock
+        self.realtime = realtime
+        self.loop = loop
+
+        # StereoCam attributes, frames were recorded after rectification
+        times = self.recording.timestamps
+        self.frame_height, self.frame_width = self.recording.shape[0], 2 * self.recording.shape[1]
+        span = float(times[-1] - times[0])
+        self.fps = (len(times) - 1) / span if span > 0 else 30.0
+        self.undistort = False
+        q = self.recording.metadata.get("q")
+        self.q = np.array(q, dtype=np.float64) if q is not None else None
+
+        self.position = 0
+        self.offset = None  # Clock time minus recorded time of the frames being played
+        self.skipped = 0
+        self.timestamp = None  # Replay time of the last frame grabbed
+        self.pose = None  # Head pose recorded with the last frame grabbed
+
+    def grab(self) -> tuple[np.ndarray, np.ndarray] | None:
+        """Next stereo pair, waiting for its time in real time.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray] | None
+            Left and right views, or None once the recording is over.
+        """
+        times = self.recording.timestamps
+        if self.position == len(times):
+            if not self.loop:
+                time.sleep(1.0 / self.fps)
+                return None
+            self.position, self.offset = 0, None
+
+        i = self.position
+        timestamp = times[i]
+        if self.realtime:
+            if self.offset is None:
+                self.offset = self.clock() - times[i]
+            wait = times[i] + self.offset - self.clock()
+            if wait > 0:
+                time.sleep(wait)
+            else:
+                # Late, jump to the newest frame that is due
+                i = max(i, int(np.searchsorted(times, self.clock() - self.offset, side='right')) - 1)
+                self.skipped += i - self.position
+            timestamp = times[i] + self.offset
+
+        self.position = i + 1
+        self.timestamp = float(timestamp)
+        self.pose = self.recording.pose(i)
+        return self.recording.frame(i)
+
+    def close(self) -> None:
+        self.recording.close()
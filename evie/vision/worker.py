@@ -0,0 +1,157 @@
+import time
+import threading
+from typing import Callable
+import numpy as np
+
+__all__ = ['CaptureResult', 'CaptureWorker']
+
+# Seconds waited after a failed grab, doubling on every further failure up to the maximum
+RETRY_INTERVAL = 0.001
+RETRY_INTERVAL_MAX = 0.1
+# Seconds a pair may arrive later than the quickest one before the camera clock is synced again, e.g. after a
+# video loops back to its start
+CLOCK_RESYNC_THRESHOLD = 0.5
+
+
+class CaptureResult:
+    """
+    Immutable bundle of one captured stereo pair and everything computed from it.
+
+    `timestamp` is the capture time of the pair on the worker's clock.
+
+    The images may be the camera's rotating grab buffers, which are reused `GRAB_BUFFERS` captures later, so
+    consumers should use them right away, as the passthrough upload does, and copy anything kept longer.
+
+    `output_frames` holds the capture each output was computed on, which is older than `frame_id` when a
+    processor reused its last output, so consumers can skip re-uploading it.
+    """
+    __slots__ = ("frame_id", "timestamp", "img_l", "img_r", "outputs", "output_frames", "timings")
+
+    def __init__(self, frame_id: int, timestamp: float, img_l: np.ndarray, img_r: np.ndarray,
+                 outputs: dict[str, object], output_frames: dict[str, int], timings: dict[str, float]):
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.img_l = img_l
+        self.img_r = img_r
+        self.outputs = outputs
+        self.output_frames = output_frames
+        self.timings = timings
+
+
+class CaptureWorker(threading.Thread):
+    """
+    Grabs stereo pairs and runs vision processors on them, away from the render loop.
+
+    Processors are objects with a `compute(img_l, img_r)` method, such as `StereoDepth`. If they expose a
+    `timings` dict, its stages are reported as "<name>.<stage>" for the frames it computed. A processor
+    with a true `reused` attribute, such as `StereoDepth` between recomputations, returned its last output,
+    which keeps the frame id it was computed on. The latest result is published by swapping
+    a single reference, so the render loop can read it without taking a lock. Pairs can also be handed to a
+    `StereoRecorder`, with the head pose at capture.
+
+    Pairs are timestamped with the camera's `timestamp` of the pair, moved onto the worker's clock by the
+    smallest delay seen between a capture and its delivery. Cameras without timestamps get the delivery time.
+    """
+
+    def __init__(self, cam, processors: dict[str, object] = None, recorder=None,
+                 pose_source: Callable[[float], tuple[np.ndarray, np.ndarray]] = None,
+                 clock: Callable[[], float] = time.perf_counter):
+        """Create a capture worker.
+
+        Parameters
+        ----------
+        cam : StereoCam
+            Camera to grab rectified pairs from.
+        processors : dict[str, object]
+            Named processors to run on every pair.
+        recorder : StereoRecorder
+            Recorder every pair is written to, if any. Stopped with the worker.
+        pose_source : Callable[[float], tuple[np.ndarray, np.ndarray]]
+            Head pose at a capture time, recorded with the pair.
+        clock : Callable[[], float]
+            Clock capture timestamps are mapped onto, shared with the pose source.
+
+        Returns
+        -------
+        None
+        """
+        super().__init__(name="evie-capture", daemon=True)
+        self.cam = cam
+        self.processors = processors if processors is not None else {}
+        self.recorder = recorder
+        self.pose_source = pose_source
+        self.clock = clock
+        self.frame_id = 0
+        self.clock_offset: float | None = None  # Worker clock minus camera clock, at the quickest delivery
+        self.output_frames: dict[str, int] = {}
+        self._latest: CaptureResult | None = None
+        self._running = threading.Event()
+
+    @property
+    def latest(self) -> CaptureResult | None:
+        """The most recently completed capture, or None if nothing was captured yet."""
+        return self._latest
+
+    def start(self) -> None:
+        self._running.set()
+        super().start()
+
+    def _capture_time(self, delivered: float) -> float:
+        """Capture time of the pair just grabbed, on the worker's clock, given the time it was delivered."""
+        sensor = getattr(self.cam, "timestamp", None)
+        if sensor is None:
+            return delivered
+        delay = delivered - sensor
+        # The quickest delivery bounds the offset best. Much slower ones mean the camera clock jumped
+        if self.clock_offset is None or delay < self.clock_offset or delay - self.clock_offset > CLOCK_RESYNC_THRESHOLD:
+            self.clock_offset = delay
+        return sensor + self.clock_offset
+
+    def run(self) -> None:
+        retry = RETRY_INTERVAL
+        while self._running.is_set():
+            t0 = time.perf_counter()
+            pair = self.cam.grab()
+            if pair is None:
+                # Back off instead of spinning while the source has nothing to deliver
+                time.sleep(retry)
+                retry = min(2 * retry, RETRY_INTERVAL_MAX)
+                continue
+            retry = RETRY_INTERVAL
+            timestamp = self._capture_time(self.clock())
+            img_l, img_r = pair
+            timings = {"grab": time.perf_counter() - t0}
+
+            if self.recorder is not None:
+                t1 = time.perf_counter()
+                pose = self.pose_source(timestamp) if self.pose_source is not None else None
+                self.recorder.write(img_l, img_r, timestamp, pose)
+                timings["record"] = time.perf_counter() - t1
+
+            self.frame_id += 1
+            outputs = {}
+            for name, processor in self.processors.items():
+                t1 = time.perf_counter()
+                outputs[name] = processor.compute(img_l, img_r)
+                timings[name] = time.perf_counter() - t1
+                if getattr(processor, "reused", False) and name in self.output_frames:
+                    continue
+                self.output_frames[name] = self.frame_id
+                for stage, duration in getattr(processor, "timings", {}).items():
+                    timings[f"{name}.{stage}"] = duration
+
+            self._latest = CaptureResult(self.frame_id, timestamp, img_l, img_r, outputs, dict(self.output_frames),
+                                         timings)
+
+    def stop(self) -> None:
+        """Stop the worker and wait for the current frame to finish.
+
+        Returns
+        -------
+        None
+        """
+        self._running.clear()
+        if self.is_alive():
+            self.join()
+        if self.recorder is not None:
+            self.recorder.stop()
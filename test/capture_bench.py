@@ -0,0 +1,72 @@
+"""
+Capture throughput of a stereo backend, next to the callback-and-list capture of max_cap.py.
+
+    python test/capture_bench.py synthetic
+    python test/capture_bench.py picamera2 --baseline
+"""
+import time
+import argparse
+import numpy as np
+
+from evie.capture import create_backend
+
+
+def bench_backend(kind, duration):
+    backend = create_backend(kind)
+    backend.read()  # Wait for the cameras to start
+    frames = 0
+    read_times = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        t0 = time.perf_counter()
+        if backend.read() is not None:
+            frames += 1
+            read_times.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    stats = backend.stats()
+    backend.close()
+
+    print(f"{kind}: {frames} pairs in {elapsed:.1f} s, {frames / elapsed:.1f} pairs/s")
+    print(f"  read: mean {np.mean(read_times) * 1000:.2f} ms, max {np.max(read_times) * 1000:.2f} ms")
+    for name, value in stats.items():
+        print(f"  {name}: {value:.2f}" if isinstance(value, float) else f"  {name}: {value}")
+
+
+def bench_baseline(duration):
+    """The capture loop of max_cap.py: unpaired frames appended to lists from callbacks."""
+    from picamera2 import Picamera2
+
+    def init_cam(camera_index):
+        picam = Picamera2(camera_index)
+        config = picam.create_video_configuration(main={"size": (1440, 1280)})
+        picam.align_configuration(config)
+        picam.configure(config)
+        picam.set_controls({"FrameRate": 56})
+        return picam
+
+    cam0, cam1 = init_cam(0), init_cam(1)
+    frames_0, frames_1 = [], []
+    cam0.start()
+    cam1.start()
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        cam0.capture_array(wait=False, signal_function=lambda job: frames_0.append(cam0.wait(job)))
+        cam1.capture_array(wait=True, signal_function=lambda job: frames_1.append(cam1.wait(job)))
+    elapsed = time.perf_counter() - start
+    time.sleep(1)
+    cam0.close()
+    cam1.close()
+    print(f"max_cap baseline: {len(frames_0)} / {len(frames_1)} frames in {elapsed:.1f} s, "
+          f"{min(len(frames_0), len(frames_1)) / elapsed:.1f} frames/s per camera, unpaired")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("backend", choices=["cv2", "video", "picamera2", "synthetic"])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to capture for")
+    parser.add_argument("--baseline", action="store_true", help="Also run the max_cap.py capture loop first")
+    args = parser.parse_args()
+
+    if args.baseline:
+        bench_baseline(args.duration)
+    bench_backend(args.backend, args.duration)
@@ -0,0 +1,68 @@
+"""
+Per-stage timings of stereo visual odometry on a recorded sequence, every frame processed in order.
+
+With head poses in the recording, the rotation odometry estimated since the first frame is compared with the
+recorded one. Detecting on every frame (--keyframe-interval 1) shows what keyframes save.
+
+    python test/odometry_bench.py ../data/session.rec
+    python test/odometry_bench.py ../data/session.rec --detector orb --keyframe-interval 1
+"""
+import time
+import argparse
+import numpy as np
+
+from evie.core.config import ODOMETRY_DETECTOR, ODOMETRY_KEYFRAME_INTERVAL, ODOMETRY_SCALE
+from evie.vision import StereoRecording, StereoOdometry
+
+
+def rotation_angle(a, b):
+    """Angle between two rotations, in degrees."""
+    return np.degrees(np.arccos(np.clip((np.trace(a @ b.T) - 1) / 2, -1.0, 1.0)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="Recording made with CAPTURE_RECORD_PATH and a calibrated camera")
+    parser.add_argument("--detector", default=ODOMETRY_DETECTOR, choices=["fast", "orb"])
+    parser.add_argument("--scale", type=float, default=ODOMETRY_SCALE)
+    parser.add_argument("--keyframe-interval", type=int, default=ODOMETRY_KEYFRAME_INTERVAL)
+    parser.add_argument("--frames", type=int, default=None, help="Frames to process, all by default")
+    args = parser.parse_args()
+
+    recording = StereoRecording(args.recording)
+    q = recording.metadata.get("q")
+    if q is None:
+        parser.error("The recording was made without a calibration, odometry needs its Q matrix.")
+    odometry = StereoOdometry(np.array(q), scale=args.scale, detector=args.detector,
+                              keyframe_interval=args.keyframe_interval)
+
+    frames = len(recording) if args.frames is None else min(args.frames, len(recording))
+    timings = {stage: np.zeros(frames) for stage in odometry.timings}
+    totals, tracked, inliers, rotation_error = np.zeros(frames), [], [], []
+    first_pose = recording.pose(0)
+    for i in range(frames):
+        img_l, img_r = recording.frame(i)
+        start = time.perf_counter()
+        pose = odometry.compute(img_l, img_r)
+        totals[i] = time.perf_counter() - start
+        for stage, duration in odometry.timings.items():
+            timings[stage][i] = duration
+        tracked.append(pose.tracked)
+        inliers.append(pose.inliers)
+        recorded = recording.pose(i)
+        if first_pose is not None and recorded is not None and pose.valid:
+            # Rotation since the first frame, odometry being relative to it
+            rotation_error.append(rotation_angle(pose.rotation @ first_pose[1], recorded[1]))
+
+    print(f"{args.recording}: {frames} frames, {odometry.keyframes} keyframes, {odometry.lost} times lost")
+    print(f"{'stage':<14}{'mean ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    for stage, values in list(timings.items()) + [("total", totals)]:
+        print(f"{stage:<14}{values.mean() * 1000:>9.2f}{np.percentile(values, 95) * 1000:>9.2f}"
+              f"{values.max() * 1000:>9.2f}")
+    print(f"tracked landmarks: mean {np.mean(tracked):.0f}, PnP inliers: mean {np.mean(inliers):.0f}")
+    if rotation_error:
+        print(f"rotation against recorded poses: mean {np.mean(rotation_error):.2f} deg, "
+              f"max {np.max(rotation_error):.2f} deg")
+    position = odometry.latest.position
+    print(f"final position: {position[0]:.3f}, {position[1]:.3f}, {position[2]:.3f}")
+    recording.close()
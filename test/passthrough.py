@@ -21,16 +21,21 @@ y = max((frame_height - screen_height) // 2, 0)
 
 print(frame_width, 'x', frame_height, '@', fps)
 
+# Crop of each view, and buffers reused every frame: the camera frame and the side-by-side result
+crop_w = len(range(mid)[x:x+screen_width])
+crop_h = len(range(frame_height)[y:y+screen_height])
+frame = np.empty((frame_height, frame_width, 3), dtype=np.uint8)
+res = np.empty((crop_h, 2 * crop_w, 3), dtype=np.uint8)
+
 
 def grab():
-    ret, frame = cap.read()
+    ret, _ = cap.read(frame)
 
     # (x, y)
     if ret:
-        img_l, img_r = frame[:, :mid, :], frame[:, mid:, :]
-        img_l = img_l[y:y+screen_height, x:x+screen_width, :]
-        img_r = img_r[y:y+screen_height, x:x+screen_width, :]
-        res = np.concatenate((img_l, img_r), axis=1)
+        # Crop both views straight into the halves of the result
+        np.copyto(res[:, :crop_w], frame[y:y+crop_h, x:x+crop_w])
+        np.copyto(res[:, crop_w:], frame[y:y+crop_h, mid+x:mid+x+crop_w])
 
         return res
 